@@ -87,6 +87,7 @@ def reset_events(
     """
     # 1. Clear Database
     db.query(models.Event).delete()
+    db.query(models.StoredImage).delete()
     db.commit()
 
     # 2. Clear Media Files
@@ -96,7 +97,8 @@ def reset_events(
     
     deleted_count = 0
     if MEDIA_DIR.exists():
-        for item in MEDIA_DIR.iterdir():
+        subfolders = ("clips", "thumbs", "snapshots")
+        for item in [*MEDIA_DIR.iterdir(), *(f for sub in subfolders for f in (MEDIA_DIR / sub).glob("*"))]:
             if item.is_file():
                 try:
                     item.unlink()
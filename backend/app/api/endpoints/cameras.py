@@ -2,16 +2,61 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+import json
+from typing import List, Optional, Sequence, Tuple
 
 from app.models import all_models as models
 from app.schemas import all_schemas as schemas
 from app.core.database import get_db
 from app.api.auth import get_current_user  # reads JWT from Authorization header
+from app.services.detection import LABEL_GROUPS
+from app.services.snapshot_store import release_snapshots, remove_snapshot_files
 
 router = APIRouter()
 
 
+def clean_detect_classes(value: Optional[str]) -> Optional[str]:
+    """Normalize 'Person, vehicle' -> 'person,vehicle'; 400 on unknown labels."""
+    if value is None or not value.strip():
+        return None
+    labels = []
+    for name in value.split(","):
+        name = name.strip().lower()
+        if name and name not in labels:
+            labels.append(name)
+    unknown = [name for name in labels if name not in LABEL_GROUPS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown detection classes: {', '.join(unknown)}. "
+                   f"Available: {', '.join(LABEL_GROUPS)}",
+        )
+    return ",".join(labels) or None
+
+
+def clean_roi(points: Optional[Sequence[Tuple[float, float]]]) -> Optional[str]:
+    """Polygon of >= 3 normalized points -> JSON text; 400 otherwise."""
+    if not points:
+        return None
+    if len(points) < 3 or any(not (0.0 <= v <= 1.0) for point in points for v in point):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ROI must be a polygon of at least 3 [x, y] points with coordinates between 0 and 1.",
+        )
+    return json.dumps([[round(x, 4), round(y, 4)] for x, y in points])
+
+
+def clean_inference_size(size: Optional[int]) -> Optional[int]:
+    if size is None:
+        return None
+    if size < 64 or size > 1280 or size % 32:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="inference_size must be a multiple of 32 between 64 and 1280.",
+        )
+    return size
+
+
 # ---------- LIST CAMERAS ----------
 @router.get("/", response_model=List[schemas.CameraRead])
 def list_cameras(db: Session = Depends(get_db)):
@@ -53,6 +98,9 @@ def create_camera(
         rtsp_url=camera_in.rtsp_url,
         location=camera_in.location,
         is_active=camera_in.is_active,
+        detect_classes=clean_detect_classes(camera_in.detect_classes),
+        roi=clean_roi(camera_in.roi),
+        inference_size=clean_inference_size(camera_in.inference_size),
     )
     db.add(cam)
     db.commit()
@@ -85,6 +133,41 @@ def toggle_camera(
     return cam
 
 
+# ---------- DETECTION SETTINGS ----------
+@router.patch("/{camera_id}/detection", response_model=schemas.CameraRead)
+def update_camera_detection(
+    camera_id: str,
+    update: schemas.CameraDetectionUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Change what and where a camera detects (classes, ROI polygon, input size).
+    Running pipelines pick it up within a few seconds.
+    """
+    cam = (
+        db.query(models.Camera)
+        .filter(models.Camera.camera_id == camera_id)
+        .first()
+    )
+    if not cam:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Camera not found",
+        )
+
+    fields = update.model_dump(exclude_unset=True)
+    if "detect_classes" in fields:
+        cam.detect_classes = clean_detect_classes(update.detect_classes)
+    if "roi" in fields:
+        cam.roi = clean_roi(update.roi)
+    if "inference_size" in fields:
+        cam.inference_size = clean_inference_size(update.inference_size)
+    db.commit()
+    db.refresh(cam)
+    return cam
+
+
 # ---------- DELETE BY camera_id (Frontend uses this) ----------
 @router.delete("/{camera_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_camera(
@@ -118,13 +201,16 @@ def delete_camera(
             detail="Camera not found",
         )
 
-    # 3. DELETE HISTORY FIRST
-    deleted_events = db.query(models.Event).filter(models.Event.camera_id == clean_id).delete()
+    # 3. DELETE HISTORY FIRST (and the snapshots no other event references)
+    events = db.query(models.Event).filter(models.Event.camera_id == clean_id)
+    orphans = release_snapshots(db, [path for (path,) in events.with_entities(models.Event.image_path)])
+    deleted_events = events.delete()
     print(f"   - Deleted {deleted_events} events linked to this camera.")
 
     # 4. DELETE CAMERA
     db.delete(cam)
     db.commit()
+    remove_snapshot_files(orphans)
     print("✅ Camera deleted successfully.")
     return  # 204
 
@@ -150,8 +236,11 @@ def delete_camera_by_id(
         )
 
     # Also fix this one, just in case
-    db.query(models.Event).filter(models.Event.camera_id == cam.camera_id).delete()
+    events = db.query(models.Event).filter(models.Event.camera_id == cam.camera_id)
+    orphans = release_snapshots(db, [path for (path,) in events.with_entities(models.Event.image_path)])
+    events.delete()
 
     db.delete(cam)
     db.commit()
+    remove_snapshot_files(orphans)
     return  # 204
\ No newline at end of file
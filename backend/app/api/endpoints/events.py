@@ -1,5 +1,6 @@
 # app/routes/events.py
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List
 
 from sqlalchemy import func
 from sqlalchemy.orm import Session
@@ -7,6 +8,8 @@ from sqlalchemy.orm import Session
 from fastapi import (
     APIRouter,
     Depends,
+    HTTPException,
+    Request,
     status,
     WebSocket,
     WebSocketDisconnect,
@@ -14,7 +17,10 @@ from fastapi import (
 
 from app.core.database import SessionLocal
 from app.api.endpoints import cameras
+from app.api.endpoints.media import IMMUTABLE, serve_file
 from app.services.websocket_manager import manager
+from app.services.event_bus import event_bus
+from app.services.thumbnails import get_thumbnail, snap_width
 from app.models import all_models as models
 from app.schemas import all_schemas as schemas
 
@@ -33,33 +39,6 @@ def get_db():
         db.close()
 
 
-# --------------------------------------------------
-# WebSocket connection manager
-# --------------------------------------------------
-class ConnectionManager:
-    def __init__(self) -> None:
-        self.active_connections: list[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket) -> None:
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket) -> None:
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: Dict[str, Any]) -> None:
-        for ws in list(self.active_connections):
-            try:
-                await ws.send_json(message)
-            except Exception:
-                # drop dead connections
-                self.disconnect(ws)
-
-
-manager = ConnectionManager()
-
-
 # --------------------------------------------------
 # HTTP endpoints
 # --------------------------------------------------
@@ -70,6 +49,7 @@ def list_events(
     skip: int = 0,
     camera_id: str | None = None,
     event_type: str | None = None,
+    status: str | None = None,
     start_date: str | None = None,
     end_date: str | None = None,
     db: Session = Depends(get_db)
@@ -83,6 +63,9 @@ def list_events(
         query = query.filter(models.Event.camera_id == camera_id)
     if event_type and event_type != "all":
         query = query.filter(models.Event.event_type == event_type)
+    if status and status != "all":
+        # "open" = still in progress, "closed" = ended
+        query = query.filter(models.Event.status == status)
     
     # Date filtering
     if start_date:
@@ -104,9 +87,15 @@ def list_events(
 async def create_event(event_in: schemas.EventCreate, db: Session = Depends(get_db)):
     """
     Create a new security event (YOLO/detector uses this),
-    then broadcast it over WebSocket.
+    then publish it on the event bus so every worker's WebSocket
+    clients receive it.
     """
+    now = datetime.utcnow()
     event = models.Event(
+        timestamp=now,
+        started_at=now,
+        ended_at=now,
+        status="closed",
         camera_id=event_in.camera_id,
         event_type=event_in.event_type,
         confidence=event_in.confidence,
@@ -117,8 +106,8 @@ async def create_event(event_in: schemas.EventCreate, db: Session = Depends(get_
     db.commit()
     db.refresh(event)
 
-    payload = schemas.EventRead.from_attributes(event).model_dump()
-    await manager.broadcast({"type": "new_event", "event": payload})
+    payload = schemas.EventRead.model_validate(event).model_dump(mode="json")
+    event_bus.publish({"type": "new_event", "event": payload})
 
     return event
 
@@ -151,6 +140,33 @@ def get_event_stats(db: Session = Depends(get_db)):
     )
 
 
+@router.get("/{event_id}/thumbnail")
+def get_event_thumbnail(
+    event_id: int,
+    request: Request,
+    w: int | None = None,
+    v: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Small JPEG of the event snapshot, `w` pixels wide (snapped to 160/320/640).
+
+    Use EventRead.thumbnail_url: its `v` (the snapshot name) changes whenever
+    the snapshot does, so responses are cached as immutable. Revalidation
+    with If-None-Match is answered with 304.
+    """
+    event = db.get(models.Event, event_id)
+    if event is None or not event.image_path:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Event has no snapshot")
+
+    path = get_thumbnail(event.image_path, snap_width(w))
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Snapshot file missing")
+
+    # Unversioned URLs (no v) are revalidated instead: event ids restart after a reset
+    return serve_file(request, path, IMMUTABLE if v else "private, no-cache", media_type="image/jpeg")
+
+
 # --------------------------------------------------
 # WebSocket endpoint
 # --------------------------------------------------
@@ -0,0 +1,89 @@
+# backend/app/api/endpoints/media.py
+"""
+Media files (/media/...): event snapshots, thumbnails, pre-rolls and clips.
+
+Every file under media/ is written once under a unique name (timestamped or
+content-addressed, renamed into place when complete), so responses are
+cached as immutable and browsers stop refetching them on dashboard
+refreshes. ETags are strong: the sha256 for content-addressed snapshots,
+inode/mtime/size otherwise. If-None-Match is answered with 304; Range and
+If-Range requests (clips) get 206 from FileResponse, which also uses the
+server's zero-copy "pathsend" extension when the ASGI server offers it.
+
+With MEDIA_ACCEL_REDIRECT set (e.g. "/protected-media/"), the body is left
+to nginx: the response only carries X-Accel-Redirect and nginx sends the
+file with sendfile from an `internal` location aliased to media/.
+"""
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
+
+from app.core.config import settings
+
+router = APIRouter()
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
+MEDIA_DIR = BASE_DIR / "media"
+MEDIA_DIR.mkdir(parents=True, exist_ok=True)
+MEDIA_ROOT = MEDIA_DIR.resolve()
+
+IMMUTABLE = "private, max-age=31536000, immutable"
+CONTENT_ADDRESSED = re.compile(r"^[0-9a-f]{64}$")  # snapshots/<sha256>.jpg
+PARTIAL_SUFFIXES = (".tmp", ".ts")  # being written (snapshot writer / clip remux)
+
+
+def strong_etag(path: Path, stat) -> str:
+    if CONTENT_ADDRESSED.match(path.stem):
+        return f'"{path.stem}"'
+    return f'"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """If-None-Match (weak comparison, RFC 9110), else If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def serve_file(request: Request, path: Path, cache_control: str = IMMUTABLE, media_type: Optional[str] = None) -> Response:
+    """FileResponse with a strong ETag, cache policy and 304 handling."""
+    path = path.resolve()
+    stat = path.stat()
+    etag = strong_etag(path, stat)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    accel = settings.MEDIA_ACCEL_REDIRECT
+    if accel and path.is_relative_to(MEDIA_ROOT):
+        headers["X-Accel-Redirect"] = accel.rstrip("/") + "/" + path.relative_to(MEDIA_ROOT).as_posix()
+        headers["Last-Modified"] = formatdate(stat.st_mtime, usegmt=True)
+        return Response(media_type=media_type, headers=headers)
+
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
+
+
+def media_file(relative: str) -> Path:
+    """Resolve a /media/<relative> path, 404 for anything outside media/ or not finished."""
+    path = (MEDIA_ROOT / relative).resolve()
+    if MEDIA_ROOT not in path.parents or path.suffix in PARTIAL_SUFFIXES or not path.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    return path
+
+
+@router.api_route("/media/{relative:path}", methods=["GET", "HEAD"], name="media")
+def get_media(relative: str, request: Request):
+    """A file under media/, cached as immutable (see module docstring)."""
+    return serve_file(request, media_file(relative))
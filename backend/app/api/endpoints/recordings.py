@@ -0,0 +1,81 @@
+# backend/app/api/endpoints/recordings.py
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.models import all_models as models
+from app.schemas import all_schemas as schemas
+from app.services.recorder import segment_file
+
+router = APIRouter()
+
+MAX_SEGMENTS = 1000
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Stored times are naive UTC; accept aware datetimes in any zone."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+@router.get("/{camera_id}/segments", response_model=List[schemas.RecordingSegmentRead])
+def list_segments(
+    camera_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 200,
+    db: Session = Depends(get_db),
+):
+    """Recorded segments of a camera overlapping [start, end], oldest first."""
+    query = db.query(models.RecordingSegment).filter(models.RecordingSegment.camera_id == camera_id)
+    if start:
+        query = query.filter(models.RecordingSegment.end > to_utc_naive(start))
+    if end:
+        query = query.filter(models.RecordingSegment.start < to_utc_naive(end))
+    return query.order_by(models.RecordingSegment.start).limit(min(limit, MAX_SEGMENTS)).all()
+
+
+@router.get("/{camera_id}")
+def get_recording(camera_id: str, at: datetime, db: Session = Depends(get_db)):
+    """
+    The MP4 segment recorded at `at` (ISO 8601, UTC if no offset).
+
+    One index lookup on (camera_id, start); no directory scan or probing.
+    Range requests are answered with 206. X-Seek-Offset is the position of
+    `at` inside the segment in seconds (e.g. <video src="...#t=offset">).
+    """
+    at = to_utc_naive(at)
+    segment = (
+        db.query(models.RecordingSegment)
+        .filter(
+            models.RecordingSegment.camera_id == camera_id,
+            models.RecordingSegment.start <= at,
+        )
+        .order_by(models.RecordingSegment.start.desc())
+        .first()
+    )
+    if segment is None or segment.end < at:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No recording at that time")
+
+    path = segment_file(segment)
+    if not path.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recording file missing")
+
+    offset = (at - segment.start).total_seconds()
+    return FileResponse(
+        path,
+        media_type="video/mp4",
+        headers={
+            "X-Segment-Start": segment.start.isoformat() + "Z",
+            "X-Segment-End": segment.end.isoformat() + "Z",
+            "X-Seek-Offset": f"{offset:.3f}",
+            "Access-Control-Expose-Headers": "X-Segment-Start, X-Segment-End, X-Seek-Offset",
+            # Finished segments never change
+            "Cache-Control": "private, max-age=86400, immutable",
+        },
+    )
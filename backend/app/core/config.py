@@ -19,4 +19,61 @@ class Settings:
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 480))
 
+    # Live event bus ("memory://" = single process, "redis://..." = shared by all workers)
+    EVENT_BUS_URL: str = os.getenv("EVENT_BUS_URL", "memory://")
+    EVENT_BUS_CHANNEL: str = os.getenv("EVENT_BUS_CHANNEL", "cctv:events")
+
+    # Standalone detection worker (python -m app.worker). Empty = run detection in the API process.
+    DETECTION_WORKER_ADDRESS: str = os.getenv("DETECTION_WORKER_ADDRESS", "")
+    DETECTION_WORKER_AUTHKEY: str = os.getenv("DETECTION_WORKER_AUTHKEY", SECRET_KEY)
+
+    # Load the YOLO model in the background right after startup (otherwise on first stream)
+    DETECTOR_PRELOAD: bool = os.getenv("DETECTOR_PRELOAD", "true").lower() in ("1", "true", "yes")
+
+    # Detector model: "pt" (PyTorch), "torchscript" or "onnx" (exported on first use, falls back to .pt)
+    DETECTOR_MODEL_PATH: str = os.getenv("DETECTOR_MODEL_PATH", "ai_models/yolov8n.pt")
+    DETECTOR_FORMAT: str = os.getenv("DETECTOR_FORMAT", "pt")
+    DETECTOR_IMGSZ: int = int(os.getenv("DETECTOR_IMGSZ", 640))
+    DETECTOR_WARMUP_RUNS: int = int(os.getenv("DETECTOR_WARMUP_RUNS", 2))
+
+    # Inference backend: "ultralytics" (torch) or "onnxruntime" (CPU, no torch at runtime)
+    DETECTOR_BACKEND: str = os.getenv("DETECTOR_BACKEND", "ultralytics")
+    DETECTOR_ORT_INTRA_THREADS: int = int(os.getenv("DETECTOR_ORT_INTRA_THREADS", 0))  # 0 = all cores
+    DETECTOR_ORT_INTER_THREADS: int = int(os.getenv("DETECTOR_ORT_INTER_THREADS", 1))
+    DETECTOR_PRECISION: str = os.getenv("DETECTOR_PRECISION", "fp32")  # fp32 | int8
+
+    # JPEG encoder for the streams: auto (fastest available) | turbojpeg | opencv | pillow
+    JPEG_ENCODER: str = os.getenv("JPEG_ENCODER", "auto")
+
+    # Where detection boxes are drawn: "server" (burned into the JPEG streams) or
+    # "client" (clean video; boxes go out as JSON and the browser draws them)
+    STREAM_OVERLAYS: str = os.getenv("STREAM_OVERLAYS", "server")
+
+    # Continuous recording (ffmpeg stream copy) and pre/post-roll event clips
+    RECORDING_ENABLED: bool = os.getenv("RECORDING_ENABLED", "false").lower() in ("1", "true", "yes")
+    RECORDING_SEGMENT_SECONDS: int = int(os.getenv("RECORDING_SEGMENT_SECONDS", 60))
+    RECORDING_RETENTION_HOURS: float = float(os.getenv("RECORDING_RETENTION_HOURS", 24))
+    CLIP_PRE_ROLL_SECONDS: float = float(os.getenv("CLIP_PRE_ROLL_SECONDS", 10))
+    CLIP_POST_ROLL_SECONDS: float = float(os.getenv("CLIP_POST_ROLL_SECONDS", 10))
+    FFMPEG_PATH: str = os.getenv("FFMPEG_PATH", "ffmpeg")
+
+    # In-memory pre-event buffer of encoded stream frames (0 s = off, the default:
+    # when on, every camera encodes a "grid" JPEG per frame even with no viewers)
+    PREROLL_SECONDS: float = float(os.getenv("PREROLL_SECONDS", 0))
+    PREROLL_MAX_MB: float = float(os.getenv("PREROLL_MAX_MB", 8))  # per camera
+    PREROLL_FORMAT: str = os.getenv("PREROLL_FORMAT", "gif")  # gif | mjpeg
+    PREROLL_GIF_FPS: float = float(os.getenv("PREROLL_GIF_FPS", 5))
+    PREROLL_GIF_WIDTH: int = int(os.getenv("PREROLL_GIF_WIDTH", 427))
+
+    # Event snapshots are written by a background thread (temp file + rename)
+    SNAPSHOT_FSYNC: str = os.getenv("SNAPSHOT_FSYNC", "file")  # none | file | full
+    SNAPSHOT_QUEUE_SIZE: int = int(os.getenv("SNAPSHOT_QUEUE_SIZE", 64))
+    # Max differing bits (of 64) between perceptual hashes for a snapshot to reuse
+    # the camera's previous one (0 = only byte-identical snapshots are shared)
+    SNAPSHOT_DEDUP_DISTANCE: int = int(os.getenv("SNAPSHOT_DEDUP_DISTANCE", 4))
+
+    # Behind nginx: internal location aliased to media/ (e.g. "/protected-media/");
+    # /media responses then carry X-Accel-Redirect and nginx sends the file
+    MEDIA_ACCEL_REDIRECT: str = os.getenv("MEDIA_ACCEL_REDIRECT", "")
+
 settings = Settings()
@@ -5,14 +5,17 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 from app.core.database import Base, engine
 from app.models import all_models as models
-from app.api.endpoints import auth, events, cameras, video, admin, settings 
+from app.api.endpoints import auth, events, cameras, video, admin, settings, recordings, media
 # Ensure video module is correctly referenced if imported from package
 import app.api.endpoints.video as video_module 
 from app.services.websocket_manager import manager
+from app.services.event_bus import event_bus
+from app.services.detection import detector_status, start_detector_warmup
+from app.services.snapshot_writer import snapshot_writer
+from app.core.config import settings as app_settings
 from app.core.logging_config import setup_logging
 
 # Initialize Logging
@@ -33,6 +36,16 @@ async def lifespan(app: FastAPI):
     if hasattr(video_module, "set_stop_event"):
         video_module.set_stop_event(stop_event)
 
+    # Relay bus events (from any worker / detection thread) to our WebSocket clients
+    event_bus.subscribe(manager.broadcast)
+
+    # Camera pipelines (local) or the link to the detection worker (remote)
+    video_module.frame_hub.start()
+
+    # 🧠 Warm up the model off the request path (API accepts requests immediately)
+    if not app_settings.DETECTION_WORKER_ADDRESS and app_settings.DETECTOR_PRELOAD:
+        start_detector_warmup()
+
     # 🔍 DEBUG: Print all registered routes
     print("----- REGISTERED ROUTES -----")
     for route in app.routes:
@@ -44,6 +57,10 @@ async def lifespan(app: FastAPI):
     # 2. Shutdown Logic (Triggers on Ctrl+C)
     print("[STOP] Server Shutting Down... Signaling threads to stop.")
     stop_event.set()
+    video_module.frame_hub.stop()
+    video_module.passthrough_hub.stop()
+    snapshot_writer.close()  # flush pending event snapshots
+    event_bus.close()
 
 app = FastAPI(
     title="Automated CCTV Monitoring System",
@@ -67,14 +84,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ---------------------------------------------------------
-# 📂 STATIC MEDIA FILES
-# ---------------------------------------------------------
-from pathlib import Path
-BASE_DIR = Path(__file__).resolve().parent.parent
-MEDIA_DIR_ABS = BASE_DIR / "media"
-app.mount("/media", StaticFiles(directory=str(MEDIA_DIR_ABS)), name="media")
-
 # ---------------------------------------------------------
 # 🔗 ROUTERS
 # ---------------------------------------------------------
@@ -82,6 +91,8 @@ app.include_router(auth.router)
 app.include_router(events.router, prefix="/api/events", tags=["Events"])
 app.include_router(cameras.router, prefix="/api/cameras", tags=["Cameras"])
 app.include_router(video.router, prefix="/api", tags=["Video"])
+app.include_router(recordings.router, prefix="/api/recordings", tags=["Recordings"])
+app.include_router(media.router, tags=["Media"])  # /media: snapshots, thumbnails, clips (cached, ranges)
 app.include_router(admin.router)
 app.include_router(settings.router)
 
@@ -115,4 +126,11 @@ async def events_ws(websocket: WebSocket):
 # ---------------------------------------------------------
 @app.get("/api/health")
 def health_check():
-    return {"status": "ok"}
+    if app_settings.DETECTION_WORKER_ADDRESS:
+        model = {"location": "worker", "worker_connected": video_module.frame_hub.connected}
+    else:
+        model = {"location": "api", **detector_status()}
+    health = {"status": "ok", "model": model}
+    if not app_settings.DETECTION_WORKER_ADDRESS:
+        health["snapshots"] = snapshot_writer.stats()  # written by the local pipelines
+    return health
@@ -1,5 +1,7 @@
 # app/models.py
 from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
 
 from sqlalchemy import (
     Column,
@@ -8,6 +10,7 @@ from sqlalchemy import (
     DateTime,
     Float,
     Boolean,
+    Index,
 )
 
 from app.core.database import Base
@@ -46,6 +49,43 @@ class Event(Base):
     confidence = Column(Float, nullable=True)
     description = Column(String, nullable=True)
     image_path = Column(String, nullable=True)   # e.g. "media/cam1_2025.jpg"
+    clip_path = Column(String, nullable=True)    # e.g. "media/clips/cam1_2025.mp4" (when recording)
+    preroll_path = Column(String, nullable=True)  # e.g. "media/cam1_2025_preroll.gif"
+    # Lifecycle: opened on entry, updated while objects remain, closed on exit
+    started_at = Column(DateTime, default=datetime.utcnow)
+    ended_at = Column(DateTime, nullable=True)
+    status = Column(String, default="closed", index=True)  # "open" | "closed"
+    peak_count = Column(Integer, nullable=True)
+
+    @property
+    def duration_seconds(self):
+        if self.started_at is None or self.ended_at is None:
+            return None
+        return (self.ended_at - self.started_at).total_seconds()
+
+    @property
+    def thumbnail_url(self):
+        """Versioned by the snapshot name, so clients may cache it forever (add &w=<width>)."""
+        if not self.image_path:
+            return None
+        return f"api/events/{self.id}/thumbnail?v={quote(Path(self.image_path).stem)}"
+
+
+# =========================
+# Content-addressed snapshot files
+# =========================
+class StoredImage(Base):
+    """One snapshot file, shared by every event that references it (see services/snapshot_store.py)."""
+    __tablename__ = "stored_images"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String, unique=True, index=True, nullable=False)
+    path = Column(String, unique=True, nullable=False)  # Event.image_path, e.g. "media/snapshots/<sha256>.jpg"
+    camera_id = Column(String, index=True)
+    phash = Column(String(16), nullable=True)  # 64-bit DCT perceptual hash, hex
+    size = Column(Integer, nullable=True)      # bytes
+    refcount = Column(Integer, default=0, nullable=False)  # events referencing it
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 
 # =========================
@@ -60,3 +100,22 @@ class Camera(Base):
     rtsp_url = Column(String)                             # RTSP or file path
     location = Column(String, nullable=True)              # e.g. "CS Lab - Block A"
     is_active = Column(Boolean, default=True)
+    detect_classes = Column(String, nullable=True)        # e.g. "person,phone" (None = default)
+    roi = Column(String, nullable=True)                   # JSON [[x, y], ...] normalized 0-1
+    inference_size = Column(Integer, nullable=True)       # model input size (None = DETECTOR_IMGSZ)
+
+
+# =========================
+# Recording segment index
+# =========================
+class RecordingSegment(Base):
+    """One finished MP4 segment of a camera recording (see services/recorder.py)."""
+    __tablename__ = "recording_segments"
+    __table_args__ = (Index("ix_recording_segments_camera_start", "camera_id", "start"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    camera_id = Column(String, nullable=False)
+    start = Column(DateTime, nullable=False)   # UTC, first frame (a keyframe)
+    end = Column(DateTime, nullable=False)     # UTC
+    path = Column(String, nullable=False, unique=True)  # relative to recordings/, e.g. "cam1/segments/20250101-120000.mp4"
+    size = Column(Integer, nullable=True)      # bytes
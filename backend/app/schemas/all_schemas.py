@@ -1,8 +1,9 @@
 # app/schemas.py
+import json
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Tuple
 
-from pydantic import BaseModel, constr
+from pydantic import BaseModel, constr, field_validator
 
 
 # =====================
@@ -76,6 +77,14 @@ class EventCreate(EventBase):
 class EventRead(EventBase):
     id: int
     timestamp: datetime
+    started_at: Optional[datetime] = None
+    ended_at: Optional[datetime] = None  # None while the event is open
+    status: Optional[str] = None
+    peak_count: Optional[int] = None
+    clip_path: Optional[str] = None  # set once the pre/post-roll clip is written
+    preroll_path: Optional[str] = None  # lead-up from the in-memory frame buffer
+    duration_seconds: Optional[float] = None
+    thumbnail_url: Optional[str] = None  # small variant of image_path for lists
 
     class Config:
         from_attributes = True  # IMPORTANT for SQLAlchemy -> Pydantic
@@ -97,18 +106,50 @@ class CameraBase(BaseModel):
     rtsp_url: str
     location: Optional[str] = None
     is_active: bool = True
+    detect_classes: Optional[str] = None  # comma-separated labels, e.g. "person,phone"
+    roi: Optional[List[Tuple[float, float]]] = None  # polygon, normalized (x, y) in 0-1
+    inference_size: Optional[int] = None  # model input size for this camera
+
+    @field_validator("roi", mode="before")
+    @classmethod
+    def load_roi(cls, value):
+        # Stored as JSON text on the model
+        if isinstance(value, str):
+            return json.loads(value) if value else None
+        return value
 
 
 class CameraCreate(CameraBase):
     pass
 
 
+class CameraDetectionUpdate(BaseModel):
+    """Partial update: only the fields that are sent are changed (null clears)."""
+    detect_classes: Optional[str] = None
+    roi: Optional[List[Tuple[float, float]]] = None
+    inference_size: Optional[int] = None
+
+
 class CameraRead(CameraBase):
     id: int
 
     class Config:
         from_attributes = True
 
+
+# =====================
+# Recordings
+# =====================
+
+class RecordingSegmentRead(BaseModel):
+    camera_id: str
+    start: datetime
+    end: datetime
+    size: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
 # =====================
 # Settings
 # =====================
@@ -0,0 +1,281 @@
+# app/services/camera.py
+import os
+import logging
+import time
+import threading
+from dataclasses import dataclass
+from typing import Tuple
+from urllib.parse import urlsplit, urlunsplit, quote
+
+import cv2
+import numpy as np
+
+from app.services import jpeg as jpeg_encoders
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# ⚙️ STREAM CONSTANTS
+# ==========================================
+STREAM_RESOLUTION = (854, 480)
+JPEG_QUALITY = 60            # Aggressive compression for speed
+MAX_CONSECUTIVE_FAILS = 30
+
+
+@dataclass(frozen=True)
+class StreamProfile:
+    size: Tuple[int, int]  # (width, height)
+    max_fps: float         # 0 = every processed frame
+    quality: int           # JPEG quality
+
+
+# Output profiles: each one is encoded once per camera and shared by its viewers
+STREAM_PROFILES = {
+    "thumb": StreamProfile((320, 180), 5, 50),    # camera lists / large walls
+    "grid": StreamProfile((640, 360), 12, 55),    # dashboard grid tiles
+    "full": StreamProfile(STREAM_RESOLUTION, 0, JPEG_QUALITY),  # single camera view
+}
+DEFAULT_PROFILE = "full"
+
+# Colors (B, G, R)
+COLOR_RED = (0, 0, 255)      # Threat/Phone
+COLOR_GREEN = (0, 255, 0)    # Safe/Person
+COLOR_ORANGE = (0, 140, 255)  # Vehicle
+COLOR_YELLOW = (0, 215, 255)  # Bag
+COLOR_TEXT = (255, 255, 255)
+
+
+# ==========================================
+# 🛠️ HELPER FUNCTIONS
+# ==========================================
+def error_frame_jpeg(message: str) -> bytes:
+    """Render a black 640x480 frame with a red status message."""
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    cv2.putText(
+        frame, message, (30, 240),
+        cv2.FONT_HERSHEY_SIMPLEX, 0.8, COLOR_RED, 2
+    )
+    _, jpeg = cv2.imencode(".jpg", frame)
+    return jpeg.tobytes()
+
+
+def multipart_chunk(jpeg_bytes: bytes) -> bytes:
+    """Wrap one JPEG as a multipart/x-mixed-replace part."""
+    return (
+        b"--frame\r\n"
+        b"Content-Type: image/jpeg\r\n\r\n" +
+        jpeg_bytes +
+        b"\r\n"
+    )
+
+
+def create_error_frame(message: str):
+    return multipart_chunk(error_frame_jpeg(message))
+
+
+def normalize_rtsp_url(rtsp_url: str) -> str:
+    """
+    Ensure password is URL-encoded (handles 'test@2025' -> 'test%402025').
+    Safe to call even if already encoded.
+    """
+    try:
+        parts = urlsplit(rtsp_url)
+
+        if parts.username and parts.password:
+            pwd = parts.password
+
+            # If password is not already percent-encoded, encode it
+            if "%" not in pwd:
+                encoded_pwd = quote(pwd, safe="")
+                host = parts.hostname or ""
+                port = f":{parts.port}" if parts.port else ""
+                userinfo = f"{parts.username}:{encoded_pwd}@"
+                netloc = userinfo + host + port
+                normalized = urlunsplit(
+                    (parts.scheme, netloc, parts.path, parts.query, parts.fragment)
+                )
+                return normalized
+
+        return rtsp_url
+    except Exception:
+        return rtsp_url
+
+
+def add_tcp_param(rtsp_url: str) -> str:
+    """Append ?tcp or &tcp to enforce TCP at URL level, ONLY for RTSP."""
+    if not rtsp_url.lower().startswith("rtsp://"):
+        return rtsp_url
+        
+    if "tcp" in rtsp_url:
+        return rtsp_url
+    if "?" in rtsp_url:
+        return rtsp_url + "&tcp"
+    return rtsp_url + "?tcp"
+
+
+
+
+def log_debug(msg):
+    logger.info(f"[VIDEO DEBUG] {msg}")
+
+def verify_capture(cap):
+    """
+    Reads one frame to ensure the connection effectively transmits video.
+    Returns True if a frame is read successfully.
+    """
+    if not cap.isOpened():
+        return False
+    try:
+        # Try to read one frame to confirm stream is alive
+        ret, _ = cap.read()
+        return ret
+    except:
+        return False
+
+def open_capture(rtsp_url: str):
+    """
+    Standard OpenCV Capture.
+    Simplified to increase reliability.
+    """
+    log_debug(f"Attempting to open: '{rtsp_url}'")
+    
+    # 1. Webcam Index
+    if str(rtsp_url).strip().isdigit():
+        idx = int(str(rtsp_url).strip())
+        cap = cv2.VideoCapture(idx, cv2.CAP_DSHOW)
+        if cap.isOpened():
+             cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    # 2. RTSP Streams (Force TCP for Reliability)
+    # The logs showed massive H.264 packet loss ("missing picture in access unit").
+    # This confirms UDP is failing. We MUST use TCP.
+    
+    if str(rtsp_url).lower().startswith("rtsp"):
+        # Set FFmpeg options via environment variable (Standard OpenCV approach)
+        # rtsp_transport;tcp -> Force reliable transport
+        # fflags;nobuffer    -> Reduce latency
+        # max_delay;0        -> Minimize buffering
+        os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay"
+        
+        cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG)
+        if cap.isOpened():
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            # Clear env var to avoid side effects? 
+            # Actually, safe to leave or clear. We'll clear to be clean.
+            if "OPENCV_FFMPEG_CAPTURE_OPTIONS" in os.environ:
+                 del os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"]
+            return cap
+            
+        # Fallback to default if TCP fails
+        if "OPENCV_FFMPEG_CAPTURE_OPTIONS" in os.environ:
+             del os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"]
+
+    # 3. Generic Fallback
+    log_debug(f"Opening as Generic Source")
+    cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG)
+    if cap.isOpened():
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+def encode_jpeg(frame, quality: int = JPEG_QUALITY):
+    """Encode JPEG with limited quality for lighter streaming (encoder: see services/jpeg.py)."""
+    return jpeg_encoders.encode(frame, quality)
+
+# ==========================================
+# ⚡ THREADED CAMERA READER
+# ==========================================
+# ==========================================
+# ⚡ THREADED CAMERA READER (Polyglot: FFmpeg + OpenCV)
+# ==========================================
+class ThreadedCamera:
+    """
+    Reads frames in a separate thread.
+    Simplified: Uses standard OpenCV via open_capture().
+    """
+    def __init__(self, src):
+        self.src = src
+        self.cap = None 
+        self.frame = None
+        self.ret = False
+        self.stopped = False
+        self.lock = threading.Lock()
+        self.fail_count = 0
+        self.started = False
+        self.frame_id = 0  # Increments on every new frame
+        
+    def start(self):
+        t = threading.Thread(target=self.update, args=(), daemon=True)
+        t.start()
+        return self
+
+    def update(self):
+        log_debug(f"ThreadedCamera: Connecting to {self.src}...")
+        self.cap = open_capture(self.src)
+        self.started = True
+        
+        while not self.stopped:
+            # Reconnection Logic
+            if self.cap is None or not self.cap.isOpened():
+                if self.cap:
+                    self.cap.release()
+                time.sleep(1.0)
+                self.cap = open_capture(self.src)
+                if not self.cap.isOpened():
+                    self.fail_count += 1
+                    continue
+                else:
+                    self.fail_count = 0
+            
+            # Read latest frame
+            ret, frame = self.cap.read()
+            
+            with self.lock:
+                if ret and frame is not None:
+                    self.ret = True
+                    self.frame = frame
+                    self.frame_id += 1
+                    self.fail_count = 0
+                else:
+                    self.ret = False
+                    self.fail_count += 1
+                    
+            if not ret:
+                time.sleep(0.05)
+        
+        # End of loop
+        self._release()
+        log_debug("ThreadedCamera: Stopped and Released.")
+
+    def read(self):
+        with self.lock:
+            return self.ret, self.frame
+
+    def read_new(self, last_id: int):
+        """
+        Return (frame_id, frame) if a frame newer than last_id is available,
+        otherwise (last_id, None). Lets consumers skip frames they already processed.
+        """
+        with self.lock:
+            if not self.ret or self.frame_id == last_id:
+                return last_id, None
+            return self.frame_id, self.frame
+
+    def stop(self):
+        self.stopped = True
+        # Do NOT call cap.release() here. 
+        # It causes a Race Condition/Crash if read() is blocking.
+        # The update() loop will call release() when it breaks.
+
+    def _release(self):
+        """Called by the background thread when stopping."""
+        if self.cap:
+             self.cap.release()
+             self.cap = None
+
+    def is_opened(self):
+        return self.cap is not None and self.cap.isOpened()
+        
+    def get_fail_count(self):
+        return self.fail_count
@@ -1,95 +1,736 @@
+import ast
+import json
 import logging
-from typing import List, Tuple, Optional
+import math
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Tuple, Optional, Sequence, Union
+
+import cv2
 import numpy as np
-from ultralytics import YOLO
+
+from app.core.config import settings
+from app.services.camera import STREAM_RESOLUTION
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+CONFIDENCE_THRESHOLD = 0.4
+IOU_THRESHOLD = 0.7          # NMS IoU (ultralytics default)
+MAX_DETECTIONS = 300
+
+# Exported model formats and their file suffix (ultralytics export names)
+EXPORT_SUFFIXES = {
+    "torchscript": ".torchscript",
+    "onnx": ".onnx",
+}
+
+# Raw backend output: xyxy (N, 4) float32, conf (N,) float32, cls (N,) int
+RawDetections = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+# Detection labels and the model class names each one covers (matched as whole
+# words, so "phone" matches "cell phone"). Cameras pick a subset via
+# Camera.detect_classes, e.g. "vehicle" for a parking lot camera.
+LABEL_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "phone": ("phone",),
+    "person": ("person",),
+    "vehicle": ("car", "truck", "bus", "motorcycle", "bicycle"),
+    "bag": ("backpack", "handbag", "suitcase"),
+}
+DEFAULT_LABELS = ("person", "phone")
+
+# Label codes stored in detections["label"]; LABEL_NAMES maps them back to strings.
+# A lower code wins when a model class matches several labels.
+LABEL_NAMES = ("",) + tuple(LABEL_GROUPS)
+LABEL_NONE, LABEL_PHONE, LABEL_PERSON, LABEL_VEHICLE, LABEL_BAG = range(len(LABEL_NAMES))
+
+# ObjectDetector.detect() output: one packed 21-byte record per detection
+DETECTION_DTYPE = np.dtype([
+    ("x1", np.int32),
+    ("y1", np.int32),
+    ("x2", np.int32),
+    ("y2", np.int32),
+    ("label", np.uint8),
+    ("conf", np.float32),
+])
+
+
+def empty_detections() -> np.ndarray:
+    return np.zeros((0,), dtype=DETECTION_DTYPE)
+
+
+def to_tuples(detections: np.ndarray) -> List[Tuple[int, int, int, int, str, float]]:
+    """Structured detections -> the old [(x1, y1, x2, y2, label, conf), ...] list."""
+    return [
+        (x1, y1, x2, y2, LABEL_NAMES[code], conf)
+        for x1, y1, x2, y2, code, conf in detections.tolist()
+    ]
+
+
+def empty_raw() -> RawDetections:
+    return (
+        np.zeros((0, 4), dtype=np.float32),
+        np.zeros((0,), dtype=np.float32),
+        np.zeros((0,), dtype=np.int64),
+    )
+
+
+def parse_labels(value: Optional[str]) -> Tuple[str, ...]:
+    """'person, vehicle' -> ('person', 'vehicle'). Empty -> DEFAULT_LABELS; unknown names are dropped."""
+    if not value or not value.strip():
+        return DEFAULT_LABELS
+    labels = []
+    for name in value.split(","):
+        name = name.strip().lower()
+        if not name or name in labels:
+            continue
+        if name not in LABEL_GROUPS:
+            logger.warning(f"⚠️ Unknown detection label '{name}' (known: {', '.join(LABEL_GROUPS)})")
+            continue
+        labels.append(name)
+    return tuple(labels) or DEFAULT_LABELS
+
+
+def class_name_matches(class_name: str, label: str) -> bool:
+    words = re.split(r"[\s_\-]+", str(class_name).lower())
+    return any(term in words for term in LABEL_GROUPS[label])
+
+
+class ClassFilter:
+    """Model class ids to keep for a set of labels, and the class id -> label code LUT."""
+
+    def __init__(self, class_ids: np.ndarray, lut: np.ndarray):
+        self.class_ids = class_ids
+        self.lut = lut
+
+
+class RegionOfInterest:
+    """
+    Camera detection zone: a polygon in normalized [0, 1] (x, y) frame
+    coordinates, stored as JSON in Camera.roi. Inference only sees the
+    polygon's bounding box and detections whose center falls outside the
+    polygon are dropped.
+    """
+
+    def __init__(self, points: Sequence[Sequence[float]]):
+        self.points = np.clip(np.asarray(points, dtype=np.float32), 0.0, 1.0)
+        self._cache_key = None
+        self._box = (0, 0, 0, 0)
+        self._mask = None
+
+    @classmethod
+    def parse(cls, value: Optional[str]) -> Optional["RegionOfInterest"]:
+        """Camera.roi JSON -> RegionOfInterest, or None if unset/invalid."""
+        if not value:
+            return None
+        try:
+            points = json.loads(value)
+            if len(points) < 3 or any(len(p) != 2 for p in points):
+                raise ValueError("need at least 3 [x, y] points")
+            return cls(points)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring invalid ROI {value!r}: {e}")
+            return None
+
+    def _prepare(self, frame_w: int, frame_h: int):
+        """Pixel bounding box + polygon mask for this frame size (cached)."""
+        if self._cache_key == (frame_w, frame_h):
+            return
+        pixels = np.round(self.points * [frame_w, frame_h]).astype(np.int32)
+        x1, y1 = pixels.min(axis=0)
+        x2, y2 = pixels.max(axis=0)
+        x2, y2 = max(x2, x1 + 1), max(y2, y1 + 1)
+        mask = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+        cv2.fillPoly(mask, [pixels - [x1, y1]], 1)
+        self._box = (int(x1), int(y1), int(x2), int(y2))
+        self._mask = mask
+        self._cache_key = (frame_w, frame_h)
+
+    def crop_box(self, frame_w: int, frame_h: int) -> Tuple[int, int, int, int]:
+        self._prepare(frame_w, frame_h)
+        return self._box
+
+    def contains(self, xs: np.ndarray, ys: np.ndarray, frame_w: int, frame_h: int) -> np.ndarray:
+        """Vectorized point-in-polygon test for frame pixel coordinates."""
+        self._prepare(frame_w, frame_h)
+        x1, y1, x2, y2 = self._box
+        cx = np.clip(xs.astype(np.int64) - x1, 0, x2 - x1 - 1)
+        cy = np.clip(ys.astype(np.int64) - y1, 0, y2 - y1 - 1)
+        inside = (xs >= x1) & (xs < x2) & (ys >= y1) & (ys < y2)
+        return inside & (self._mask[cy, cx] > 0)
+
+
+def stream_input_shape(imgsz: int, frame_size: Tuple[int, int] = STREAM_RESOLUTION) -> Tuple[int, int]:
+    """
+    (h, w) model input for frames of frame_size: long side imgsz, short side
+    rounded up to the stride (32). For 854x480 at 640 this is 384x640, which
+    avoids running the network on the padding a square 640x640 input needs.
+    """
+    w, h = frame_size
+    scale = imgsz / max(w, h)
+    return (
+        int(math.ceil(h * scale / 32) * 32),
+        int(math.ceil(w * scale / 32) * 32),
+    )
+
+
+def roi_input_size(imgsz: int, crop_w: int, crop_h: int) -> int:
+    """Model input size for an ROI crop: never upscale a small crop past its native size."""
+    native = int(math.ceil(max(crop_w, crop_h) / 32) * 32)
+    return max(32, min(imgsz, native))
+
+
+def export_model(model_path: str, model_format: str, imgsz: Union[int, Tuple[int, int]]) -> str:
+    """
+    Return the exported model next to model_path, exporting it through
+    ultralytics on first use. Raises if the export is not possible.
+    ONNX exports get dynamic height/width so per-camera input sizes work.
+    """
+    exported = Path(model_path).with_suffix(EXPORT_SUFFIXES[model_format])
+    if exported.exists():
+        return str(exported)
+
+    logger.info(f"🔧 Exporting {model_path} to {model_format} (imgsz={imgsz})...")
+    from ultralytics import YOLO
+    return str(YOLO(model_path).export(format=model_format, imgsz=imgsz, dynamic=model_format == "onnx"))
+
+
+# ==========================================
+# 🔌 INFERENCE BACKENDS
+# ==========================================
+class InferenceBackend(ABC):
+    """
+    Runs the model on one BGR frame.
+    Implementations expose `names` ({class_id: name}), `device`,
+    `loaded_path` and `fixed_shape`, and return RawDetections in frame
+    coordinates.
+    """
+    name = "base"
+
+    def __init__(self):
+        self.names: Dict[int, str] = {}
+        self.device = "cpu"
+        self.loaded_path: Optional[str] = None
+        self.fixed_shape = False  # True if the model ignores the per-call imgsz
+
+    @abstractmethod
+    def predict(
+        self,
+        frame: np.ndarray,
+        conf_threshold: float,
+        classes: Optional[np.ndarray] = None,
+        imgsz: Optional[int] = None,
+    ) -> RawDetections:
+        """
+        Detections of the given class ids only (all classes if None), filtered
+        before NMS. imgsz is the long side of the model input for this call.
+        """
+
+
+class UltralyticsBackend(InferenceBackend):
+    """PyTorch (or exported TorchScript/ONNX) model run through ultralytics."""
+    name = "ultralytics"
+
+    def __init__(self, model_path: str, model_format: str = "pt", imgsz: int = 640):
+        super().__init__()
+        # Imported here so that importing the API never pulls in torch
+        from ultralytics import YOLO
+
+        self.imgsz = imgsz
+        path = self._resolve_model_path(model_path, model_format.lower(), imgsz)
+        logger.info(f"🔁 Loading YOLOv8 model ({path})...")
+        try:
+            self.model = YOLO(path, task="detect")
+        except Exception as e:
+            if path == model_path:
+                raise
+            logger.warning(f"⚠️ Could not load {path} ({e}). Falling back to .pt model.")
+            path = model_path
+            self.model = YOLO(path)
+        self.loaded_path = path
+        if path != model_path:
+            # Exported graphs are run at the shape they were traced with
+            self.imgsz = stream_input_shape(imgsz)
+            self.fixed_shape = True
+        self.names = dict(self.model.names)
+
+        # 🚀 Auto-detect Device: Try GPU first
+        try:
+            import torch
+            if torch.cuda.is_available():
+                logger.info(f"✅ CUDA Detected: {torch.cuda.get_device_name(0)}")
+                self.device = 0
+            else:
+                logger.warning("⚠️ CUDA not available, falling back to CPU.")
+                self.device = 'cpu'
+        except ImportError:
+            logger.warning("⚠️ Torch not found (how?), using CPU.")
+            self.device = 'cpu'
+        except Exception as e:
+            logger.warning(f"⚠️ Error checking CUDA: {e}. Using CPU.")
+            self.device = 'cpu'
+
+    @staticmethod
+    def _resolve_model_path(model_path: str, model_format: str, imgsz: int) -> str:
+        """Pick the exported file for the configured format, falling back to the .pt model."""
+        if model_format not in EXPORT_SUFFIXES:
+            if model_format != "pt":
+                logger.warning(f"⚠️ Unknown model format '{model_format}', using .pt")
+            return model_path
+        try:
+            return export_model(model_path, model_format, stream_input_shape(imgsz))
+        except Exception as e:
+            logger.warning(f"⚠️ Export to {model_format} failed ({e}). Falling back to .pt model.")
+            return model_path
+
+    def _run(self, frame: np.ndarray, conf_threshold: float, classes: Optional[List[int]], imgsz):
+        return self.model(
+            frame,
+            conf=conf_threshold,
+            imgsz=imgsz,
+            classes=classes,
+            verbose=False,
+            device=self.device,
+        )
+
+    def predict(
+        self,
+        frame: np.ndarray,
+        conf_threshold: float,
+        classes: Optional[np.ndarray] = None,
+        imgsz: Optional[int] = None,
+    ) -> RawDetections:
+        class_list = classes.tolist() if classes is not None else None
+        size = self.imgsz if self.fixed_shape or not imgsz else imgsz
+        try:
+            results = self._run(frame, conf_threshold, class_list, size)
+        except Exception as e:
+            # Fallback on runtime error (e.g. CUDA OOM of sudden failure)
+            if self.device == 'cpu':
+                raise
+            print(f"⚠️ GPU Inference failed ({e}). Switching to CPU.")
+            self.device = 'cpu'
+            results = self._run(frame, conf_threshold, class_list, size)
+
+        # One device -> host copy: data is (N, 6) = x1, y1, x2, y2, conf, cls
+        data = results[0].boxes.data.cpu().numpy()
+        return data[:, :4], data[:, 4], data[:, 5].astype(np.int64)
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """
+    Exported YOLOv8 ONNX model on onnxruntime (CPU), with numpy letterbox
+    pre-processing and NMS. No torch needed at runtime.
+    """
+    name = "onnxruntime"
+
+    def __init__(
+        self,
+        model_path: str,
+        imgsz: int = 640,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 1,
+    ):
+        super().__init__()
+        import onnxruntime as ort
+
+        if model_path.endswith(".onnx"):
+            path = model_path
+        else:
+            path = export_model(model_path, "onnx", stream_input_shape(imgsz))
+        logger.info(f"🔁 Loading ONNX model ({path}) on onnxruntime...")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = intra_op_threads or (os.cpu_count() or 1)
+        options.inter_op_num_threads = inter_op_threads
+
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.loaded_path = path
+
+        # Fixed-shape graphs always get their own size; dynamic ones are
+        # fed a stride-aligned rectangle sized for each frame / ROI crop
+        shape = self.session.get_inputs()[0].shape
+        self.imgsz = imgsz
+        self.fixed_shape = isinstance(shape[2], int) and isinstance(shape[3], int)
+        self.input_h = shape[2] if isinstance(shape[2], int) else imgsz
+        self.input_w = shape[3] if isinstance(shape[3], int) else imgsz
+
+        meta = self.session.get_modelmeta().custom_metadata_map
+        try:
+            self.names = {int(k): v for k, v in ast.literal_eval(meta["names"]).items()}
+        except (KeyError, ValueError, SyntaxError):
+            logger.warning("⚠️ ONNX model has no class names metadata; using numeric labels.")
+            self.names = {}
+
+    def _input_shape(self, frame: np.ndarray, imgsz: Optional[int]) -> Tuple[int, int]:
+        if self.fixed_shape:
+            return self.input_h, self.input_w
+        h, w = frame.shape[:2]
+        return stream_input_shape(imgsz or self.imgsz, (w, h))
+
+    def _letterbox(self, frame: np.ndarray, input_h: int, input_w: int):
+        """Resize keeping aspect ratio and pad to the model input (gray 114 borders)."""
+        h, w = frame.shape[:2]
+        gain = min(input_h / h, input_w / w)
+        new_w, new_h = int(round(w * gain)), int(round(h * gain))
+        pad_x = (input_w - new_w) / 2
+        pad_y = (input_h - new_h) / 2
+
+        resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+        left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+        padded = cv2.copyMakeBorder(resized, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+        return padded, gain, (left, top)
+
+    def preprocess(self, frame: np.ndarray, imgsz: Optional[int] = None):
+        """BGR frame -> (1, 3, H, W) float32 input blob, gain and (pad_x, pad_y)."""
+        img, gain, pad = self._letterbox(frame, *self._input_shape(frame, imgsz))
+
+        # BGR HWC uint8 -> RGB NCHW float32 [0, 1]
+        blob = np.ascontiguousarray(img[:, :, ::-1].transpose(2, 0, 1), dtype=np.float32)
+        blob /= 255.0
+        return blob[None], gain, pad
+
+    def predict(
+        self,
+        frame: np.ndarray,
+        conf_threshold: float,
+        classes: Optional[np.ndarray] = None,
+        imgsz: Optional[int] = None,
+    ) -> RawDetections:
+        blob, gain, (pad_x, pad_y) = self.preprocess(frame, imgsz)
+        output = self.session.run(None, {self.input_name: blob})[0]
+
+        # (1, 4 + num_classes, N) -> (N, 4 + num_classes)
+        preds = output[0].T
+        scores = preds[:, 4:]
+        if classes is not None:
+            # Only score the wanted classes; everything else never reaches NMS
+            scores = scores[:, classes]
+        best = scores.argmax(axis=1)
+        conf = scores[np.arange(len(best)), best]
+        cls = classes[best] if classes is not None else best
+
+        keep = conf >= conf_threshold
+        if not keep.any():
+            return empty_raw()
+        preds, cls, conf = preds[keep], cls[keep], conf[keep]
+
+        # cx, cy, w, h (letterboxed) -> x1, y1, x2, y2 (frame)
+        xyxy = np.empty((len(preds), 4), dtype=np.float32)
+        half_w, half_h = preds[:, 2] / 2, preds[:, 3] / 2
+        xyxy[:, 0] = preds[:, 0] - half_w
+        xyxy[:, 1] = preds[:, 1] - half_h
+        xyxy[:, 2] = preds[:, 0] + half_w
+        xyxy[:, 3] = preds[:, 1] + half_h
+        xyxy[:, [0, 2]] -= pad_x
+        xyxy[:, [1, 3]] -= pad_y
+        xyxy /= gain
+        h, w = frame.shape[:2]
+        xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, w)
+        xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, h)
+
+        keep = nms(xyxy, conf, cls, IOU_THRESHOLD)[:MAX_DETECTIONS]
+        return xyxy[keep], conf[keep].astype(np.float32), cls[keep].astype(np.int64)
+
+
+def nms(xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Class-aware greedy NMS. Boxes are offset per class so that different
+    classes never suppress each other. Returns kept indices, best first.
+    """
+    if len(xyxy) == 0:
+        return np.zeros((0,), dtype=np.int64)
+
+    boxes = xyxy + (cls.astype(np.float32) * 4096.0)[:, None]
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = conf.argsort()[::-1]
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        xx1 = np.maximum(x1[i], x1[rest])
+        yy1 = np.maximum(y1[i], y1[rest])
+        xx2 = np.minimum(x2[i], x2[rest])
+        yy2 = np.minimum(y2[i], y2[rest])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-7)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def quantized_model_path(model_path: str) -> str:
+    """Where scripts/quantize_model.py writes the INT8 model: yolov8n.pt -> yolov8n.int8.onnx"""
+    return str(Path(model_path).with_suffix(".int8.onnx"))
+
+
+def create_backend(
+    backend: str,
+    model_path: str,
+    model_format: str = "pt",
+    imgsz: int = 640,
+    precision: str = "fp32",
+) -> InferenceBackend:
+    """Build the configured backend, falling back to ultralytics if onnxruntime is unusable."""
+    backend = backend.lower()
+
+    if precision.lower() == "int8" and not model_path.endswith(".onnx"):
+        # INT8 models are ONNX (QDQ / integer ops) and only run on onnxruntime
+        quantized = quantized_model_path(model_path)
+        if os.path.exists(quantized):
+            backend, model_path = "onnxruntime", quantized
+        else:
+            logger.warning(
+                f"⚠️ DETECTOR_PRECISION=int8 but {quantized} does not exist "
+                f"(create it with scripts/quantize_model.py). Using fp32."
+            )
+    elif precision.lower() not in ("fp32", "int8"):
+        logger.warning(f"⚠️ Unknown detector precision '{precision}', using fp32.")
+
+    if backend == "onnxruntime":
+        try:
+            return OnnxRuntimeBackend(
+                model_path,
+                imgsz=imgsz,
+                intra_op_threads=settings.DETECTOR_ORT_INTRA_THREADS,
+                inter_op_threads=settings.DETECTOR_ORT_INTER_THREADS,
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ onnxruntime backend unavailable ({e}). Falling back to ultralytics.")
+    elif backend != "ultralytics":
+        logger.warning(f"⚠️ Unknown detector backend '{backend}', using ultralytics.")
+    return UltralyticsBackend(model_path, model_format, imgsz)
+
+
+# ==========================================
+# 🎯 OBJECT DETECTOR
+# ==========================================
 class ObjectDetector:
-    def __init__(self, model_path: str = "ai_models/yolov8n.pt", conf_threshold: float = 0.4):
+    def __init__(
+        self,
+        model_path: str = "ai_models/yolov8n.pt",
+        conf_threshold: float = CONFIDENCE_THRESHOLD,
+        model_format: str = "pt",
+        imgsz: int = 640,
+        backend: str = "ultralytics",
+        precision: str = "fp32",
+    ):
         self.model_path = model_path
         self.conf_threshold = conf_threshold
-        self.model = None
-        self.device = 'cpu' # Default to CPU
-        self.phone_class_ids = []
-        self.person_class_ids = []
+        self.model_format = model_format
+        self.imgsz = imgsz
+        self.backend_name = backend
+        self.precision = precision
+        self.backend: Optional[InferenceBackend] = None
+        self.label_class_ids: Dict[str, List[int]] = {}
+        self._filters: Dict[Tuple[str, ...], ClassFilter] = {}
         self._load_model()
 
+    @property
+    def device(self):
+        return self.backend.device if self.backend else 'cpu'
+
+    @property
+    def loaded_path(self) -> Optional[str]:
+        return self.backend.loaded_path if self.backend else None
+
     def _load_model(self):
-        """Load the YOLO model and identify class IDs for people and phones."""
-        logger.info(f"🔁 Loading YOLOv8 model ({self.model_path})...")
+        """Load the inference backend and identify the model class IDs of every label."""
         try:
-            self.model = YOLO(self.model_path)
-            
-            # 🚀 Auto-detect Device: Try GPU first
-            try:
-                import torch
-                if torch.cuda.is_available():
-                    logger.info(f"✅ CUDA Detected: {torch.cuda.get_device_name(0)}")
-                    self.device = 0
-                else:
-                    logger.warning("⚠️ CUDA not available, falling back to CPU.")
-                    self.device = 'cpu'
-            except ImportError:
-                logger.warning("⚠️ Torch not found (how?), using CPU.")
-                self.device = 'cpu'
-            except Exception as e:
-                logger.warning(f"⚠️ Error checking CUDA: {e}. Using CPU.")
-                self.device = 'cpu'
-
-            logger.info(f"🚀 Object Detector initialized on device: {self.device}")
+            self.backend = create_backend(
+                self.backend_name, self.model_path, self.model_format, self.imgsz, self.precision
+            )
+            logger.info(f"🚀 Object Detector initialized: {self.backend.name} on device {self.device}")
 
             # Identify relevant class IDs from the model's names
-            self.phone_class_ids = [
-                id for id, name in self.model.names.items() 
-                if "phone" in str(name).lower()
-            ]
-            self.person_class_ids = [
-                id for id, name in self.model.names.items() 
-                if "person" in str(name).lower()
-            ]
+            self.label_class_ids = {
+                label: [
+                    id for id, name in self.backend.names.items()
+                    if class_name_matches(name, label)
+                ]
+                for label in LABEL_GROUPS
+            }
         except Exception as e:
             logger.error(f"🔥 Error loading model: {e}")
-            self.model = None
-            self.phone_class_ids = []
-            self.person_class_ids = []
-            self.device = 'cpu'
+            self.backend = None
+            self.label_class_ids = {}
+        self._filters = {}
+
+    def class_filter(self, labels: Sequence[str] = DEFAULT_LABELS) -> ClassFilter:
+        """Class ids to run for these labels plus their LUT (cached per label set)."""
+        key = tuple(labels)
+        cached = self._filters.get(key)
+        if cached is not None:
+            return cached
+
+        size = max(self.backend.names, default=0) + 1 if self.backend else 1
+        lut = np.zeros((size,), dtype=np.uint8)
+        # Highest code first so that lower codes (phone before person) win overlaps
+        for code in range(len(LABEL_NAMES) - 1, LABEL_NONE, -1):
+            if LABEL_NAMES[code] in key:
+                lut[self.label_class_ids.get(LABEL_NAMES[code], [])] = code
 
-    def detect(self, frame: np.ndarray) -> List[Tuple[int, int, int, int, str, float]]:
+        class_filter = ClassFilter(np.flatnonzero(lut).astype(np.int64), lut)
+        self._filters[key] = class_filter
+        return class_filter
+
+    def warmup(self, runs: int = 2, frame_size: Tuple[int, int] = STREAM_RESOLUTION):
         """
-        Run inference on a frame and return a list of detections.
+        Run dummy inferences so lazy CUDA/cuDNN or CPU kernel initialization
+        happens now instead of on the first frames of a stream.
         """
-        if self.model is None:
-            return []
+        if self.backend is None or runs <= 0:
+            return
+
+        w, h = frame_size
+        dummy = np.zeros((h, w, 3), dtype=np.uint8)
+        classes = self.class_filter().class_ids
+        for i in range(runs):
+            started = time.perf_counter()
+            try:
+                self.backend.predict(dummy, self.conf_threshold, classes)
+            except Exception as e:
+                logger.warning(f"⚠️ Warm-up inference failed: {e}")
+                return
+            logger.info(f"🔥 Warm-up run {i + 1}/{runs}: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def detect(
+        self,
+        frame: np.ndarray,
+        labels: Sequence[str] = DEFAULT_LABELS,
+        roi: Optional[RegionOfInterest] = None,
+        imgsz: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        Run inference on a frame and return the detections of the given labels
+        as a DETECTION_DTYPE array (use to_tuples() for the old list of tuples).
+        Only the model classes behind those labels go through NMS.
+
+        With an roi only its bounding box is inferred (at imgsz, or the crop's
+        native size if smaller) and boxes centered outside the polygon are
+        dropped. imgsz overrides the model input size for this call.
+        """
+        if self.backend is None:
+            return empty_detections()
+
+        class_filter = self.class_filter(labels)
+        if len(class_filter.class_ids) == 0:
+            return empty_detections()
+
+        frame_h, frame_w = frame.shape[:2]
+        size = imgsz or self.imgsz
+        region, off_x, off_y = frame, 0, 0
+        if roi is not None:
+            x1, y1, x2, y2 = roi.crop_box(frame_w, frame_h)
+            region, off_x, off_y = frame[y1:y2, x1:x2], x1, y1
+            size = roi_input_size(size, x2 - x1, y2 - y1)
 
-        # Use the determined device
         try:
-            results = self.model(frame, conf=self.conf_threshold, verbose=False, device=self.device)
+            xyxy, confs, classes = self.backend.predict(
+                region, self.conf_threshold, class_filter.class_ids, size
+            )
         except Exception as e:
-            # Fallback on runtime error (e.g. CUDA OOM of sudden failure)
-            if self.device != 'cpu':
-                print(f"⚠️ GPU Inference failed ({e}). Switching to CPU.")
-                self.device = 'cpu'
-                results = self.model(frame, conf=self.conf_threshold, verbose=False, device='cpu')
-            else:
-                return []
-                
-        detections = []
-
-        for r in results:
-            for box in r.boxes:
-                cls_id = int(box.cls[0])
-                conf = float(box.conf[0])
-                
-                label = None
-                if cls_id in self.phone_class_ids:
-                    label = "phone"
-                elif cls_id in self.person_class_ids:
-                    label = "person"
-                
-                if label:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    detections.append((x1, y1, x2, y2, label, conf))
-        
+            print(f"⚠️ Inference failed: {e}")
+            return empty_detections()
+
+        if off_x or off_y:
+            xyxy = xyxy + np.array([off_x, off_y, off_x, off_y], dtype=xyxy.dtype)
+
+        # Class ids -> label codes in one lookup; ids outside the LUT are ignored
+        lut = class_filter.lut
+        in_range = (classes >= 0) & (classes < len(lut))
+        codes = np.zeros(len(classes), dtype=np.uint8)
+        codes[in_range] = lut[classes[in_range]]
+        keep = codes != LABEL_NONE
+        if roi is not None:
+            keep &= roi.contains(
+                (xyxy[:, 0] + xyxy[:, 2]) / 2, (xyxy[:, 1] + xyxy[:, 3]) / 2, frame_w, frame_h
+            )
+
+        detections = np.empty(int(keep.sum()), dtype=DETECTION_DTYPE)
+        coords = xyxy[keep].astype(np.int32)  # truncates like int()
+        detections["x1"] = coords[:, 0]
+        detections["y1"] = coords[:, 1]
+        detections["x2"] = coords[:, 2]
+        detections["y2"] = coords[:, 3]
+        detections["label"] = codes[keep]
+        detections["conf"] = confs[keep]
         return detections
+
+
+# ==========================================
+# 🧠 SHARED DETECTOR (lazy)
+# ==========================================
+_detector: Optional[ObjectDetector] = None
+_detector_lock = threading.Lock()
+_loading = False
+_load_seconds: Optional[float] = None
+_warmup_thread: Optional[threading.Thread] = None
+_warmup_lock = threading.Lock()
+
+
+def get_detector() -> ObjectDetector:
+    """Return the process-wide detector, loading the model on first use (blocking)."""
+    global _detector, _loading, _load_seconds
+    if _detector is not None:
+        return _detector
+
+    with _detector_lock:
+        if _detector is None:
+            _loading = True
+            started = time.perf_counter()
+            try:
+                detector = ObjectDetector(
+                    model_path=settings.DETECTOR_MODEL_PATH,
+                    conf_threshold=CONFIDENCE_THRESHOLD,
+                    model_format=settings.DETECTOR_FORMAT,
+                    imgsz=settings.DETECTOR_IMGSZ,
+                    backend=settings.DETECTOR_BACKEND,
+                    precision=settings.DETECTOR_PRECISION,
+                )
+                detector.warmup(settings.DETECTOR_WARMUP_RUNS)
+                _detector = detector
+            finally:
+                _loading = False
+                _load_seconds = time.perf_counter() - started
+            logger.info(f"[INFO] Detector ready in {_load_seconds:.2f}s")
+    return _detector
+
+
+def peek_detector() -> Optional[ObjectDetector]:
+    """Return the detector if it is already loaded, otherwise start loading it and return None."""
+    if _detector is None:
+        start_detector_warmup()
+    return _detector
+
+
+def start_detector_warmup() -> threading.Thread:
+    """Load the model in a background thread so startup never blocks on torch. Idempotent."""
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=get_detector, name="detector-warmup", daemon=True)
+            _warmup_thread.start()
+        return _warmup_thread
+
+
+def detector_status() -> dict:
+    """Model readiness for /api/health."""
+    return {
+        "ready": _detector is not None and _detector.backend is not None,
+        "backend": _detector.backend.name if _detector and _detector.backend else None,
+        "loading": _loading,
+        "device": str(_detector.device) if _detector else None,
+        "model": _detector.loaded_path if _detector else None,
+        "load_seconds": round(_load_seconds, 2) if _load_seconds is not None else None,
+    }
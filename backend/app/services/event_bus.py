@@ -0,0 +1,161 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Handler = Union[
+    Callable[[Dict[str, Any]], Awaitable[None]],
+    Callable[[Dict[str, Any]], None],
+]
+
+
+class EventBus(ABC):
+    """
+    Fan-out channel for live events (new detections, API-created events).
+
+    publish() is thread-safe so it can be called both from async endpoints
+    and from the blocking video threads. Async subscribers run on the event
+    loop they were registered from; plain callables run in the publishing
+    (or listener) thread and must not block.
+    """
+
+    # True when publish() reaches subscribers in other processes
+    shared = False
+
+    def __init__(self) -> None:
+        self._subscribers: List[Tuple[Handler, Optional[asyncio.AbstractEventLoop]]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, handler: Handler) -> None:
+        """Register a handler. Async handlers must be registered from a running event loop."""
+        loop = asyncio.get_running_loop() if asyncio.iscoroutinefunction(handler) else None
+        with self._lock:
+            self._subscribers.append((handler, loop))
+        self._on_subscribe()
+
+    def unsubscribe(self, handler: Handler) -> None:
+        with self._lock:
+            self._subscribers = [(h, l) for h, l in self._subscribers if h is not handler]
+
+    @abstractmethod
+    def publish(self, message: Dict[str, Any]) -> None:
+        """Deliver message to every subscriber (of every process, for shared buses)."""
+
+    def close(self) -> None:
+        """Release broker connections / background threads."""
+
+    def _on_subscribe(self) -> None:
+        """Hook for backends that need to start listening lazily."""
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for handler, loop in subscribers:
+            if loop is None:
+                try:
+                    handler(message)
+                except Exception as e:
+                    logger.warning(f"⚠️ Event bus handler failed: {e}")
+                continue
+            if loop.is_closed():
+                continue
+            asyncio.run_coroutine_threadsafe(handler(message), loop)
+
+
+class InProcessEventBus(EventBus):
+    """Default bus: delivers only to subscribers inside this process."""
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        self._dispatch(message)
+
+
+class RedisEventBus(EventBus):
+    """
+    Bus backed by a Redis-compatible broker (Redis, Valkey, KeyDB ...).
+    Every uvicorn worker subscribes to the same channel, so an event
+    published by any worker reaches the WebSocket clients of all of them.
+    """
+
+    shared = True
+
+    def __init__(self, url: str, channel: str) -> None:
+        super().__init__()
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "EVENT_BUS_URL points to a Redis broker but the 'redis' package "
+                "is not installed (pip install redis)."
+            ) from e
+
+        self.channel = channel
+        self._client = redis.Redis.from_url(url)
+        self._listener = None
+        self._stopped = threading.Event()
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        try:
+            self._client.publish(self.channel, json.dumps(message, default=str))
+        except Exception as e:
+            logger.warning(f"⚠️ Event bus publish failed: {e}")
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._listener:
+            self._listener.join(timeout=2.0)
+            self._listener = None
+
+    def _on_subscribe(self) -> None:
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, daemon=True)
+            self._listener.start()
+
+    def _listen(self) -> None:
+        while not self._stopped.is_set():
+            pubsub = None
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                logger.info(f"[INFO] Event bus subscribed to '{self.channel}'")
+
+                while not self._stopped.is_set():
+                    item = pubsub.get_message(timeout=1.0)
+                    if not item or item.get("type") != "message":
+                        continue
+                    try:
+                        message = json.loads(item["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    self._dispatch(message)
+            except Exception as e:
+                # Broker restarted / unreachable: back off and resubscribe
+                logger.warning(f"⚠️ Event bus connection error: {e}. Reconnecting...")
+                time.sleep(1.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+
+def create_event_bus(url: str) -> EventBus:
+    scheme = url.split("://", 1)[0].lower() if "://" in url else url.lower()
+
+    if scheme in ("", "memory"):
+        return InProcessEventBus()
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisEventBus(url, settings.EVENT_BUS_CHANNEL)
+
+    raise ValueError(f"Unsupported EVENT_BUS_URL scheme: '{scheme}'")
+
+
+event_bus = create_event_bus(settings.EVENT_BUS_URL)
@@ -0,0 +1,203 @@
+# app/services/event_lifecycle.py
+"""
+Event lifecycle for one camera.
+
+An event is one row per presence, not one row per detection: it is opened
+(with a single snapshot, shared with earlier events when near-identical, see
+snapshot_store) when a tracked object of its type appears, updated in place
+with the peak confidence / count while objects remain, and closed with
+ended_at once none have been seen for EVENT_CLOSE_GRACE seconds.
+
+With a Recorder, every opened event also gets a pre/post-roll video clip
+(Event.clip_path), attached once the post-roll has been recorded. With a
+FrameRingBuffer, the buffered lead-up is saved as Event.preroll_path.
+
+Bus messages: {"type": "new_event"} on open, {"type": "event_updated"} on
+periodic updates, on close and when the clip is attached. Both carry the
+full EventRead payload.
+"""
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import all_models as models
+from app.schemas import all_schemas as schemas
+from app.services.event_bus import event_bus
+from app.services.preroll import save_preroll
+from app.services.snapshot_store import store_snapshot
+
+EVENT_UPDATE_INTERVAL = 10.0  # seconds between in-place updates of an open event
+EVENT_CLOSE_GRACE = 5.0       # seconds without objects before an event is closed
+
+STATUS_OPEN = "open"
+STATUS_CLOSED = "closed"
+
+
+class _OpenEvent:
+    def __init__(self, event_id: int, label: str, now: datetime, conf: float, count: int):
+        self.event_id = event_id
+        self.label = label
+        self.peak_conf = conf
+        self.peak_count = count
+        self.last_seen = now
+        self.last_flush = now
+        self.dirty = False
+
+
+def describe(label: str, peak_count: int) -> str:
+    return f"Detected: {peak_count} {label}s (peak)"
+
+
+def attach_media(event_id: int, field: str, path: str):
+    """Store a finished clip/pre-roll on its event (called from a writer thread)."""
+    db = SessionLocal()
+    try:
+        event = db.get(models.Event, event_id)
+        if event is None:
+            return  # Deleted from the UI meanwhile
+        setattr(event, field, path)
+        db.commit()
+        event_bus.publish({
+            "type": "event_updated",
+            "event": schemas.EventRead.model_validate(event).model_dump(mode="json"),
+        })
+    finally:
+        db.close()
+
+
+class EventLifecycle:
+    """Open/update/close events of one camera. Owned by its pipeline thread."""
+
+    def __init__(self, camera_id: str, media_dir: Path, recorder=None, preroll=None):
+        self.camera_id = camera_id
+        self.media_dir = media_dir
+        self.recorder = recorder  # Optional[Recorder]: clips for opened events
+        self.preroll = preroll    # Optional[FrameRingBuffer]: lead-up for opened events
+        self._open: Dict[str, _OpenEvent] = {}
+
+    def close_stale(self, db):
+        """Close events left open by a previous run of this camera's pipeline."""
+        stale = (
+            db.query(models.Event)
+            .filter(models.Event.camera_id == self.camera_id, models.Event.status == STATUS_OPEN)
+            .all()
+        )
+        for event in stale:
+            event.status = STATUS_CLOSED
+            event.ended_at = event.ended_at or event.started_at
+        if stale:
+            db.commit()
+            print(f"🧹 Closed {len(stale)} stale open event(s) for {self.camera_id}")
+
+    def observe(self, db, snapshot: Callable[[], Optional[bytes]], presence: Dict[str, tuple]):
+        """
+        presence: {event_type: (label, count, best_conf)} for the object types
+        currently tracked (count > 0). Call once per processed frame.
+        snapshot() returns the frame's JPEG; it is only called when an event opens.
+        """
+        now = datetime.utcnow()
+
+        for event_type, (label, count, conf) in presence.items():
+            state = self._open.get(event_type)
+            if state is None:
+                self._open_event(db, snapshot, now, event_type, label, count, conf)
+                continue
+            state.last_seen = now
+            if conf > state.peak_conf or count > state.peak_count:
+                state.peak_conf = max(state.peak_conf, conf)
+                state.peak_count = max(state.peak_count, count)
+                state.dirty = True
+
+        for event_type, state in list(self._open.items()):
+            if event_type in presence:
+                if state.dirty and (now - state.last_flush).total_seconds() >= EVENT_UPDATE_INTERVAL:
+                    self._write(db, state, now)
+            elif (now - state.last_seen).total_seconds() >= EVENT_CLOSE_GRACE:
+                self._write(db, state, now, close=True)
+                del self._open[event_type]
+
+    def close_all(self, db):
+        """Close every open event (pipeline stopping)."""
+        now = datetime.utcnow()
+        for state in self._open.values():
+            try:
+                self._write(db, state, now, close=True)
+            except Exception as e:
+                print(f"⚠️ Could not close event {state.event_id}: {e}")
+        self._open.clear()
+
+    def _open_event(self, db, snapshot, now: datetime, event_type: str, label: str, count: int, conf: float):
+        # `now` is naive UTC (DB columns); the file name uses the real epoch, like the recorder
+        epoch = int(now.replace(tzinfo=timezone.utc).timestamp())
+        filename = f"{self.camera_id}_{epoch}_{event_type}.jpg"
+        event = models.Event(
+            camera_id=self.camera_id,
+            event_type=event_type,
+            timestamp=now,
+            started_at=now,
+            status=STATUS_OPEN,
+            confidence=conf,
+            peak_count=count,
+            description=describe(label, count),
+        )
+        db.add(event)
+        jpeg = snapshot()
+        if jpeg is None:
+            print(f"❌ Snapshot encoding failed for {filename}")
+            db.commit()
+        else:
+            store_snapshot(db, event, jpeg)  # commits the event with its image_path
+        self._open[event_type] = _OpenEvent(event.id, label, now, conf, count)
+        print(f"📸 Event opened: {event_type} on {self.camera_id} ({filename})")
+
+        stem = Path(filename).stem
+        if self.recorder:
+            self.recorder.capture_clip(f"{stem}.mp4", partial(attach_media, event.id, "clip_path"))
+        if self.preroll is not None:
+            ext = "gif" if settings.PREROLL_FORMAT == "gif" else "mjpeg"
+            save_preroll(
+                self.preroll.frames(),
+                self.media_dir / f"{stem}_preroll.{ext}",
+                partial(attach_media, event.id, "preroll_path"),
+            )
+
+        # 📣 Push to live dashboards (all workers)
+        event_bus.publish({
+            "type": "new_event",
+            "event": schemas.EventRead.model_validate(event).model_dump(mode="json"),
+        })
+
+        # 🚀 Trigger Notification (Non-blocking ideally, but calling directly for now)
+        try:
+            # Reload settings to get latest config
+            import app.api.endpoints.settings as settings_module
+            from app.services.notifications import send_discord_notification
+            current_settings = settings_module.load_settings()
+            send_discord_notification(event, current_settings)
+        except Exception as e:
+            print(f"⚠️ Notification error: {e}")
+
+    def _write(self, db, state: _OpenEvent, now: datetime, close: bool = False):
+        event: Optional[models.Event] = db.get(models.Event, state.event_id)
+        if event is None:
+            return  # Deleted from the UI meanwhile
+        event.confidence = state.peak_conf
+        event.peak_count = state.peak_count
+        event.description = describe(state.label, state.peak_count)
+        if close:
+            event.status = STATUS_CLOSED
+            event.ended_at = max(state.last_seen, event.started_at or state.last_seen)
+        db.commit()
+        state.dirty = False
+        state.last_flush = now
+        if close:
+            duration = (event.ended_at - event.started_at) if event.started_at else timedelta()
+            print(f"✅ Event closed: {event.event_type} on {self.camera_id} after {duration.total_seconds():.0f}s")
+
+        event_bus.publish({
+            "type": "event_updated",
+            "event": schemas.EventRead.model_validate(event).model_dump(mode="json"),
+        })
@@ -0,0 +1,338 @@
+# app/services/ipc.py
+"""
+Local IPC channel between the detection worker (python -m app.worker)
+and the API processes.
+
+The worker runs a FrameServer; each API process keeps one RemoteFrameHub
+connection to it. Messages are tuples sent over multiprocessing.connection
+(authenticated with DETECTION_WORKER_AUTHKEY):
+
+    API -> worker:  ("subscribe", camera_id, profile) / ("unsubscribe", camera_id, profile)
+    worker -> API:  ("frame", camera_id, profile, status, jpeg_bytes)
+                    ("event", message_dict)
+
+A subscribe to an unknown profile is answered with a single "stopped" frame.
+"""
+import logging
+import threading
+from multiprocessing.connection import Client, Listener, AuthenticationError
+from typing import Dict, Optional, Union, Tuple
+
+from app.services.camera import DEFAULT_PROFILE, error_frame_jpeg
+from app.services.event_bus import event_bus
+from app.services.pipeline import (
+    FrameSlot,
+    SLOT_PROFILES,
+    STATUS_LOADING,
+    STATUS_STOPPED,
+    TERMINAL_STATUSES,
+    check_profile,
+)
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY = 2.0
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """'127.0.0.1:8765' -> ('127.0.0.1', 8765); '/run/cctv.sock' -> Unix socket path."""
+    address = address.strip()
+    if address.startswith("/") or address.startswith("."):
+        return address
+    host, _, port = address.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+
+# ==========================================
+# 🏭 WORKER SIDE
+# ==========================================
+class FrameServer:
+    """Serves pipeline frames and forwards live events to connected API processes."""
+
+    def __init__(self, hub, address: str, authkey: str):
+        self.hub = hub
+        self.address = parse_address(address)
+        self.authkey = authkey.encode()
+        self._listener: Optional[Listener] = None
+        self._sessions = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+        # With an in-process bus the API can't see our events, so relay them
+        if not event_bus.shared:
+            event_bus.subscribe(self.broadcast_event)
+
+        logger.info(f"[INFO] Detection worker listening on {self.address}")
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        event_bus.unsubscribe(self.broadcast_event)
+        if self._listener:
+            try:
+                self._listener.close()
+            except OSError:
+                pass
+        with self._lock:
+            sessions = list(self._sessions)
+        for session in sessions:
+            session.close()
+
+    def broadcast_event(self, message: dict):
+        with self._lock:
+            sessions = list(self._sessions)
+        for session in sessions:
+            session.send(("event", message))
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError) as e:
+                if self._stopped.is_set():
+                    break
+                logger.warning(f"⚠️ Rejected IPC client: {e}")
+                continue
+
+            session = _ClientSession(conn, self)
+            with self._lock:
+                self._sessions.append(session)
+            threading.Thread(target=session.run, daemon=True).start()
+
+    def _drop(self, session):
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+
+
+class _ClientSession:
+    """One connected API process and the camera profiles it subscribed to."""
+
+    def __init__(self, conn, server: FrameServer):
+        self.conn = conn
+        self.server = server
+        self.subscriptions: Dict[Tuple[str, str], threading.Event] = {}
+        self._send_lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def run(self):
+        try:
+            while not self._closed.is_set():
+                if not self.conn.poll(1.0):
+                    continue
+                kind, camera_id, profile = self.conn.recv()
+                if kind == "subscribe":
+                    self._subscribe(camera_id, profile)
+                elif kind == "unsubscribe":
+                    stop = self.subscriptions.pop((camera_id, profile), None)
+                    if stop:
+                        stop.set()
+        except (EOFError, OSError, ValueError):
+            pass
+        finally:
+            self.close()
+
+    def send(self, message) -> bool:
+        if self._closed.is_set():
+            return False
+        try:
+            with self._send_lock:
+                self.conn.send(message)
+            return True
+        except (OSError, ValueError):
+            self.close()
+            return False
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        for stop in self.subscriptions.values():
+            stop.set()
+        self.subscriptions.clear()
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        self.server._drop(self)
+
+    def _subscribe(self, camera_id: str, profile: str):
+        if profile not in SLOT_PROFILES:
+            logger.warning(f"⚠️ Subscribe to unknown profile '{profile}' for {camera_id}")
+            self.send(("frame", camera_id, profile, STATUS_STOPPED, error_frame_jpeg(f"UNKNOWN PROFILE: {profile}")))
+            return
+        key = (camera_id, profile)
+        if key in self.subscriptions:
+            return
+        stop = threading.Event()
+        self.subscriptions[key] = stop
+        threading.Thread(target=self._pump, args=(camera_id, profile, stop), daemon=True).start()
+
+    def _pump(self, camera_id: str, profile: str, stop: threading.Event):
+        """Forward every new frame of one camera profile until unsubscribed."""
+        hub = self.server.hub
+        slot = None
+        last_seq = 0
+        try:
+            while not stop.is_set() and not self._closed.is_set():
+                current = hub.get_slot(camera_id, profile)
+                if current is None:
+                    # Worker isn't running this camera (inactive / unknown)
+                    self.send(("frame", camera_id, profile, STATUS_STOPPED, error_frame_jpeg(f"OFFLINE: {camera_id}")))
+                    return
+                if current is not slot:
+                    # Pipeline was (re)started by the worker: watch the new one
+                    if slot is not None:
+                        hub.unwatch(slot)
+                    slot, last_seq = hub.watch(camera_id, profile), 0
+                    if slot is None:
+                        continue
+
+                seq, jpeg, status = slot.wait(last_seq, timeout=1.0)
+                if seq == last_seq or jpeg is None:
+                    continue
+                last_seq = seq
+                if not self.send(("frame", camera_id, profile, status, jpeg)):
+                    return
+        finally:
+            if slot is not None:
+                hub.unwatch(slot)
+            if self.subscriptions.get((camera_id, profile)) is stop:
+                self.subscriptions.pop((camera_id, profile), None)
+
+
+# ==========================================
+# 🌐 API SIDE
+# ==========================================
+class _RemoteSubscription:
+    def __init__(self, profile: str):
+        self.slot = FrameSlot(profile)
+        self.refs = 0
+
+
+class RemoteFrameHub:
+    """
+    Drop-in replacement for PipelineHub used by the API when detection runs
+    in the standalone worker. Frames arrive over IPC into local FrameSlots,
+    so the streaming endpoints don't care where the pipeline lives.
+    """
+
+    def __init__(self, address: str, authkey: str):
+        self.address = parse_address(address)
+        self.authkey = authkey.encode()
+        self.stop_event: Optional[threading.Event] = None
+        self._subs: Dict[Tuple[str, str], _RemoteSubscription] = {}
+        self._conn = None
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def set_stop_event(self, e: threading.Event):
+        self.stop_event = e
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._receive_loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None
+
+    def acquire(self, camera_id: str, rtsp_url: str, profile: str = DEFAULT_PROFILE) -> FrameSlot:
+        check_profile(profile)
+        key = (camera_id, profile)
+        subscribe = False
+        with self._lock:
+            sub = self._subs.get(key)
+            if sub is None or sub.slot.status in TERMINAL_STATUSES:
+                sub = _RemoteSubscription(profile)
+                self._subs[key] = sub
+                subscribe = True
+            sub.refs += 1
+            connected = self._conn is not None
+
+        if subscribe:
+            if connected:
+                self._send(("subscribe", camera_id, profile))
+            else:
+                sub.slot.put(error_frame_jpeg("WAITING FOR DETECTION WORKER"), STATUS_LOADING)
+        return sub.slot
+
+    def release(self, camera_id: str, slot: FrameSlot, watched: bool = True):
+        key = (camera_id, slot.profile)
+        with self._lock:
+            sub = self._subs.get(key)
+            if sub is None or sub.slot is not slot:
+                return
+            sub.refs -= 1
+            if sub.refs > 0:
+                return
+            del self._subs[key]
+        self._send(("unsubscribe", camera_id, slot.profile))
+
+    def _send(self, message):
+        conn = self._conn
+        if conn is None:
+            return
+        try:
+            with self._send_lock:
+                conn.send(message)
+        except (OSError, ValueError):
+            pass  # The receive loop notices the broken pipe and reconnects
+
+    def _receive_loop(self):
+        warned = False
+        while not self._stopped.is_set():
+            try:
+                conn = Client(self.address, authkey=self.authkey)
+            except (OSError, EOFError, AuthenticationError) as e:
+                if not warned:
+                    logger.warning(f"⚠️ Detection worker unreachable at {self.address}: {e}")
+                    warned = True
+                self._stopped.wait(RECONNECT_DELAY)
+                continue
+
+            warned = False
+            logger.info(f"[INFO] Connected to detection worker at {self.address}")
+            with self._lock:
+                self._conn = conn
+                keys = list(self._subs)
+            for camera_id, profile in keys:
+                self._send(("subscribe", camera_id, profile))
+
+            try:
+                while not self._stopped.is_set():
+                    if not conn.poll(1.0):
+                        continue
+                    message = conn.recv()
+                    if message[0] == "frame":
+                        _, camera_id, profile, status, jpeg = message
+                        with self._lock:
+                            sub = self._subs.get((camera_id, profile))
+                        if sub:
+                            sub.slot.put(jpeg, status)
+                    elif message[0] == "event" and not event_bus.shared:
+                        # Shared buses already delivered it; only relay for in-process buses
+                        event_bus.publish(message[1])
+            except (EOFError, OSError) as e:
+                logger.warning(f"⚠️ Lost connection to detection worker: {e}")
+            finally:
+                with self._lock:
+                    self._conn = None
+                    subs = list(self._subs.values())
+                try:
+                    conn.close()
+                except OSError:
+                    pass
+                for sub in subs:
+                    sub.slot.put(error_frame_jpeg("WAITING FOR DETECTION WORKER"), STATUS_LOADING)
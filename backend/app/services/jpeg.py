@@ -0,0 +1,171 @@
+# app/services/jpeg.py
+"""
+Pluggable JPEG encoders for the stream profiles.
+
+JPEG encoding is the largest per-frame CPU cost after inference, so the
+backend is chosen by JPEG_ENCODER:
+
+    turbojpeg  libjpeg-turbo through PyTurboJPEG (optional dependency),
+               4:2:0 subsampling + fast DCT, encodes the BGR array in place
+    opencv     cv2.imencode with 4:2:0 subsampling, no Huffman optimization
+    pillow     Pillow reading the BGR buffer directly (no color conversion
+               copy); fast with Pillow-SIMD
+    auto       (default) time every available encoder once on a synthetic
+               stream frame and keep the fastest
+
+Encoders are kept per thread (pipeline threads encode concurrently and
+library handles are not shared). Compare them with scripts/bench_jpeg.py.
+"""
+import io
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ENCODER_NAMES = ("turbojpeg", "opencv", "pillow")
+CALIBRATION_SIZE = (854, 480)  # STREAM_RESOLUTION
+CALIBRATION_QUALITY = 60
+CALIBRATION_RUNS = 5
+
+
+class OpenCVEncoder:
+    name = "opencv"
+
+    def __init__(self):
+        self._params = {}
+
+    def encode(self, frame: np.ndarray, quality: int) -> Optional[bytes]:
+        params = self._params.get(quality)
+        if params is None:
+            params = [
+                int(cv2.IMWRITE_JPEG_QUALITY), quality,
+                int(cv2.IMWRITE_JPEG_OPTIMIZE), 0,
+            ]
+            if hasattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR"):
+                params += [int(cv2.IMWRITE_JPEG_SAMPLING_FACTOR), int(cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420)]
+            self._params[quality] = params
+        ok, buf = cv2.imencode(".jpg", frame, params)
+        return buf.tobytes() if ok else None
+
+
+class TurboJPEGEncoder:
+    name = "turbojpeg"
+
+    def __init__(self):
+        from turbojpeg import TJFLAG_FASTDCT, TJPF_BGR, TJSAMP_420, TurboJPEG
+
+        self._jpeg = TurboJPEG()
+        self._options = dict(pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420, flags=TJFLAG_FASTDCT)
+
+    def encode(self, frame: np.ndarray, quality: int) -> Optional[bytes]:
+        return self._jpeg.encode(np.ascontiguousarray(frame), quality=quality, **self._options)
+
+
+class PillowEncoder:
+    name = "pillow"
+
+    def __init__(self):
+        from PIL import Image
+
+        self._image = Image
+        self._out = io.BytesIO()  # reused output buffer
+
+    def encode(self, frame: np.ndarray, quality: int) -> Optional[bytes]:
+        frame = np.ascontiguousarray(frame)
+        h, w = frame.shape[:2]
+        # The "BGR" raw decoder swaps channels while reading: no converted copy
+        image = self._image.frombuffer("RGB", (w, h), frame, "raw", "BGR", 0, 1)
+        out = self._out
+        out.seek(0)
+        out.truncate()
+        image.save(out, format="JPEG", quality=quality, subsampling=2, optimize=False)
+        return out.getvalue()
+
+
+ENCODERS: Dict[str, Callable[[], object]] = {
+    "turbojpeg": TurboJPEGEncoder,
+    "opencv": OpenCVEncoder,
+    "pillow": PillowEncoder,
+}
+
+
+def available_encoders() -> List[str]:
+    """Encoders whose libraries import on this machine."""
+    names = []
+    for name in ENCODER_NAMES:
+        try:
+            ENCODERS[name]()
+        except Exception:
+            continue
+        names.append(name)
+    return names
+
+
+def calibration_frame(size=CALIBRATION_SIZE) -> np.ndarray:
+    """Gradient + noise: compresses like a camera frame, unlike flat color or pure noise."""
+    w, h = size
+    x = np.linspace(0, 255, w, dtype=np.float32)
+    y = np.linspace(0, 255, h, dtype=np.float32)[:, None]
+    frame = np.stack([x + 0 * y, (x + y) / 2, y + 0 * x], axis=2)
+    frame += np.random.default_rng(0).normal(0, 12, frame.shape)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def time_encoder(name: str, frame: np.ndarray, quality: int, runs: int) -> float:
+    """Median seconds per encode."""
+    encoder = ENCODERS[name]()
+    encoder.encode(frame, quality)  # warm-up
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        encoder.encode(frame, quality)
+        samples.append(time.perf_counter() - t0)
+    return sorted(samples)[len(samples) // 2]
+
+
+def pick_fastest(names: List[str]) -> str:
+    frame = calibration_frame()
+    timings = {name: time_encoder(name, frame, CALIBRATION_QUALITY, CALIBRATION_RUNS) for name in names}
+    best = min(timings, key=timings.get)
+    summary = ", ".join(f"{name} {t * 1000:.2f} ms" for name, t in sorted(timings.items(), key=lambda kv: kv[1]))
+    logger.info(f"🖼️ JPEG encoder: {best} ({summary})")
+    return best
+
+
+_choice: Optional[str] = None
+_choice_lock = threading.Lock()
+_local = threading.local()
+
+
+def encoder_name() -> str:
+    """Backend in use (resolved once per process)."""
+    global _choice
+    if _choice is None:
+        with _choice_lock:
+            if _choice is None:
+                _choice = _resolve(settings.JPEG_ENCODER.lower())
+    return _choice
+
+
+def _resolve(wanted: str) -> str:
+    names = available_encoders()
+    if wanted in names:
+        return wanted
+    if wanted != "auto":
+        logger.warning(f"⚠️ JPEG encoder '{wanted}' unavailable (available: {', '.join(names)}); picking the fastest")
+    return pick_fastest(names)
+
+
+def encode(frame: np.ndarray, quality: int) -> Optional[bytes]:
+    """Encode a BGR frame with this thread's encoder."""
+    encoder = getattr(_local, "encoder", None)
+    if encoder is None:
+        encoder = _local.encoder = ENCODERS[encoder_name()]()
+    return encoder.encode(frame, quality)
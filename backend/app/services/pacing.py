@@ -0,0 +1,101 @@
+# app/services/pacing.py
+"""
+Per-connection pacing of MJPEG streams.
+
+Every viewer gets a StreamPacer. Frames are only sent when they are new
+(the caller checks the slot sequence), when the connection's fps budget
+allows it, and at a rate the client can absorb.
+
+The send time of every frame (time until the server asks the generator for
+the next chunk, i.e. until the socket accepted it) is smoothed into an
+EWMA. A slow client first gets fewer frames per second; if that is not
+enough the connection steps down to a smaller stream profile
+(full -> grid -> thumb). Once sends are fast again the fps recovers, and
+after UPGRADE_AFTER seconds at full rate the profile steps back up, never
+above the one requested.
+"""
+import time
+from typing import Optional
+
+from app.services.camera import STREAM_PROFILES
+
+MAX_STREAM_FPS = 30.0   # cap for profiles without their own max_fps
+MIN_STREAM_FPS = 1.0
+CONGESTED = 0.5         # send time > 50% of the frame interval -> slow down
+HEALTHY = 0.2           # send time < 20% of the frame interval -> speed up
+EWMA_ALPHA = 0.3
+UPGRADE_AFTER = 10.0    # seconds at full fps before trying a larger profile
+
+# Largest profile first
+PROFILE_LADDER = tuple(
+    sorted(STREAM_PROFILES, key=lambda name: -STREAM_PROFILES[name].size[0] * STREAM_PROFILES[name].size[1])
+)
+
+
+def profile_fps(profile: str, max_fps: Optional[float] = None) -> float:
+    fps = STREAM_PROFILES[profile].max_fps or MAX_STREAM_FPS
+    if max_fps:
+        fps = min(fps, max_fps)
+    return max(MIN_STREAM_FPS, fps)
+
+
+class StreamPacer:
+    """fps cap + adaptive degrade for one connection. Not thread-safe."""
+
+    def __init__(self, profile: str, max_fps: Optional[float] = None, adaptive: bool = True):
+        self.requested = profile
+        self.profile = profile
+        self.max_fps = max_fps
+        self.adaptive = adaptive
+        self.cap = profile_fps(profile, max_fps)
+        self.fps = self.cap
+        self.send_time = 0.0  # EWMA, seconds per frame
+        self._next_due = 0.0
+        self._healthy_since: Optional[float] = None
+
+    def due(self, now: Optional[float] = None) -> bool:
+        """True if a frame may be sent now (and books the next slot)."""
+        now = time.monotonic() if now is None else now
+        if now < self._next_due:
+            return False
+        self._next_due = max(self._next_due + 1.0 / self.fps, now)
+        return True
+
+    def sent(self, seconds: float, now: Optional[float] = None) -> Optional[str]:
+        """
+        Record how long one frame took to send. Returns the profile to
+        switch to when the connection should step down/up, else None.
+        """
+        if not self.adaptive:
+            return None
+        now = time.monotonic() if now is None else now
+        self.send_time += EWMA_ALPHA * (seconds - self.send_time)
+        interval = 1.0 / self.fps
+        rank = PROFILE_LADDER.index(self.profile)
+
+        if self.send_time > CONGESTED * interval:
+            self._healthy_since = None
+            self.fps = max(MIN_STREAM_FPS, self.fps * 0.75)
+            if self.fps <= self.cap / 2 and rank + 1 < len(PROFILE_LADDER):
+                return self._switch(PROFILE_LADDER[rank + 1])
+            return None
+
+        if self.send_time < HEALTHY * interval:
+            self.fps = min(self.cap, self.fps + 1.0)
+            if self.fps < self.cap:
+                self._healthy_since = None
+            elif self._healthy_since is None:
+                self._healthy_since = now
+            elif (
+                now - self._healthy_since >= UPGRADE_AFTER
+                and rank > PROFILE_LADDER.index(self.requested)
+            ):
+                return self._switch(PROFILE_LADDER[rank - 1])
+        return None
+
+    def _switch(self, profile: str) -> str:
+        self.profile = profile
+        self.cap = profile_fps(profile, self.max_fps)
+        self.fps = min(self.fps, self.cap)
+        self._healthy_since = None
+        return profile
@@ -0,0 +1,190 @@
+# app/services/passthrough.py
+"""
+H.264 passthrough: the camera's own compressed stream as fragmented MP4.
+
+One ffmpeg process per watched camera remuxes the stream without decoding
+it (-c copy) into fragmented MP4 on stdout:
+
+    ftyp + moov          -> init segment (kept, sent first to every viewer)
+    moof + mdat, ...     -> one media fragment per keyframe (GOP)
+
+Fragments go into a FrameSlot, so every viewer reads the same bytes and a
+slow viewer skips whole fragments (each one starts on a keyframe and is
+decodable on its own) instead of buffering them. Server CPU per viewer is
+just the socket write; latency is about one GOP.
+
+Detection overlays are not burned in; the WebSocket endpoint sends them
+next to the video as JSON (see pipeline.DETECTIONS_PROFILE).
+"""
+import struct
+import subprocess
+import threading
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.services.pipeline import STATUS_LIVE, STATUS_LOST, STATUS_STOPPED, FrameSlot
+
+FMP4_PROFILE = "fmp4"
+RESTART_DELAY = 5.0   # seconds before ffmpeg is restarted after it exits
+INIT_BOXES = (b"ftyp", b"moov")
+DEFAULT_MIME = 'video/mp4; codecs="avc1.42E01E"'
+
+
+def read_box(stream) -> Optional[bytes]:
+    """Next complete top-level MP4 box (header included), or None at EOF."""
+    header = stream.read(8)
+    if len(header) < 8:
+        return None
+    size, _ = struct.unpack(">I4s", header)
+    if size == 1:  # 64-bit largesize follows the type
+        large = stream.read(8)
+        if len(large) < 8:
+            return None
+        header += large
+        size = struct.unpack(">Q", large)[0]
+    if size < len(header):
+        raise ValueError(f"bad MP4 box size {size}")
+    body = stream.read(size - len(header))
+    if len(body) < size - len(header):
+        return None
+    return header + body
+
+
+def codec_mime(init: bytes) -> str:
+    """MediaSource type for an init segment, e.g. video/mp4; codecs="avc1.64001F"."""
+    pos = init.find(b"avcC")
+    if pos < 0 or len(init) < pos + 8:
+        return DEFAULT_MIME
+    # avcC: configurationVersion, AVCProfileIndication, profile_compatibility, AVCLevelIndication
+    profile, compat, level = init[pos + 5], init[pos + 6], init[pos + 7]
+    return f'video/mp4; codecs="avc1.{profile:02X}{compat:02X}{level:02X}"'
+
+
+class Fmp4Broadcaster:
+    """
+    Remuxes one camera to fragmented MP4 while it has viewers.
+    `init` and `mime` are set once ffmpeg has written the moov box; they
+    change when ffmpeg is restarted, so viewers compare `init` by identity.
+    """
+
+    def __init__(self, camera_id: str, src: str):
+        self.camera_id = camera_id
+        self.src = src
+        self.slot = FrameSlot(FMP4_PROFILE)
+        self.init: Optional[bytes] = None
+        self.mime = DEFAULT_MIME
+        self.refs = 0
+        self._proc: Optional[subprocess.Popen] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        proc = self._proc
+        if proc and proc.poll() is None:
+            proc.kill()
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _command(self) -> List[str]:
+        src = self.src
+        input_opts = ["-rtsp_transport", "tcp"] if src.lower().startswith("rtsp") else []
+        return [
+            settings.FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-nostats",
+            *input_opts, "-i", src,
+            "-map", "0:v:0", "-an", "-c", "copy",
+            "-f", "mp4", "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+            "pipe:1",
+        ]
+
+    def _run(self):
+        print(f"📼 Passthrough started for {self.camera_id}")
+        final_status = STATUS_STOPPED
+        while not self._stopped.is_set():
+            try:
+                self._proc = subprocess.Popen(
+                    self._command(),
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                )
+            except FileNotFoundError:
+                print(f"❌ Passthrough: ffmpeg not found ({settings.FFMPEG_PATH})")
+                final_status = STATUS_LOST
+                break
+
+            try:
+                self._read(self._proc.stdout)
+            except ValueError as e:
+                print(f"⚠️ Passthrough {self.camera_id}: {e}")
+            self._proc.kill()
+            code = self._proc.wait()
+            if self._stopped.is_set():
+                break
+            print(f"⚠️ Passthrough for {self.camera_id}: ffmpeg exited ({code}), restarting")
+            self._stopped.wait(RESTART_DELAY)
+
+        self.slot.put(b"", final_status)
+        print(f"📼 Passthrough stopped for {self.camera_id}")
+
+    def _read(self, stdout):
+        """Split ffmpeg's output into the init segment and moof+mdat fragments."""
+        init: List[bytes] = []
+        fragment: List[bytes] = []
+        while not self._stopped.is_set():
+            box = read_box(stdout)
+            if box is None:
+                return
+            kind = box[4:8]
+            if kind in INIT_BOXES:
+                init.append(box)
+                if kind == b"moov":
+                    self.init = b"".join(init)
+                    self.mime = codec_mime(self.init)
+                    init = []
+            elif kind == b"moof":
+                fragment = [box]
+            elif kind == b"mdat" and fragment:
+                fragment.append(box)
+                self.slot.put(b"".join(fragment), STATUS_LIVE)
+                fragment = []
+
+
+class PassthroughHub:
+    """Reference-counted Fmp4Broadcasters, one per camera (like PipelineHub)."""
+
+    def __init__(self):
+        self._broadcasters: Dict[str, Fmp4Broadcaster] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, camera_id: str, src: str) -> Fmp4Broadcaster:
+        with self._lock:
+            broadcaster = self._broadcasters.get(camera_id)
+            if broadcaster is None or not broadcaster.is_alive():
+                broadcaster = Fmp4Broadcaster(camera_id, src).start()
+                self._broadcasters[camera_id] = broadcaster
+            broadcaster.refs += 1
+            return broadcaster
+
+    def release(self, camera_id: str, broadcaster: Fmp4Broadcaster):
+        with self._lock:
+            if self._broadcasters.get(camera_id) is not broadcaster:
+                return  # Already replaced; the old one has ended
+            broadcaster.refs -= 1
+            if broadcaster.refs > 0:
+                return
+            del self._broadcasters[camera_id]
+        broadcaster.stop()
+
+    def stop(self):
+        with self._lock:
+            broadcasters = list(self._broadcasters.values())
+            self._broadcasters.clear()
+        for broadcaster in broadcasters:
+            broadcaster.stop()
@@ -0,0 +1,596 @@
+# app/services/pipeline.py
+import asyncio
+import json
+import logging
+import time
+import threading
+import traceback
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import all_models as models
+from app.services.camera import (
+    ThreadedCamera,
+    STREAM_RESOLUTION,
+    STREAM_PROFILES,
+    DEFAULT_PROFILE,
+    MAX_CONSECUTIVE_FAILS,
+    COLOR_RED,
+    COLOR_GREEN,
+    COLOR_ORANGE,
+    COLOR_YELLOW,
+    COLOR_TEXT,
+    encode_jpeg,
+    error_frame_jpeg,
+)
+from app.services.detection import (
+    CONFIDENCE_THRESHOLD,
+    DEFAULT_LABELS,
+    LABEL_BAG,
+    LABEL_NAMES,
+    LABEL_PERSON,
+    LABEL_PHONE,
+    LABEL_VEHICLE,
+    RegionOfInterest,
+    empty_detections,
+    parse_labels,
+    peek_detector,
+)
+from app.services.event_lifecycle import EventLifecycle
+from app.services.preroll import create_preroll_buffer
+from app.services.recorder import Recorder, is_recordable
+from app.services.tracking import Tracker
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# ⚙️ CONFIGURATION & CONSTANTS
+# ==========================================
+FRAME_SKIP = 3  # inference every N frames; the tracker moves boxes in between
+
+# Event type per label code; other labels use their name (e.g. "vehicle")
+EVENT_TYPES = {
+    LABEL_PHONE: "mobile_phone",
+    LABEL_PERSON: "intrusion",
+}
+ACTIVE_CHECK_INTERVAL = 30   # frames between is_active DB checks
+PREROLL_PROFILE = "grid"     # profile kept in the pre-event buffer (GIFs are smaller anyway)
+DETECTIONS_PROFILE = "detections"  # slot carrying per-frame boxes as JSON instead of JPEG
+SLOT_PROFILES = (*STREAM_PROFILES, DETECTIONS_PROFILE)  # every slot a pipeline publishes
+SNAPSHOT_PROFILE = DEFAULT_PROFILE  # event snapshots reuse this profile's JPEG when it was encoded
+
+# Media Storage
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+MEDIA_DIR = BASE_DIR / "media"
+MEDIA_DIR.mkdir(parents=True, exist_ok=True)
+
+# Pipeline states published alongside frames
+STATUS_LOADING = "loading"
+STATUS_LIVE = "live"
+STATUS_LOST = "lost"
+STATUS_DISABLED = "disabled"
+STATUS_STOPPED = "stopped"
+TERMINAL_STATUSES = (STATUS_LOST, STATUS_DISABLED, STATUS_STOPPED)
+
+
+# ==========================================
+# 🖼️ LATEST-FRAME SLOT
+# ==========================================
+class FrameSlot:
+    """
+    Holds the latest encoded frame of one camera in one stream profile.
+    Every viewer of the camera/profile reads from the same slot, so capture,
+    inference and encoding happen once per camera instead of per viewer.
+
+    Threads block in wait(); asyncio viewers await wait_async(), which costs
+    no thread: put() wakes each event loop with one call_soon_threadsafe.
+    """
+    def __init__(self, profile: str = DEFAULT_PROFILE):
+        self.profile = profile
+        self.viewers = 0  # a profile is only encoded while it has viewers
+        self._cond = threading.Condition()
+        self._async_waiters: Dict[asyncio.AbstractEventLoop, List[asyncio.Future]] = {}
+        self.seq = 0
+        self.jpeg: Optional[bytes] = None
+        self.status = STATUS_LOADING
+        self.ts = 0.0  # wall-clock time of the latest put()
+
+    def put(self, jpeg: bytes, status: str = STATUS_LIVE):
+        with self._cond:
+            self.seq += 1
+            self.jpeg = jpeg
+            self.status = status
+            self.ts = time.time()
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, {}
+        for loop, futures in waiters.items():
+            try:
+                loop.call_soon_threadsafe(_wake_all, futures)
+            except RuntimeError:
+                pass  # Loop closed (server shutting down)
+
+    def wait(self, last_seq: int, timeout: float = 1.0) -> Tuple[int, Optional[bytes], str]:
+        """Block until a frame newer than last_seq arrives (or timeout)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq != last_seq, timeout)
+            return self.seq, self.jpeg, self.status
+
+    async def wait_async(self, last_seq: int, timeout: float = 1.0) -> Tuple[int, Optional[bytes], str]:
+        """wait() for coroutines: awaits the next put() without blocking a thread."""
+        with self._cond:
+            if self.seq != last_seq:
+                return self.seq, self.jpeg, self.status
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._async_waiters.setdefault(loop, []).append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._cond:
+                waiting = self._async_waiters.get(loop)
+                if waiting and future in waiting:
+                    waiting.remove(future)
+        with self._cond:
+            return self.seq, self.jpeg, self.status
+
+
+def check_profile(profile: str):
+    """ValueError for a profile no pipeline publishes (from a client message)."""
+    if profile not in SLOT_PROFILES:
+        raise ValueError(f"Unknown stream profile '{profile}'. Available: {', '.join(SLOT_PROFILES)}")
+
+
+def _wake_all(futures: List[asyncio.Future]):
+    for future in futures:
+        if not future.done():
+            future.set_result(None)
+
+
+# ==========================================
+# 🎥 PER-CAMERA PIPELINE (capture -> AI -> events -> encode)
+# ==========================================
+class CameraPipeline:
+    """
+    Owns one camera: a ThreadedCamera reader plus a processing thread that
+    runs YOLO every FRAME_SKIP frames, tracks objects across frames, draws
+    overlays, keeps one event open per object type while it is present and
+    publishes the frame to one FrameSlot per stream profile (encoded only
+    for profiles with viewers, at most at the profile's fps).
+
+    The DETECTIONS_PROFILE slot carries the tracked boxes of every frame as
+    JSON (detections_json) for clients that draw overlays themselves. Like
+    every slot it receives the status JPEGs when the stream is not live.
+    With STREAM_OVERLAYS=client nothing is drawn into the published video;
+    event snapshots are still annotated (on a copy).
+
+    Event snapshots reuse the SNAPSHOT_PROFILE JPEG the frame was just
+    published with (encoded only when that profile had no viewers, or for the
+    annotated copy) and are written to disk by snapshot_writer, off this thread.
+
+    With detector=None the shared lazily-loaded detector is used; video
+    streams immediately and detection starts once the model is ready.
+    """
+    def __init__(self, camera_id: str, rtsp_url: str, detector=None, stop_event: Optional[threading.Event] = None):
+        self.camera_id = camera_id
+        self.rtsp_url = rtsp_url
+        self.detector = detector
+        self.server_stop_event = stop_event
+        self.slots = {name: FrameSlot(name) for name in SLOT_PROFILES}
+        self.burn_in = settings.STREAM_OVERLAYS != "client"
+        self.refs = 0
+        self._next_put = dict.fromkeys(STREAM_PROFILES, 0.0)
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _should_stop(self) -> bool:
+        if self._stopped.is_set():
+            return True
+        return bool(self.server_stop_event and self.server_stop_event.is_set())
+
+    @property
+    def slot(self) -> FrameSlot:
+        return self.slots[DEFAULT_PROFILE]
+
+    def _put_status(self, jpeg: bytes, status: str):
+        """Status frames (loading / offline / lost) go to every profile."""
+        for slot in self.slots.values():
+            slot.put(jpeg, status)
+
+    def _publish(self, frame, preroll=None) -> Dict[str, bytes]:
+        """
+        Encode the annotated frame once per wanted profile, at most at its max_fps.
+        Returns the JPEGs encoded for this frame by profile name.
+        """
+        now = time.monotonic()
+        encoded = {}
+        for name in STREAM_PROFILES:
+            slot = self.slots[name]
+            keep = preroll is not None and name == PREROLL_PROFILE
+            if not slot.viewers and not keep:
+                continue
+            profile = STREAM_PROFILES[name]
+            if profile.max_fps:
+                if now < self._next_put[name]:
+                    continue
+                self._next_put[name] = max(self._next_put[name] + 1.0 / profile.max_fps, now)
+
+            scaled = frame
+            if (frame.shape[1], frame.shape[0]) != profile.size:
+                scaled = cv2.resize(frame, profile.size, interpolation=cv2.INTER_AREA)
+            jpeg = encode_jpeg(scaled, profile.quality)
+            if jpeg is None:
+                continue
+            encoded[name] = jpeg
+            if slot.viewers:
+                slot.put(jpeg, STATUS_LIVE)
+            if keep:
+                preroll.append(jpeg)
+        return encoded
+
+    def _snapshot(self, frame, encoded: Dict[str, bytes], roi, boxes: np.ndarray, track_ids: np.ndarray) -> Optional[bytes]:
+        """JPEG for an event snapshot: the published one when possible, else encoded once here."""
+        if self.burn_in:
+            if SNAPSHOT_PROFILE in encoded:
+                return encoded[SNAPSHOT_PROFILE]
+        else:
+            frame = draw_overlays(frame.copy(), roi, boxes, track_ids)
+        return encode_jpeg(frame, STREAM_PROFILES[SNAPSHOT_PROFILE].quality)
+
+    def _run(self):
+        camera_id = self.camera_id
+        db = SessionLocal()
+        print(f"[STREAM] [AI Pipeline] Connecting to {camera_id}...")
+
+        # Start Threaded Reader (Non-blocking)
+        video_thread = ThreadedCamera(self.rtsp_url).start()
+
+        frame_count = 0
+        last_frame_id = 0
+        last_active_check = -1
+        tracker = Tracker()
+        cached_boxes = empty_detections()
+        cached_ids = np.zeros((0,), dtype=np.int64)
+        had_boxes = False
+        labels = DEFAULT_LABELS  # refreshed from Camera.detect_classes
+        roi: Optional[RegionOfInterest] = None  # Camera.roi
+        roi_json = None
+        inference_size = None  # Camera.inference_size (None = DETECTOR_IMGSZ)
+
+        recorder = None
+        if settings.RECORDING_ENABLED and is_recordable(self.rtsp_url):
+            recorder = Recorder(camera_id, self.rtsp_url).start()
+        preroll = create_preroll_buffer()  # last seconds of PREROLL_PROFILE JPEGs
+        lifecycle = EventLifecycle(camera_id, MEDIA_DIR, recorder, preroll)
+        try:
+            lifecycle.close_stale(db)
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Could not close stale events for {camera_id}: {e}")
+
+        # Track stats for the current frame
+        current_counts = np.zeros(len(LABEL_NAMES), dtype=np.int64)
+
+        last_loading_time = 0.0
+        final_status = STATUS_STOPPED
+
+        try:
+            while not self._should_stop():
+                # 🛑 CHECK CAMERA ACTIVE FLAG (every N frames to reduce DB load)
+                if frame_count % ACTIVE_CHECK_INTERVAL == 0 and frame_count != last_active_check:
+                    last_active_check = frame_count
+                    cam_state = (
+                        db.query(
+                            models.Camera.is_active,
+                            models.Camera.detect_classes,
+                            models.Camera.roi,
+                            models.Camera.inference_size,
+                        )
+                        .filter(models.Camera.camera_id == camera_id)
+                        .first()
+                    )
+                    db.rollback()  # Release the read snapshot so we see later toggles
+                    if not cam_state or not cam_state[0]:
+                        print(f"[STOP] Camera {camera_id} disabled by user.")
+                        final_status = STATUS_DISABLED
+                        self._put_status(error_frame_jpeg(f"OFFLINE: {camera_id}"), STATUS_DISABLED)
+                        return
+                    labels = parse_labels(cam_state[1])
+                    if cam_state[2] != roi_json:
+                        roi_json = cam_state[2]
+                        roi = RegionOfInterest.parse(roi_json)
+                    inference_size = cam_state[3]
+
+                # GET LATEST FRAME
+                if video_thread.get_fail_count() > MAX_CONSECUTIVE_FAILS:
+                    print(f"[WARN] {camera_id} connection lost.")
+                    final_status = STATUS_LOST
+                    self._put_status(error_frame_jpeg("CONNECTION LOST"), STATUS_LOST)
+                    return
+
+                frame_id, raw_frame = video_thread.read_new(last_frame_id)
+
+                if raw_frame is None:
+                    # If starting up, show LOADING
+                    if frame_count == 0:
+                        current_time = time.time()
+                        if (current_time - last_loading_time) > 1.0:
+                            self._put_status(error_frame_jpeg("LOADING..."), STATUS_LOADING)
+                            last_loading_time = current_time
+                        time.sleep(0.1)
+                        continue
+
+                    # Waiting for the next frame / reader reconnecting
+                    time.sleep(0.005)
+                    continue
+
+                frame_step = max(1, frame_id - last_frame_id) if last_frame_id else 1
+                last_frame_id = frame_id
+                frame = cv2.resize(raw_frame, STREAM_RESOLUTION)
+                frame_count += 1
+
+                # ---------------------------------------------------------
+                # AI INFERENCE (Runs periodically) + TRACKING (every frame)
+                # ---------------------------------------------------------
+                tracker.predict(frame_step)  # frames the camera advanced
+                inferred = frame_count % FRAME_SKIP == 0
+
+                if inferred:
+                    detector = self.detector or peek_detector()
+                    detections = (
+                        detector.detect(frame, labels, roi, inference_size)
+                        if detector else empty_detections()
+                    )
+                    tracker.update(detections)
+
+                cached_boxes, cached_ids = tracker.boxes()
+                current_counts = np.bincount(cached_boxes["label"], minlength=len(LABEL_NAMES))
+                detections_slot = self.slots[DETECTIONS_PROFILE]
+                if detections_slot.viewers and (len(cached_boxes) or had_boxes):
+                    # One empty update clears the client's overlay; no need to repeat it
+                    detections_slot.put(detections_json(frame_id, cached_boxes, cached_ids, STREAM_RESOLUTION))
+                had_boxes = len(cached_boxes) > 0
+
+                # ---------------------------------------------------------
+                # DRAW BOXES (into the stream, or only into event snapshots)
+                # ---------------------------------------------------------
+                if self.burn_in:
+                    draw_overlays(frame, roi, cached_boxes, cached_ids)
+
+                # ---------------------------------------------------------
+                # PUBLISH TO VIEWERS
+                # ---------------------------------------------------------
+                if self.burn_in:
+                    info = " | ".join(
+                        [f"Cam: {camera_id}"]
+                        + [f"{name}: {n}" for name, n in count_summary(labels, current_counts)]
+                    )
+                    cv2.putText(
+                        frame,
+                        info,
+                        (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX,
+                        0.7,
+                        COLOR_GREEN,
+                        2,
+                    )
+
+                encoded = self._publish(frame, preroll)
+
+                # ---------------------------------------------------------
+                # EVENTS (open on entry, update while present, close on exit)
+                # ---------------------------------------------------------
+                if inferred:
+                    presence = event_presence(cached_boxes, current_counts)
+                    snapshot = partial(self._snapshot, frame, encoded, roi, cached_boxes, cached_ids)
+                    lifecycle.observe(db, snapshot, presence)
+
+        except Exception as e:
+            print(f"💥 Pipeline crashed: {e}")
+            traceback.print_exc()
+            final_status = STATUS_LOST
+            self._put_status(error_frame_jpeg("SERVER ERROR"), STATUS_LOST)
+        finally:
+            video_thread.stop()
+            if recorder:
+                recorder.stop()
+            try:
+                lifecycle.close_all(db)
+            except Exception as e:
+                print(f"⚠️ Could not close events for {camera_id}: {e}")
+            db.close()
+            if self.slot.status not in TERMINAL_STATUSES:
+                self._put_status(error_frame_jpeg("STREAM STOPPED"), final_status)
+            print(f"🛑 Pipeline released: {camera_id}")
+
+
+# Box color and tag text per detection label code
+LABEL_STYLES = {
+    LABEL_PHONE: (COLOR_RED, "Phone"),
+    LABEL_PERSON: (COLOR_GREEN, "Person"),
+    LABEL_VEHICLE: (COLOR_ORANGE, "Vehicle"),
+    LABEL_BAG: (COLOR_YELLOW, "Bag"),
+}
+
+
+def event_presence(boxes: np.ndarray, counts: np.ndarray) -> Dict[str, tuple]:
+    """{event_type: (label, count, best_conf)} for every object type in boxes."""
+    presence = {}
+    for code in np.flatnonzero(counts).tolist():
+        conf = float(boxes["conf"][boxes["label"] == code].max())
+        presence[EVENT_TYPES.get(code, LABEL_NAMES[code])] = (LABEL_STYLES[code][1], int(counts[code]), conf)
+    return presence
+
+
+def detections_json(seq: int, boxes: np.ndarray, track_ids: np.ndarray, size: Tuple[int, int]) -> bytes:
+    """Tracked boxes of one frame, coordinates normalized 0-1 (x1, y1, x2, y2)."""
+    w, h = size
+    return json.dumps(
+        {
+            "seq": seq,
+            "ts": round(time.time(), 3),
+            "boxes": [
+                {
+                    "label": LABEL_STYLES[code][1],
+                    "track_id": track_id,
+                    "conf": round(conf, 2),
+                    "box": [round(x1 / w, 4), round(y1 / h, 4), round(x2 / w, 4), round(y2 / h, 4)],
+                }
+                for (x1, y1, x2, y2, code, conf), track_id in zip(boxes.tolist(), track_ids.tolist())
+            ],
+        },
+        separators=(",", ":"),
+    ).encode()
+
+
+def count_summary(labels: Sequence[str], counts: np.ndarray) -> List[Tuple[str, int]]:
+    """[("Persons", 2), ("Phones", 0)] for the camera's labels, in their configured order."""
+    summary = []
+    for name in labels:
+        code = LABEL_NAMES.index(name)
+        summary.append((f"{LABEL_STYLES[code][1]}s", int(counts[code])))
+    return summary
+
+
+def draw_roi(frame, roi: RegionOfInterest):
+    """Outline the camera's detection zone."""
+    h, w = frame.shape[:2]
+    pixels = np.round(roi.points * [w, h]).astype(np.int32)
+    cv2.polylines(frame, [pixels], True, COLOR_YELLOW, 1)
+
+
+def draw_overlays(frame, roi: Optional[RegionOfInterest], detections: np.ndarray, track_ids: np.ndarray):
+    """Detection zone and tracked boxes; returns the frame."""
+    if roi is not None:
+        draw_roi(frame, roi)
+    draw_boxes(frame, detections, track_ids)
+    return frame
+
+
+def draw_boxes(frame, detections: np.ndarray, track_ids: Optional[np.ndarray] = None):
+    """Draw DETECTION_DTYPE boxes with a filled label tag (and track id, if given)."""
+    ids = track_ids.tolist() if track_ids is not None else [None] * len(detections)
+    for (x1, y1, x2, y2, code, conf), track_id in zip(detections.tolist(), ids):
+        color, name = LABEL_STYLES[code]
+        label = f"{name} #{track_id} {conf:.2f}" if track_id is not None else f"{name} {conf:.2f}"
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        t_size = cv2.getTextSize(
+            label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2
+        )[0]
+        cv2.rectangle(
+            frame,
+            (x1, y1 - 20),
+            (x1 + t_size[0], y1),
+            color,
+            -1,
+        )
+        cv2.putText(
+            frame,
+            label,
+            (x1, y1 - 5),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            COLOR_TEXT,
+            2,
+        )
+
+
+# ==========================================
+# 🧩 PIPELINE HUB (one pipeline per camera, shared by viewers)
+# ==========================================
+class PipelineHub:
+    """
+    Reference-counted registry of CameraPipelines.
+    acquire() starts the pipeline for the first viewer, release() stops it
+    after the last one leaves. A pipeline that ended on its own (camera
+    disabled / connection lost) is replaced on the next acquire().
+
+    Viewers are counted per stream profile (watch/unwatch); acquire() with
+    profile=None keeps the pipeline running without watching any profile.
+    """
+    def __init__(self, detector=None, stop_event: Optional[threading.Event] = None):
+        self.detector = detector
+        self.stop_event = stop_event
+        self._pipelines: Dict[str, CameraPipeline] = {}
+        self._lock = threading.Lock()
+
+    def set_stop_event(self, e: threading.Event):
+        self.stop_event = e
+
+    def start(self):
+        return self
+
+    def acquire(self, camera_id: str, rtsp_url: str, profile: Optional[str] = DEFAULT_PROFILE) -> FrameSlot:
+        check_profile(profile or DEFAULT_PROFILE)
+        with self._lock:
+            pipeline = self._pipelines.get(camera_id)
+            if pipeline is None or not pipeline.is_alive():
+                pipeline = CameraPipeline(camera_id, rtsp_url, self.detector, self.stop_event).start()
+                self._pipelines[camera_id] = pipeline
+            pipeline.refs += 1
+            slot = pipeline.slots[profile or DEFAULT_PROFILE]
+            if profile:
+                slot.viewers += 1
+            return slot
+
+    def release(self, camera_id: str, slot: FrameSlot, watched: bool = True):
+        with self._lock:
+            pipeline = self._pipelines.get(camera_id)
+            if pipeline is None or pipeline.slots.get(slot.profile) is not slot:
+                return  # Already replaced; the old pipeline has ended
+            if watched:
+                slot.viewers -= 1
+            pipeline.refs -= 1
+            if pipeline.refs > 0:
+                return
+            del self._pipelines[camera_id]
+        pipeline.stop()
+
+    def watch(self, camera_id: str, profile: str = DEFAULT_PROFILE) -> Optional[FrameSlot]:
+        """Count a viewer of a running pipeline's profile (without keeping it alive)."""
+        check_profile(profile)
+        with self._lock:
+            pipeline = self._pipelines.get(camera_id)
+            if pipeline is None:
+                return None
+            slot = pipeline.slots[profile]
+            slot.viewers += 1
+            return slot
+
+    def unwatch(self, slot: FrameSlot):
+        with self._lock:
+            slot.viewers = max(0, slot.viewers - 1)
+
+    def get_slot(self, camera_id: str, profile: str = DEFAULT_PROFILE) -> Optional[FrameSlot]:
+        check_profile(profile)
+        with self._lock:
+            pipeline = self._pipelines.get(camera_id)
+            return pipeline.slots[profile] if pipeline else None
+
+    def is_running(self, camera_id: str) -> bool:
+        with self._lock:
+            pipeline = self._pipelines.get(camera_id)
+            return pipeline is not None and pipeline.is_alive()
+
+    def stop(self):
+        with self._lock:
+            pipelines = list(self._pipelines.values())
+            self._pipelines.clear()
+        for pipeline in pipelines:
+            pipeline.stop()
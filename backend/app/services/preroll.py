@@ -0,0 +1,121 @@
+# app/services/preroll.py
+"""
+Pre-event ring buffer of one camera.
+
+The pipeline appends every JPEG it already encodes for the viewers, so the
+last PREROLL_SECONDS of annotated video stay in memory as compressed bytes
+(never as raw BGR frames), capped at PREROLL_MAX_MB. When an event opens,
+the buffered lead-up is written as an animated GIF (viewable in any
+browser) or as a raw MJPEG stream (no decode at all), written to a temp
+file and renamed into place like the snapshots.
+"""
+import io
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.snapshot_writer import snapshot_writer, write_atomic
+
+Frame = Tuple[float, bytes]  # (capture time, JPEG bytes)
+
+
+class FrameRingBuffer:
+    """Last max_seconds of encoded frames, at most max_bytes in total. Single writer."""
+
+    def __init__(self, max_seconds: float, max_bytes: int):
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self._frames = deque()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def append(self, jpeg: bytes, ts: Optional[float] = None):
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            self._frames.append((ts, jpeg))
+            self._bytes += len(jpeg)
+            # Drop by age, then by memory cap (oldest first)
+            while self._frames and (
+                ts - self._frames[0][0] > self.max_seconds or self._bytes > self.max_bytes
+            ):
+                self._bytes -= len(self._frames.popleft()[1])
+
+    def frames(self) -> List[Frame]:
+        """Copy of the buffered frames, oldest first (JPEG bytes are shared, not copied)."""
+        with self._lock:
+            return list(self._frames)
+
+
+def write_mjpeg(frames: List[Frame], path: Path):
+    """Concatenated JPEGs (plays in ffplay/VLC: -f mjpeg)."""
+    write_atomic(path, b"".join(jpeg for _, jpeg in frames), snapshot_writer.fsync)
+
+
+def write_gif(frames: List[Frame], path: Path, fps: float, width: int):
+    """Animated GIF at up to `fps`, scaled to `width`, with the real frame timing."""
+    from PIL import Image
+
+    # Keep one frame per 1/fps seconds
+    picked: List[Frame] = []
+    for frame in frames:
+        if not picked or frame[0] - picked[-1][0] >= 1.0 / fps:
+            picked.append(frame)
+
+    images, durations = [], []
+    for i, (ts, jpeg) in enumerate(picked):
+        # Reduced decode is much cheaper than decode + resize
+        bgr = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_REDUCED_COLOR_2)
+        if bgr is None:
+            continue
+        if bgr.shape[1] > width:
+            bgr = cv2.resize(bgr, (width, int(bgr.shape[0] * width / bgr.shape[1])), interpolation=cv2.INTER_AREA)
+        images.append(Image.fromarray(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)))
+        next_ts = picked[i + 1][0] if i + 1 < len(picked) else ts + 1.0 / fps
+        durations.append(max(20, int((next_ts - ts) * 1000)))
+
+    if not images:
+        raise ValueError("no decodable frames")
+    out = io.BytesIO()
+    images[0].save(out, format="GIF", save_all=True, append_images=images[1:], duration=durations, loop=0, optimize=False)
+    write_atomic(path, out.getvalue(), snapshot_writer.fsync)
+
+
+def save_preroll(frames: List[Frame], path: Path, on_done: Callable[[str], None]):
+    """Write frames to path in a background thread; on_done("media/<name>") on success."""
+    def run():
+        try:
+            if path.suffix == ".gif":
+                write_gif(frames, path, settings.PREROLL_GIF_FPS, settings.PREROLL_GIF_WIDTH)
+            else:
+                write_mjpeg(frames, path)
+        except Exception as e:
+            print(f"❌ Pre-roll {path.name} failed: {e}")
+            return
+        print(f"🎞️ Pre-roll saved: {path.name} ({len(frames)} frames)")
+        try:
+            on_done(f"media/{path.name}")
+        except Exception as e:
+            print(f"⚠️ Pre-roll callback failed for {path.name}: {e}")
+
+    if frames:
+        threading.Thread(target=run, daemon=True).start()
+
+
+def create_preroll_buffer() -> Optional[FrameRingBuffer]:
+    """Per-camera buffer from settings (None when PREROLL_SECONDS is 0)."""
+    if settings.PREROLL_SECONDS <= 0:
+        return None
+    return FrameRingBuffer(settings.PREROLL_SECONDS, int(settings.PREROLL_MAX_MB * 1024 * 1024))
@@ -0,0 +1,406 @@
+# app/services/recorder.py
+"""
+Continuous recording and event clips for one camera.
+
+One ffmpeg process per camera copies the camera's compressed stream
+(-c copy, no decode and no re-encode) through the tee muxer into two outputs:
+
+  1. recordings/<camera>/segments/YYYYmmdd-HHMMSS.mp4 — rolling MP4 segments
+     of RECORDING_SEGMENT_SECONDS, each starting on a keyframe. ffmpeg lists
+     finished segments in recordings/<camera>/index.csv; the recorder copies
+     new entries into the recording_segments table (the seek index).
+  2. MPEG-TS on stdout — kept as a ring buffer of the last
+     CLIP_PRE_ROLL_SECONDS in memory.
+
+capture_clip() takes the ring (pre-roll), keeps appending the live stream
+for CLIP_POST_ROLL_SECONDS (post-roll) and remuxes the result to MP4 with
+stream copy. The ring drops whole chunks by age, so a clip's bytes start
+mid-GOP: clip_start() cuts them at the first keyframe (random access
+indicator) and puts the latest PAT/PMT in front, so the clip decodes from its
+first frame. The OpenCV capture used for detection is not touched.
+"""
+import csv
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import all_models as models
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+RECORDINGS_DIR = BASE_DIR / "recordings"
+CLIPS_DIR = BASE_DIR / "media" / "clips"
+
+SEGMENT_DIRNAME = "segments"
+INDEX_FILENAME = "index.csv"
+SEGMENT_NAME_FORMAT = "%Y%m%d-%H%M%S"  # UTC start time of the segment
+
+TS_PACKET_SIZE = 188
+TS_SYNC_BYTE = 0x47
+PAT_PID = 0
+READ_SIZE = TS_PACKET_SIZE * 348   # ~64 KB
+RESTART_DELAY = 5.0                # seconds before ffmpeg is restarted after it exits
+PRUNE_INTERVAL = 300.0             # seconds between retention sweeps
+INDEX_SYNC_INTERVAL = 2.0          # seconds between index.csv -> database syncs
+
+
+@dataclass
+class Segment:
+    path: Path
+    start: datetime  # UTC
+    end: datetime
+
+
+def is_recordable(src: str) -> bool:
+    """Webcam indexes (e.g. "0") are opened by OpenCV only; everything else via ffmpeg."""
+    return not str(src).strip().isdigit()
+
+
+def camera_dir(camera_id: str) -> Path:
+    return RECORDINGS_DIR / camera_id
+
+
+def parse_index(lines: List[str], root: Path) -> List[Segment]:
+    """Segments listed in ffmpeg's CSV segment list (deleted files are skipped)."""
+    segments = []
+    for row in csv.reader(lines):
+        if len(row) < 3:
+            continue
+        path = root / SEGMENT_DIRNAME / Path(row[0]).name  # ffmpeg lists basenames
+        try:
+            start = datetime.strptime(path.stem, SEGMENT_NAME_FORMAT)
+            duration = float(row[2]) - float(row[1])
+        except ValueError:
+            continue
+        if path.exists():
+            segments.append(Segment(path, start, start + timedelta(seconds=duration)))
+    return segments
+
+
+def segment_file(segment: models.RecordingSegment) -> Path:
+    return RECORDINGS_DIR / segment.path
+
+
+def ts_sync_offset(data: bytes, probe: int = 3) -> Optional[int]:
+    """First offset where `probe` consecutive TS packets start with the sync byte."""
+    for offset in range(min(TS_PACKET_SIZE, len(data))):
+        end = offset + probe * TS_PACKET_SIZE
+        if end <= len(data) and all(data[i] == TS_SYNC_BYTE for i in range(offset, end, TS_PACKET_SIZE)):
+            return offset
+    return None
+
+
+def _payload_start(packet: bytes) -> int:
+    if packet[3] & 0x20:  # adaptation field present
+        return 5 + packet[4]
+    return 4
+
+
+def _pmt_pid(pat: bytes) -> Optional[int]:
+    """PID of the first program's PMT in a PAT packet (payload unit start)."""
+    start = _payload_start(pat)
+    table = start + 1 + pat[start]  # skip pointer_field
+    if table + 3 > len(pat):
+        return None
+    section_length = (pat[table + 1] & 0x0F) << 8 | pat[table + 2]
+    end = min(len(pat), table + 3 + section_length - 4)  # program loop ends before the CRC32
+    for i in range(table + 8, end - 3, 4):
+        program = pat[i] << 8 | pat[i + 1]
+        if program != 0:  # 0 = network PID
+            return (pat[i + 2] & 0x1F) << 8 | pat[i + 3]
+    return None
+
+
+def clip_start(data: bytes) -> bytes:
+    """
+    MPEG-TS cut at a packet boundary, starting with the latest PAT + PMT and
+    the first keyframe packet (payload start with random_access_indicator).
+    Without a flagged keyframe, it starts at the first PAT instead.
+    """
+    offset = ts_sync_offset(data)
+    if offset is None:
+        return data
+    pat = pmt = None  # latest seen
+    pat_at = None     # first PAT (fallback start)
+    for i in range(offset, len(data) - TS_PACKET_SIZE + 1, TS_PACKET_SIZE):
+        packet = data[i:i + TS_PACKET_SIZE]
+        if packet[0] != TS_SYNC_BYTE:
+            break
+        pusi = packet[1] & 0x40
+        pid = (packet[1] & 0x1F) << 8 | packet[2]
+        if pid == PAT_PID and pusi:
+            pat = packet
+            pat_at = i if pat_at is None else pat_at
+            continue
+        if pat is not None and pusi and pid == _pmt_pid(pat):
+            pmt = packet
+            continue
+        keyframe = pusi and packet[3] & 0x20 and packet[4] > 0 and packet[5] & 0x40
+        if keyframe and pat is not None and pmt is not None:
+            return pat + pmt + data[i:]
+    return data[pat_at:] if pat_at is not None else data[offset:]
+
+
+class _PendingClip:
+    def __init__(self, name: str, deadline: float, chunks: List[bytes], on_done):
+        self.name = name
+        self.deadline = deadline
+        self.chunks = chunks
+        self.on_done = on_done
+
+
+class Recorder:
+    """
+    Records one camera. start() launches ffmpeg in a background thread and
+    restarts it when it exits; stop() lets ffmpeg finish the open segment.
+    """
+
+    def __init__(self, camera_id: str, src: str):
+        self.camera_id = camera_id
+        self.src = src
+        self.root = camera_dir(camera_id)
+        self.pre_roll = settings.CLIP_PRE_ROLL_SECONDS
+        self.post_roll = settings.CLIP_POST_ROLL_SECONDS
+
+        self._lock = threading.Lock()
+        self._ring = deque()  # (arrival time, MPEG-TS bytes)
+        self._pending: List[_PendingClip] = []
+        self._proc: Optional[subprocess.Popen] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_prune = 0.0
+        self._last_sync = 0.0
+        self._index_pos = 0  # bytes of index.csv already synced
+
+    def start(self):
+        (self.root / SEGMENT_DIRNAME).mkdir(parents=True, exist_ok=True)
+        CLIPS_DIR.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        proc = self._proc
+        if proc and proc.poll() is None:
+            try:
+                proc.stdin.write(b"q")  # ffmpeg finalizes the open MP4 segment
+                proc.stdin.flush()
+            except (BrokenPipeError, OSError, ValueError):
+                pass
+
+    def capture_clip(self, name: str, on_done: Callable[[str], None]):
+        """
+        Save pre-roll + post-roll around now as media/clips/<name>.
+        on_done("media/clips/<name>") is called from a background thread.
+        """
+        with self._lock:
+            chunks = [data for _, data in self._ring]
+            self._pending.append(_PendingClip(name, time.time() + self.post_roll, chunks, on_done))
+
+    # ------------------------------------------------------------------
+    # ffmpeg process
+    # ------------------------------------------------------------------
+    def _command(self) -> List[str]:
+        src = self.src
+        input_opts = ["-rtsp_transport", "tcp"] if src.lower().startswith("rtsp") else []
+        # Relative paths (cwd = camera dir) keep ':' out of the tee option syntax
+        segments = (
+            f"[f=segment:segment_time={settings.RECORDING_SEGMENT_SECONDS}"
+            f":segment_format=mp4:segment_format_options=movflags=+faststart"
+            f":reset_timestamps=1:strftime=1"
+            f":segment_list={INDEX_FILENAME}:segment_list_type=csv"
+            f":segment_list_flags=live]"
+            f"{SEGMENT_DIRNAME}/{SEGMENT_NAME_FORMAT}.mp4"
+        )
+        return [
+            settings.FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-nostats",
+            *input_opts, "-i", src,
+            "-map", "0:v", "-an", "-c", "copy",  # camera audio (often G.711) does not fit MP4
+            "-f", "tee", f"{segments}|[f=mpegts]pipe:1",
+        ]
+
+    def _run(self):
+        print(f"🎞️ Recorder started for {self.camera_id}")
+        while not self._stopped.is_set():
+            with self._lock:
+                self._ring.clear()  # never splice two ffmpeg runs into one pre-roll
+            self._index_pos = 0  # ffmpeg starts a new index.csv
+            try:
+                self._proc = subprocess.Popen(
+                    self._command(),
+                    cwd=str(self.root),
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    env={**os.environ, "TZ": "UTC"},  # segment names in UTC
+                )
+            except FileNotFoundError:
+                print(f"❌ Recorder: ffmpeg not found ({settings.FFMPEG_PATH}); recording disabled for {self.camera_id}")
+                return
+
+            self._pump(self._proc)
+            code = self._proc.wait()
+            self._sync_index()  # the segment closed on exit
+            if self._stopped.is_set():
+                break
+            print(f"⚠️ Recorder for {self.camera_id}: ffmpeg exited ({code}), restarting")
+            self._stopped.wait(RESTART_DELAY)
+
+        # Flush clips still waiting for post-roll
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for clip in pending:
+            self._save_clip(clip)
+        print(f"🎞️ Recorder stopped for {self.camera_id}")
+
+    def _pump(self, proc: subprocess.Popen):
+        """Read the MPEG-TS pipe into the ring buffer and pending clips."""
+        remainder = b""
+        while True:
+            data = proc.stdout.read1(READ_SIZE)
+            if not data:
+                return
+            data = remainder + data
+            cut = len(data) - len(data) % TS_PACKET_SIZE  # whole TS packets only
+            data, remainder = data[:cut], data[cut:]
+            if not data:
+                continue
+            now = time.time()
+
+            with self._lock:
+                self._ring.append((now, data))
+                while self._ring and now - self._ring[0][0] > self.pre_roll:
+                    self._ring.popleft()
+                for clip in self._pending:
+                    clip.chunks.append(data)
+                done = [c for c in self._pending if now >= c.deadline]
+                if done:
+                    self._pending = [c for c in self._pending if now < c.deadline]
+
+            for clip in done:
+                threading.Thread(target=self._save_clip, args=(clip,), daemon=True).start()
+
+            if now - self._last_sync > INDEX_SYNC_INTERVAL:
+                self._last_sync = now
+                self._sync_index()
+            if now - self._last_prune > PRUNE_INTERVAL:
+                self._last_prune = now
+                self._prune(now)
+
+    # ------------------------------------------------------------------
+    # Segment index, clips and retention
+    # ------------------------------------------------------------------
+    def _sync_index(self):
+        """Copy segments ffmpeg finished since the last sync into recording_segments."""
+        try:
+            with open(self.root / INDEX_FILENAME, "rb") as f:
+                f.seek(self._index_pos)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        complete = data[: data.rfind(b"\n") + 1]  # ffmpeg may be mid-line
+        if not complete:
+            return
+        self._index_pos += len(complete)
+        segments = parse_index(complete.decode().splitlines(), self.root)
+        if not segments:
+            return
+
+        db = SessionLocal()
+        try:
+            paths = [seg.path.relative_to(RECORDINGS_DIR).as_posix() for seg in segments]
+            known = {
+                p for (p,) in db.query(models.RecordingSegment.path)
+                .filter(models.RecordingSegment.path.in_(paths))
+            }
+            for seg, rel in zip(segments, paths):
+                if rel in known:
+                    continue  # already indexed by an earlier run
+                db.add(models.RecordingSegment(
+                    camera_id=self.camera_id,
+                    start=seg.start,
+                    end=seg.end,
+                    path=rel,
+                    size=seg.path.stat().st_size,
+                ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Recorder: could not index segments of {self.camera_id}: {e}")
+        finally:
+            db.close()
+
+    def _save_clip(self, clip: _PendingClip):
+        if not clip.chunks:
+            print(f"⚠️ Recorder: no video buffered for clip {clip.name}")
+            return
+        ts_path = CLIPS_DIR / f"{Path(clip.name).stem}.ts"
+        mp4_path = CLIPS_DIR / clip.name
+        # Remuxed under a .tmp name (never served by /media) and renamed when complete
+        tmp_path = mp4_path.with_name(mp4_path.name + ".tmp")
+        try:
+            with open(ts_path, "wb") as f:
+                f.write(clip_start(b"".join(clip.chunks)))
+            # Stream copy into a seekable MP4 (no decode)
+            result = subprocess.run(
+                [
+                    settings.FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y",
+                    "-i", str(ts_path), "-map", "0", "-c", "copy",
+                    "-movflags", "+faststart", "-f", "mp4", str(tmp_path),
+                ],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=60,
+            )
+            if result.returncode != 0:
+                print(f"❌ Recorder: remux failed for clip {clip.name}")
+                return
+            os.replace(tmp_path, mp4_path)
+        except Exception as e:
+            print(f"❌ Recorder: clip {clip.name} failed: {e}")
+            return
+        finally:
+            ts_path.unlink(missing_ok=True)
+            tmp_path.unlink(missing_ok=True)
+
+        print(f"🎬 Clip saved: {mp4_path.name}")
+        try:
+            clip.on_done(f"media/clips/{clip.name}")
+        except Exception as e:
+            print(f"⚠️ Recorder: clip callback failed for {clip.name}: {e}")
+
+    def _prune(self, now: float):
+        """Delete segments (files and index rows) older than RECORDING_RETENTION_HOURS."""
+        cutoff = now - settings.RECORDING_RETENTION_HOURS * 3600
+        db = SessionLocal()
+        try:
+            db.query(models.RecordingSegment).filter(
+                models.RecordingSegment.camera_id == self.camera_id,
+                models.RecordingSegment.end < datetime.utcfromtimestamp(cutoff),
+            ).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Recorder: could not prune the index of {self.camera_id}: {e}")
+        finally:
+            db.close()
+
+        removed = 0
+        for path in (self.root / SEGMENT_DIRNAME).glob("*.mp4"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+        if removed:
+            print(f"🧹 Recorder: removed {removed} old segment(s) of {self.camera_id}")
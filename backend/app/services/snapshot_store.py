@@ -0,0 +1,148 @@
+# app/services/snapshot_store.py
+"""
+Content-addressed, perceptually deduplicated event snapshots.
+
+Every snapshot is stored once as media/snapshots/<sha256>.jpg with a
+StoredImage row counting the events that reference it. Before writing, the
+snapshot's 64-bit DCT perceptual hash is compared with the last image stored
+for the same camera: within SNAPSHOT_DEDUP_DISTANCE differing bits (a static
+scene re-triggering events), the event references that image instead and
+nothing is written. Byte-identical snapshots are always shared.
+
+Deleting events must go through release_snapshots(): a file (and its
+thumbnails) is removed once no event references it any more.
+
+The row is committed when the write is queued. If the background write then
+fails, discard_snapshot() deletes the row and clears Event.image_path, so no
+event (and no later duplicate) links to a file that does not exist.
+"""
+import threading
+from collections import Counter
+from functools import partial
+from hashlib import sha256
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import all_models as models
+from app.services.snapshot_writer import snapshot_writer
+from app.services.thumbnails import BASE_DIR, MEDIA_DIR, THUMB_DIR, pregenerate
+
+SNAPSHOT_DIR = MEDIA_DIR / "snapshots"
+HASH_SIZE = 32  # DCT input; the low 8x8 frequencies make the hash
+
+_lock = threading.Lock()  # pipelines store concurrently; keeps lookup + insert atomic
+
+
+def perceptual_hash(jpeg: bytes) -> Optional[str]:
+    """64-bit pHash (hex) of a JPEG: low-frequency DCT terms above their median."""
+    # 1/8 reduced grayscale decode: no full-size decode for a 32x32 input
+    gray = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if gray is None:
+        return None
+    small = cv2.resize(gray, (HASH_SIZE, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small.astype(np.float32))[:8, :8].flatten()
+    bits = low > np.median(low[1:])  # DC term excluded from the median
+    return np.packbits(bits).tobytes().hex()
+
+
+def hamming(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def store_snapshot(db, event: models.Event, jpeg: bytes) -> Optional[str]:
+    """
+    Point a new event (added to db, not committed) at the stored image for
+    its snapshot, writing it if needed, and commit both. Returns the
+    Event.image_path; None when the snapshot writer dropped it (the event is
+    then committed without a snapshot).
+    """
+    camera_id = event.camera_id
+    digest = sha256(jpeg).hexdigest()
+    phash = perceptual_hash(jpeg)
+    distance = settings.SNAPSHOT_DEDUP_DISTANCE
+
+    with _lock:
+        image = db.query(models.StoredImage).filter(models.StoredImage.sha256 == digest).first()
+        if image is None and phash and distance > 0:
+            last = (
+                db.query(models.StoredImage)
+                .filter(models.StoredImage.camera_id == camera_id)
+                .order_by(models.StoredImage.id.desc())
+                .first()
+            )
+            if last is not None and last.phash and hamming(last.phash, phash) <= distance:
+                image = last
+                print(f"♻️ Snapshot for {camera_id} is a near-duplicate of {Path(image.path).name}")
+        if image is None:
+            path = SNAPSHOT_DIR / f"{digest}.jpg"
+            SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+            if not snapshot_writer.submit(path, jpeg, partial(pregenerate, jpeg=jpeg), discard_snapshot):
+                # Writer backed up or closed: no row may point at a file that never gets written
+                db.commit()
+                return None
+            image = models.StoredImage(
+                sha256=digest,
+                path=path.relative_to(BASE_DIR).as_posix(),
+                camera_id=camera_id,
+                phash=phash,
+                size=len(jpeg),
+                refcount=0,
+            )
+            db.add(image)
+        image.refcount += 1
+        event.image_path = image.path
+        db.commit()  # under _lock, so a failing write's discard_snapshot() sees this event
+        return image.path
+
+
+def discard_snapshot(path: Path):
+    """Snapshot writer failure callback: forget an image whose file was never written."""
+    image_path = path.relative_to(BASE_DIR).as_posix()
+    db = SessionLocal()
+    try:
+        with _lock:
+            db.query(models.Event).filter(models.Event.image_path == image_path).update(
+                {models.Event.image_path: None}, synchronize_session=False
+            )
+            db.query(models.StoredImage).filter(models.StoredImage.path == image_path).delete(
+                synchronize_session=False
+            )
+            db.commit()
+    finally:
+        db.close()
+    print(f"🗑️ Snapshot {path.name} was not written; unlinked from its events")
+
+
+def release_snapshots(db, image_paths: Iterable[Optional[str]]) -> List[Path]:
+    """
+    Drop one reference per path (in db's transaction, not committed) and
+    delete unreferenced StoredImage rows. Returns their files: pass them to
+    remove_snapshot_files() once the transaction is committed.
+    """
+    counts = Counter(p for p in image_paths if p)
+    if not counts:
+        return []
+    orphans = []
+    with _lock:
+        images = db.query(models.StoredImage).filter(models.StoredImage.path.in_(list(counts))).all()
+        for image in images:
+            image.refcount -= counts[image.path]
+            if image.refcount <= 0:
+                orphans.append(BASE_DIR / image.path)
+                db.delete(image)
+    return orphans
+
+
+def remove_snapshot_files(files: Iterable[Path]):
+    """Delete released snapshot files and their cached thumbnails."""
+    for path in files:
+        for item in [path, *THUMB_DIR.glob(f"{path.stem}_w*.jpg")]:
+            try:
+                item.unlink(missing_ok=True)
+            except OSError as e:
+                print(f"⚠️ Could not delete {item.name}: {e}")
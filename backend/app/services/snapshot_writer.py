@@ -0,0 +1,175 @@
+# app/services/snapshot_writer.py
+"""
+Background writer for event snapshots.
+
+Pipelines hand over JPEG bytes they already encoded (usually the "full"
+stream profile) and never touch the disk themselves: one I/O thread per
+process writes each file as <name>.tmp and renames it into place, so the
+media folder only ever holds complete images. A stalled disk fills the
+bounded queue and further snapshots are dropped (and counted) instead of
+blocking the video path. A write that fails calls the submitter's on_failed
+callback, so nothing keeps pointing at the missing file.
+
+SNAPSHOT_FSYNC controls durability:
+
+    none   rename only (atomic, but may be lost on power failure)
+    file   fsync the file before the rename (default)
+    full   also fsync the directory after the rename
+
+stats() reports queue depth, write latency and drop/failure counters
+(shown in /api/health).
+"""
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from app.core.config import settings
+
+FSYNC_POLICIES = ("none", "file", "full")
+SLOW_WRITE_SECONDS = 0.5  # log writes slower than this
+LATENCY_SMOOTHING = 0.1   # EMA weight of the newest write
+CLOSE_TIMEOUT = 5.0
+
+
+def write_atomic(path: Path, data: bytes, fsync: str = "file"):
+    """Write data to path via a temp file + rename, fsync'ed per policy."""
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            if fsync != "none":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    if fsync == "full" and hasattr(os, "O_DIRECTORY"):
+        fd = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class SnapshotWriter:
+    """Bounded queue of (path, bytes) drained by one daemon thread. submit() never blocks."""
+
+    def __init__(self, max_queue: int = 64, fsync: str = "file"):
+        if fsync not in FSYNC_POLICIES:
+            print(f"⚠️ Unknown SNAPSHOT_FSYNC '{fsync}', using 'file'")
+            fsync = "file"
+        self.fsync = fsync
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.last_ms = 0.0
+        self.avg_ms = 0.0
+        self.max_ms = 0.0
+
+    def submit(
+        self,
+        path: Path,
+        data: bytes,
+        on_done: Optional[Callable[[Path], None]] = None,
+        on_failed: Optional[Callable[[Path], None]] = None,
+    ) -> bool:
+        """
+        Queue a write; False (and counted as dropped) when the queue is full
+        or closed. on_done / on_failed run on the writer thread once the
+        write succeeded / failed.
+        """
+        if not data:
+            return False
+        path = Path(path)
+        self._ensure_started()
+        try:
+            if self._closed:
+                raise queue.Full
+            self._queue.put_nowait((path, data, on_done, on_failed))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            reason = "writer closed" if self._closed else "queue full"
+            print(f"⚠️ Snapshot dropped ({reason}): {path.name}")
+            return False
+        return True
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "last_ms": round(self.last_ms, 2),
+                "avg_ms": round(self.avg_ms, 2),
+                "max_ms": round(self.max_ms, 2),
+                "fsync": self.fsync,
+            }
+
+    def close(self, timeout: float = CLOSE_TIMEOUT):
+        """Write what is queued (up to timeout) and stop the thread."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, data, on_done, on_failed = item
+            t0 = time.perf_counter()
+            try:
+                write_atomic(path, data, self.fsync)
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                print(f"❌ Snapshot write failed for {path.name}: {e}")
+                if on_failed:
+                    try:
+                        on_failed(path)
+                    except Exception as e:
+                        print(f"⚠️ Snapshot failure callback failed for {path.name}: {e}")
+                continue
+            elapsed = (time.perf_counter() - t0) * 1000
+            with self._lock:
+                self.written += 1
+                self.last_ms = elapsed
+                self.max_ms = max(self.max_ms, elapsed)
+                self.avg_ms = elapsed if self.written == 1 else (
+                    self.avg_ms + LATENCY_SMOOTHING * (elapsed - self.avg_ms)
+                )
+            if elapsed > SLOW_WRITE_SECONDS * 1000:
+                print(f"🐢 Slow snapshot write: {path.name} took {elapsed:.0f} ms ({self._queue.qsize()} queued)")
+            if on_done:
+                try:
+                    on_done(path)
+                except Exception as e:
+                    print(f"⚠️ Snapshot callback failed for {path.name}: {e}")
+
+
+snapshot_writer = SnapshotWriter(settings.SNAPSHOT_QUEUE_SIZE, settings.SNAPSHOT_FSYNC.lower())
@@ -0,0 +1,93 @@
+# app/services/thumbnails.py
+"""
+Small JPEG variants of event snapshots for the event lists.
+
+Thumbnails live in media/thumbs/<snapshot>_w<width>.jpg. The default width
+is made by the snapshot writer right after the snapshot (from the bytes
+still in memory); other widths, and snapshots from before thumbnails
+existed, are made on first request and cached on disk. Only the widths in
+THUMBNAIL_WIDTHS exist, so srcset variants share the cache.
+"""
+from pathlib import Path
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from app.services.camera import encode_jpeg
+from app.services.snapshot_writer import write_atomic
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+MEDIA_DIR = BASE_DIR / "media"
+THUMB_DIR = MEDIA_DIR / "thumbs"
+
+THUMBNAIL_WIDTHS = (160, 320, 640)
+DEFAULT_THUMBNAIL_WIDTH = 320
+THUMBNAIL_QUALITY = 70
+
+
+def snap_width(width: Optional[int]) -> int:
+    """Smallest supported width >= width (the largest one above them all)."""
+    if not width:
+        return DEFAULT_THUMBNAIL_WIDTH
+    return next((w for w in THUMBNAIL_WIDTHS if w >= width), THUMBNAIL_WIDTHS[-1])
+
+
+def source_file(image_path: str) -> Optional[Path]:
+    """Snapshot file of an Event.image_path ("media/<name>.jpg"), None if outside media/."""
+    path = (BASE_DIR / image_path).resolve()
+    if MEDIA_DIR.resolve() not in path.parents:
+        return None
+    return path
+
+
+def thumbnail_file(source: Path, width: int) -> Path:
+    return THUMB_DIR / f"{source.stem}_w{width}.jpg"
+
+
+def make_thumbnail(jpeg: bytes, width: int) -> Optional[bytes]:
+    """Downscale a JPEG to `width` (never upscaled)."""
+    data = np.frombuffer(jpeg, np.uint8)
+    # Reduced decode is much cheaper than decode + resize; keep >= width
+    probe = cv2.imdecode(data, cv2.IMREAD_REDUCED_COLOR_2)
+    if probe is not None and probe.shape[1] >= width:
+        image = probe
+    else:
+        image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    h, w = image.shape[:2]
+    if w > width:
+        image = cv2.resize(image, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+    return encode_jpeg(image, THUMBNAIL_QUALITY)
+
+
+def save_thumbnail(source: Path, width: int, jpeg: Optional[bytes] = None) -> Optional[Path]:
+    """Write the `width` variant of source (from jpeg if given, else read from disk)."""
+    if jpeg is None:
+        if not source.is_file():
+            return None
+        jpeg = source.read_bytes()
+    thumb = make_thumbnail(jpeg, width)
+    if thumb is None:
+        return None
+    THUMB_DIR.mkdir(parents=True, exist_ok=True)
+    target = thumbnail_file(source, width)
+    write_atomic(target, thumb, fsync="none")  # a cache: rebuilt if lost
+    return target
+
+
+def pregenerate(source: Path, jpeg: bytes):
+    """Snapshot writer callback: default-width thumbnail from the bytes just written."""
+    save_thumbnail(source, DEFAULT_THUMBNAIL_WIDTH, jpeg)
+
+
+def get_thumbnail(image_path: str, width: int) -> Optional[Path]:
+    """Cached thumbnail of an event snapshot, made on first use. None if the snapshot is missing."""
+    source = source_file(image_path)
+    if source is None:
+        return None
+    thumb = thumbnail_file(source, width)
+    if thumb.is_file():
+        return thumb
+    return save_thumbnail(source, width)
@@ -0,0 +1,189 @@
+# app/services/tracking.py
+"""
+Multi-object tracker for the camera pipelines (SORT-style).
+
+Every track is a constant-velocity Kalman filter over the box
+(cx, cy, w, h). All tracks of a camera are predicted and updated together
+as stacked numpy arrays. Detections are matched to the predicted boxes with
+a Hungarian assignment on IoU (same label only).
+
+The pipeline calls predict() on every video frame and update() only on
+inference frames. Boxes therefore keep moving between detections, and
+every object keeps a stable track id.
+"""
+from typing import Tuple
+
+import numpy as np
+
+from app.services.detection import DETECTION_DTYPE, empty_detections
+
+IOU_THRESHOLD = 0.3   # minimum IoU to match a detection to a track
+MIN_HITS = 2          # matched detections before a track is confirmed (and drawn)
+MAX_MISSES = 3        # consecutive inference frames a track may go unmatched
+
+# Noise relative to box height (as in DeepSORT)
+STD_POSITION = 1.0 / 20
+STD_VELOCITY = 1.0 / 160
+
+_NDIM = 4
+# x = [cx, cy, w, h, vcx, vcy, vw, vh]; velocities are per video frame
+_H = np.eye(_NDIM, 2 * _NDIM)
+
+
+def _transition(steps: int) -> np.ndarray:
+    """Constant-velocity transition over `steps` frames."""
+    f = np.eye(2 * _NDIM)
+    f[:_NDIM, _NDIM:] = steps * np.eye(_NDIM)
+    return f
+
+
+def xyxy_to_cxcywh(xyxy: np.ndarray) -> np.ndarray:
+    wh = xyxy[:, 2:] - xyxy[:, :2]
+    return np.hstack([xyxy[:, :2] + wh / 2, wh])
+
+
+def cxcywh_to_xyxy(boxes: np.ndarray) -> np.ndarray:
+    half = boxes[:, 2:] / 2
+    return np.hstack([boxes[:, :2] - half, boxes[:, :2] + half])
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy boxes -> (N, M)."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(np.clip(a[:, 2:] - a[:, :2], 0, None), axis=1)
+    area_b = np.prod(np.clip(b[:, 2:] - b[:, :2], 0, None), axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-7)
+
+
+def _noise(heights: np.ndarray, pos_scale: float, vel_scale: float) -> np.ndarray:
+    """(N, 8, 8) diagonal covariances scaled by box height."""
+    h = np.maximum(heights, 1.0)[:, None]
+    std = np.hstack([
+        np.repeat(pos_scale * STD_POSITION * h, _NDIM, axis=1),
+        np.repeat(vel_scale * STD_VELOCITY * h, _NDIM, axis=1),
+    ])
+    cov = np.zeros((len(h), 2 * _NDIM, 2 * _NDIM))
+    idx = np.arange(2 * _NDIM)
+    cov[:, idx, idx] = std ** 2
+    return cov
+
+
+class Tracker:
+    """Tracks of one camera. Not thread-safe: owned by a single pipeline thread."""
+
+    def __init__(self, iou_threshold: float = IOU_THRESHOLD, min_hits: int = MIN_HITS, max_misses: int = MAX_MISSES):
+        self.iou_threshold = iou_threshold
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self._next_id = 1
+
+        self.mean = np.zeros((0, 2 * _NDIM))                # Kalman state per track
+        self.cov = np.zeros((0, 2 * _NDIM, 2 * _NDIM))      # and its covariance
+        self.ids = np.zeros((0,), dtype=np.int64)
+        self.labels = np.zeros((0,), dtype=np.uint8)
+        self.conf = np.zeros((0,), dtype=np.float32)
+        self.hits = np.zeros((0,), dtype=np.int64)
+        self.misses = np.zeros((0,), dtype=np.int64)        # inference frames since last match
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def predict(self, steps: int = 1):
+        """
+        Advance every track by `steps` video frames (more than one when the
+        pipeline fell behind the camera and frames were dropped).
+        """
+        if not len(self) or steps <= 0:
+            return
+        f = _transition(steps)
+        motion = _noise(self.mean[:, 3], 1.0, 1.0) * steps
+        self.mean = self.mean @ f.T
+        self.cov = f @ self.cov @ f.T + motion
+
+        # Drop tracks whose box collapsed to nothing
+        alive = (self.mean[:, 2] > 1) & (self.mean[:, 3] > 1)
+        if not alive.all():
+            self._keep(alive)
+
+    def update(self, detections: np.ndarray):
+        """Match one inference frame's DETECTION_DTYPE detections to the tracks."""
+        det_xyxy = np.stack(
+            [detections["x1"], detections["y1"], detections["x2"], detections["y2"]], axis=1
+        ).astype(np.float64)
+        det_labels = detections["label"]
+
+        matched_tracks, matched_dets = self._associate(det_xyxy, det_labels)
+        self.misses += 1
+        if len(matched_tracks):
+            self._correct(matched_tracks, xyxy_to_cxcywh(det_xyxy[matched_dets]))
+            self.conf[matched_tracks] = detections["conf"][matched_dets]
+            self.hits[matched_tracks] += 1
+            self.misses[matched_tracks] = 0
+
+        # Lost tracks go; counted in inference frames so a stalled pipeline doesn't drop them
+        lost = self.misses > self.max_misses
+        if lost.any():
+            self._keep(~lost)
+
+        unmatched = np.setdiff1d(np.arange(len(detections)), matched_dets)
+        if len(unmatched):
+            self._spawn(det_xyxy[unmatched], det_labels[unmatched], detections["conf"][unmatched])
+
+    def boxes(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Current (DETECTION_DTYPE boxes, track ids) of confirmed tracks."""
+        visible = np.flatnonzero(self.hits >= self.min_hits)
+        return self.detections(visible), self.ids[visible]
+
+    def detections(self, indices: np.ndarray) -> np.ndarray:
+        """DETECTION_DTYPE boxes of the given track indices."""
+        if not len(indices):
+            return empty_detections()
+        xyxy = cxcywh_to_xyxy(self.mean[indices, :_NDIM]).astype(np.int32)
+        out = np.empty(len(indices), dtype=DETECTION_DTYPE)
+        out["x1"], out["y1"], out["x2"], out["y2"] = xyxy.T
+        out["label"] = self.labels[indices]
+        out["conf"] = self.conf[indices]
+        return out
+
+    def _associate(self, det_xyxy: np.ndarray, det_labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if not len(self) or not len(det_xyxy):
+            return np.zeros((0,), dtype=np.int64), np.zeros((0,), dtype=np.int64)
+
+        # Imported here so that importing the API does not pull in scipy
+        from scipy.optimize import linear_sum_assignment
+
+        iou = iou_matrix(cxcywh_to_xyxy(self.mean[:, :_NDIM]), det_xyxy)
+        iou[self.labels[:, None] != det_labels[None, :]] = 0.0
+        rows, cols = linear_sum_assignment(-iou)
+        good = iou[rows, cols] >= self.iou_threshold
+        return rows[good], cols[good]
+
+    def _correct(self, idx: np.ndarray, measurement: np.ndarray):
+        """Batched Kalman update of tracks idx with (K, 4) cx, cy, w, h measurements."""
+        mean, cov = self.mean[idx], self.cov[idx]
+        h = np.maximum(mean[:, 3], 1.0)
+        r = (STD_POSITION * h)[:, None] ** 2
+        innovation_cov = _H @ cov @ _H.T + np.eye(_NDIM)[None] * r[:, :, None]
+        # K = P H^T S^-1, solved instead of inverted
+        gain = np.linalg.solve(innovation_cov, (cov @ _H.T).transpose(0, 2, 1)).transpose(0, 2, 1)
+        residual = measurement - mean[:, :_NDIM]
+        self.mean[idx] = mean + np.einsum("kij,kj->ki", gain, residual)
+        self.cov[idx] = cov - gain @ _H @ cov
+
+    def _spawn(self, xyxy: np.ndarray, labels: np.ndarray, conf: np.ndarray):
+        n = len(xyxy)
+        mean = np.hstack([xyxy_to_cxcywh(xyxy), np.zeros((n, _NDIM))])
+        self.mean = np.vstack([self.mean, mean])
+        self.cov = np.concatenate([self.cov, _noise(mean[:, 3], 2.0, 10.0)])
+        self.ids = np.concatenate([self.ids, np.arange(self._next_id, self._next_id + n)])
+        self._next_id += n
+        self.labels = np.concatenate([self.labels, labels.astype(np.uint8)])
+        self.conf = np.concatenate([self.conf, conf.astype(np.float32)])
+        self.hits = np.concatenate([self.hits, np.ones(n, dtype=np.int64)])
+        self.misses = np.concatenate([self.misses, np.zeros(n, dtype=np.int64)])
+
+    def _keep(self, mask: np.ndarray):
+        for name in ("mean", "cov", "ids", "labels", "conf", "hits", "misses"):
+            setattr(self, name, getattr(self, name)[mask])
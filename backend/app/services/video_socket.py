@@ -0,0 +1,374 @@
+# app/services/video_socket.py
+"""
+Multiplexed binary frame transport over one WebSocket (/api/video/ws).
+
+Browsers allow only ~6 HTTP/1.1 connections per host, so a grid of MJPEG
+<img> streams stalls after a handful of cameras. Here a single socket
+carries any number of cameras, each read from the same shared FrameSlots
+as the MJPEG endpoint (nothing is encoded per connection).
+
+Client -> server (JSON text):
+    {"type": "subscribe", "camera_id": "cam1", "profile": "thumb", "fps": 5, "detections": true}
+    {"type": "unsubscribe", "camera_id": "cam1"}
+    {"type": "ack", "camera_id": "cam1", "seq": 42}
+
+Server -> client:
+    binary: FRAME_HEADER + camera id (utf-8) + JPEG
+            (version, status code, seq, capture time, camera id length)
+    text:   {"type": "subscribed" | "unsubscribed" | "ended" | "error", "camera_id": ..., ...}
+            {"type": "detections", "camera_id": ..., "data": {"seq", "ts", "boxes": [...]}}
+
+"detections" defaults to on when STREAM_OVERLAYS=client (clean video, the
+client draws the boxes); "subscribed" reports the mode as "overlays".
+
+Flow control: at most ACK_WINDOW frames per camera may be unacknowledged.
+While the window is full new frames are dropped, not queued; the slot only
+keeps the latest frame, so the first frame sent after an ack is the
+freshest one. A window that stays full for ACK_TIMEOUT seconds is reset,
+so a lost ack can't freeze a camera.
+
+Fmp4SocketSession is the passthrough variant (/api/video/fmp4/<camera>/ws):
+one camera's fragmented MP4 for MediaSource plus its detections as JSON.
+"""
+import asyncio
+import json
+import logging
+import struct
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.camera import DEFAULT_PROFILE, STREAM_PROFILES
+from app.services.pacing import StreamPacer
+from app.services.passthrough import Fmp4Broadcaster
+from app.services.pipeline import (
+    DETECTIONS_PROFILE,
+    STATUS_DISABLED,
+    STATUS_LIVE,
+    STATUS_LOADING,
+    STATUS_LOST,
+    STATUS_STOPPED,
+    TERMINAL_STATUSES,
+    FrameSlot,
+)
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+# version, status code, seq, capture time (epoch seconds), camera id length
+FRAME_HEADER = struct.Struct("!BBIdB")
+STATUS_CODES = {
+    status: code
+    for code, status in enumerate((STATUS_LOADING, STATUS_LIVE, STATUS_LOST, STATUS_DISABLED, STATUS_STOPPED))
+}
+
+ACK_WINDOW = 2          # unacknowledged frames allowed per camera
+ACK_TIMEOUT = 5.0       # seconds before a full window is assumed lost
+MAX_SUBSCRIPTIONS = 64  # cameras per socket
+
+
+def pack_frame(camera_id: str, seq: int, ts: float, status: str, jpeg: bytes) -> bytes:
+    """One binary message: header, camera id, JPEG payload."""
+    name = camera_id.encode()
+    header = FRAME_HEADER.pack(PROTOCOL_VERSION, STATUS_CODES.get(status, 0), seq & 0xFFFFFFFF, ts, len(name))
+    return b"".join((header, name, jpeg))
+
+
+async def forward_detections(slot: FrameSlot, send_text, camera_id: Optional[str] = None, stopping=lambda: False):
+    """
+    Send every new detections payload of `slot` as
+    {"type": "detections", "camera_id": ..., "data": {"seq", "ts", "boxes"}}.
+    The payload is already JSON, so it is spliced in rather than re-encoded.
+    """
+    prefix = '{"type":"detections",'
+    if camera_id is not None:
+        prefix += f'"camera_id":{json.dumps(camera_id)},'
+    prefix += '"data":'
+    last_seq = 0
+    while not stopping():
+        seq, payload, status = await slot.wait_async(last_seq, timeout=1.0)
+        if seq == last_seq:
+            continue
+        last_seq = seq
+        if status != STATUS_LIVE or not payload:
+            continue  # Status frames are JPEGs meant for video viewers
+        await send_text(prefix + payload.decode() + "}")
+
+
+async def _quietly(coro):
+    """Run a send loop whose socket may vanish; run() does the cleanup."""
+    try:
+        await coro
+    except Exception:
+        pass
+
+
+@dataclass
+class _Subscription:
+    camera_id: str
+    slot: FrameSlot
+    pacer: StreamPacer
+    sent: int = 0
+    acked: int = 0
+    window_open: asyncio.Event = field(default_factory=asyncio.Event)
+    task: Optional[asyncio.Task] = None
+    detections: Optional[FrameSlot] = None
+    detections_task: Optional[asyncio.Task] = None
+
+    def ack(self, seq: int):
+        self.acked = max(self.acked, min(seq, self.sent))
+        self.window_open.set()
+
+
+class VideoSocketSession:
+    """
+    One /api/video/ws connection. `resolve(camera_id)` returns the stream
+    URL of an active camera (or None); it runs in the threadpool since it
+    may hit the database.
+    """
+
+    def __init__(self, websocket: WebSocket, hub, resolve: Callable[[str], Optional[str]], stop_event=None):
+        self.websocket = websocket
+        self.hub = hub
+        self.resolve = resolve
+        self.stop_event = stop_event
+        self._subs: Dict[str, _Subscription] = {}
+        self._send_lock = asyncio.Lock()
+
+    async def run(self):
+        try:
+            while True:
+                frame = await self.websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    break
+                raw = frame.get("text")
+                try:
+                    message = json.loads(raw) if raw is not None else None
+                except ValueError:
+                    message = None
+                if not isinstance(message, dict):
+                    # Binary frames included: report and keep the session (and its pumps) alive
+                    await self._send_json({"type": "error", "detail": "Messages must be JSON text objects"})
+                    continue
+                await self._handle(message)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for sub in list(self._subs.values()):
+                self._unsubscribe(sub.camera_id)
+
+    async def _handle(self, message: dict):
+        kind = message.get("type")
+        camera_id = str(message.get("camera_id", "")).strip()
+
+        if kind == "ack":
+            sub = self._subs.get(camera_id)
+            if sub is not None and isinstance(message.get("seq"), int):
+                sub.ack(message["seq"])
+        elif kind == "subscribe":
+            detections = message.get("detections")
+            if detections is None:
+                detections = settings.STREAM_OVERLAYS == "client"
+            await self._subscribe(camera_id, message.get("profile") or DEFAULT_PROFILE, message.get("fps"), bool(detections))
+        elif kind == "unsubscribe":
+            if self._unsubscribe(camera_id):
+                await self._send_json({"type": "unsubscribed", "camera_id": camera_id})
+        else:
+            await self._send_json({"type": "error", "detail": f"Unknown message type '{kind}'"})
+
+    async def _subscribe(self, camera_id: str, profile: str, fps, detections: bool = False):
+        error = None
+        if not camera_id or len(camera_id.encode()) > 255:
+            error = "Invalid camera_id"
+        elif profile not in STREAM_PROFILES:
+            error = f"Unknown stream profile '{profile}'. Available: {', '.join(STREAM_PROFILES)}"
+        elif fps is not None and (not isinstance(fps, (int, float)) or fps <= 0):
+            error = "fps must be a positive number"
+        elif camera_id not in self._subs and len(self._subs) >= MAX_SUBSCRIPTIONS:
+            error = f"At most {MAX_SUBSCRIPTIONS} cameras per connection"
+        if error:
+            await self._send_json({"type": "error", "camera_id": camera_id, "detail": error})
+            return
+
+        rtsp_url = await run_in_threadpool(self.resolve, camera_id)
+        if rtsp_url is None:
+            await self._send_json({"type": "error", "camera_id": camera_id, "detail": "Camera offline or inactive"})
+            return
+
+        # Re-subscribing switches profile / fps; acquire first so the pipeline stays up
+        slot = self.hub.acquire(camera_id, rtsp_url, profile)
+        detections_slot = self.hub.acquire(camera_id, rtsp_url, DETECTIONS_PROFILE) if detections else None
+        self._unsubscribe(camera_id)
+        # Flow control is ack-based here, the pacer only enforces the fps cap
+        sub = _Subscription(camera_id, slot, StreamPacer(profile, fps, adaptive=False), detections=detections_slot)
+        self._subs[camera_id] = sub
+        sub.task = asyncio.create_task(self._pump(sub))
+        if detections_slot is not None:
+            sub.detections_task = asyncio.create_task(
+                _quietly(forward_detections(detections_slot, self._send_text, camera_id, self._stopping))
+            )
+        print(f"[STREAM] [WS] Viewer joined {camera_id} ({profile})")
+        await self._send_json({
+            "type": "subscribed",
+            "camera_id": camera_id,
+            "profile": profile,
+            "detections": detections,
+            "overlays": settings.STREAM_OVERLAYS,
+        })
+
+    def _unsubscribe(self, camera_id: str) -> bool:
+        sub = self._subs.pop(camera_id, None)
+        if sub is None:
+            return False
+        if sub.task is not None:
+            sub.task.cancel()
+        self._release(sub)
+        return True
+
+    def _release(self, sub: _Subscription):
+        if sub.detections_task is not None:
+            sub.detections_task.cancel()
+        self.hub.release(sub.camera_id, sub.slot)
+        if sub.detections is not None:
+            self.hub.release(sub.camera_id, sub.detections)
+
+    def _stopping(self) -> bool:
+        return bool(self.stop_event and self.stop_event.is_set())
+
+    async def _pump(self, sub: _Subscription):
+        last_seq = 0
+        while not self._stopping():
+            if sub.sent - sub.acked >= ACK_WINDOW:
+                sub.window_open.clear()
+                try:
+                    await asyncio.wait_for(sub.window_open.wait(), ACK_TIMEOUT)
+                except asyncio.TimeoutError:
+                    sub.acked = sub.sent  # Ack lost: don't stall forever
+                continue
+
+            seq, jpeg, status = await sub.slot.wait_async(last_seq, timeout=1.0)
+            if seq == last_seq or jpeg is None:
+                continue
+            last_seq = seq
+            if status == STATUS_LIVE and not sub.pacer.due():
+                continue  # Over this subscription's fps budget
+
+            sub.sent += 1
+            try:
+                await self._send_bytes(pack_frame(sub.camera_id, sub.sent, sub.slot.ts, status, jpeg))
+            except Exception:
+                return  # Socket gone; run() cleans up
+
+            # Camera disabled / connection lost: the pipeline has ended
+            if status in TERMINAL_STATUSES:
+                if self._subs.get(sub.camera_id) is sub:
+                    del self._subs[sub.camera_id]
+                    self._release(sub)
+                try:
+                    await self._send_json({"type": "ended", "camera_id": sub.camera_id, "status": status})
+                except Exception:
+                    pass
+                return
+
+    async def _send_bytes(self, data: bytes):
+        async with self._send_lock:
+            await self.websocket.send_bytes(data)
+
+    async def _send_text(self, text: str):
+        async with self._send_lock:
+            await self.websocket.send_text(text)
+
+    async def _send_json(self, message: dict):
+        await self._send_text(json.dumps(message))
+
+
+class DetectionsSocketSession:
+    """
+    One /api/video/detections/<camera> connection: the camera's tracked
+    boxes as JSON, for clients drawing overlays on clean video themselves.
+    """
+
+    def __init__(self, websocket: WebSocket, camera_id: str, detections: Optional[FrameSlot], stop_event=None):
+        self.websocket = websocket
+        self.camera_id = camera_id
+        self.detections = detections
+        self.stop_event = stop_event
+        self._send_lock = asyncio.Lock()
+
+    async def run(self):
+        pumps = [asyncio.create_task(_quietly(pump)) for pump in self._pumps()]
+        try:
+            # Nothing to receive; this just notices the disconnect (any client frame is ignored)
+            while (await self.websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for pump in pumps:
+                pump.cancel()
+
+    def _pumps(self) -> list:
+        if self.detections is None:
+            return []
+        return [forward_detections(self.detections, self._send_text, stopping=self._stopping)]
+
+    def _stopping(self) -> bool:
+        return bool(self.stop_event and self.stop_event.is_set())
+
+    async def _send_bytes(self, data: bytes):
+        async with self._send_lock:
+            await self.websocket.send_bytes(data)
+
+    async def _send_text(self, text: str):
+        async with self._send_lock:
+            await self.websocket.send_text(text)
+
+    async def _send_json(self, message: dict):
+        await self._send_text(json.dumps(message))
+
+
+class Fmp4SocketSession(DetectionsSocketSession):
+    """
+    One /api/video/fmp4/<camera>/ws connection:
+
+        text   {"type": "init", "mime": 'video/mp4; codecs="avc1.64001F"'}
+        binary init segment (again after an ffmpeg restart, after a new "init")
+        binary moof+mdat fragments
+        text   {"type": "detections", "data": {"seq", "ts", "boxes": [...]}}
+        text   {"type": "ended", "status": ...}
+
+    A slow client skips whole fragments (and detection updates) rather
+    than queueing them: each pump only sends the slot's latest content.
+    """
+
+    def __init__(self, websocket: WebSocket, camera_id: str, broadcaster: Fmp4Broadcaster,
+                 detections: Optional[FrameSlot] = None, stop_event=None):
+        super().__init__(websocket, camera_id, detections, stop_event)
+        self.broadcaster = broadcaster
+
+    def _pumps(self) -> list:
+        return [self._pump_video(), *super()._pumps()]
+
+    async def _pump_video(self):
+        slot = self.broadcaster.slot
+        sent_init = None
+        last_seq = 0
+        while not self._stopping():
+            seq, fragment, status = await slot.wait_async(last_seq, timeout=1.0)
+            if seq == last_seq:
+                continue
+            last_seq = seq
+            if status in TERMINAL_STATUSES:
+                await self._send_json({"type": "ended", "status": status})
+                return
+            init = self.broadcaster.init
+            if init is None or not fragment:
+                continue
+            if init is not sent_init:
+                await self._send_json({"type": "init", "mime": self.broadcaster.mime})
+                await self._send_bytes(init)
+                sent_init = init
+            await self._send_bytes(fragment)
@@ -0,0 +1,93 @@
+# app/worker.py
+"""
+Standalone detection worker.
+
+Owns camera capture, YOLO inference and event production for every active
+camera, and serves the annotated frames to the API over a local IPC channel.
+
+Run from the backend directory:
+    DETECTION_WORKER_ADDRESS=127.0.0.1:8765 python -m app.worker
+
+Then start the API with the same DETECTION_WORKER_ADDRESS so it connects
+to this process instead of running detection itself.
+"""
+import logging
+import signal
+import threading
+from typing import Dict, Tuple
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.logging_config import setup_logging
+from app.models import all_models as models
+from app.services.detection import get_detector
+from app.services.event_bus import event_bus
+from app.services.ipc import FrameServer
+from app.services.pipeline import FrameSlot, PipelineHub
+from app.services.snapshot_writer import snapshot_writer
+
+logger = logging.getLogger(__name__)
+
+CAMERA_SYNC_INTERVAL = 5.0  # seconds between camera table scans
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+
+
+def sync_cameras(hub: PipelineHub, owned: Dict[str, Tuple[FrameSlot, str]]):
+    """Start pipelines for newly active cameras, stop removed ones, revive dead ones."""
+    db = SessionLocal()
+    try:
+        active = {
+            cam.camera_id.strip(): cam.rtsp_url
+            for cam in db.query(models.Camera).filter(models.Camera.is_active == True).all()
+        }
+    finally:
+        db.close()
+
+    for camera_id in list(owned):
+        slot, rtsp_url = owned[camera_id]
+        if active.get(camera_id) != rtsp_url or not hub.is_running(camera_id):
+            hub.release(camera_id, slot, watched=False)
+            del owned[camera_id]
+
+    for camera_id, rtsp_url in active.items():
+        if camera_id not in owned:
+            logger.info(f"[WORKER] Starting pipeline for {camera_id}")
+            # Kept running for events; profiles are encoded only for IPC subscribers
+            owned[camera_id] = (hub.acquire(camera_id, rtsp_url, profile=None), rtsp_url)
+
+
+def main():
+    setup_logging()
+    address = settings.DETECTION_WORKER_ADDRESS or DEFAULT_ADDRESS
+
+    stop_event = threading.Event()
+
+    def handle_signal(signum, frame):
+        print("[STOP] Detection worker shutting down...")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    # The model is loaded exactly once, here, not in every API worker
+    detector = get_detector()
+    hub = PipelineHub(detector, stop_event)
+    server = FrameServer(hub, address, settings.DETECTION_WORKER_AUTHKEY).start()
+
+    owned: Dict[str, Tuple[FrameSlot, str]] = {}
+    try:
+        while not stop_event.is_set():
+            try:
+                sync_cameras(hub, owned)
+            except Exception as e:
+                logger.error(f"🔥 Camera sync failed: {e}")
+            stop_event.wait(CAMERA_SYNC_INTERVAL)
+    finally:
+        server.stop()
+        hub.stop()
+        snapshot_writer.close()
+        event_bus.close()
+
+
+if __name__ == "__main__":
+    main()
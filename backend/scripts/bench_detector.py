@@ -0,0 +1,115 @@
+# backend/scripts/bench_detector.py
+"""
+Compare detector backends on a fixed frame set.
+
+Frames are the snapshots in media/ and app/media/ plus data/test_probe.jpg,
+resized to the stream resolution. For every backend the script reports
+frames/s, latency percentiles and how many detections it produced.
+
+Run from the backend directory:
+    python scripts/bench_detector.py --backends ultralytics onnxruntime --iterations 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BACKEND_DIR))
+
+from app.services.camera import STREAM_RESOLUTION  # noqa: E402
+from app.services.detection import ObjectDetector  # noqa: E402
+
+FRAME_DIRS = [BACKEND_DIR / "media", BACKEND_DIR / "app" / "media", BACKEND_DIR / "data"]
+
+
+def load_frames(limit: int):
+    frames = []
+    for folder in FRAME_DIRS:
+        if not folder.exists():
+            continue
+        for path in sorted(folder.glob("*.jpg")):
+            img = cv2.imread(str(path))
+            if img is not None:
+                frames.append(cv2.resize(img, STREAM_RESOLUTION))
+            if len(frames) >= limit:
+                return frames
+    if not frames:
+        # Deterministic noise so the benchmark still runs on an empty checkout
+        rng = np.random.default_rng(0)
+        w, h = STREAM_RESOLUTION
+        frames = [rng.integers(0, 255, (h, w, 3), dtype=np.uint8) for _ in range(8)]
+    return frames
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def bench(name, detector, frames, iterations, warmup):
+    detector.warmup(warmup)
+    latencies = []
+    detections = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        frame = frames[i % len(frames)]
+        t0 = time.perf_counter()
+        detections += len(detector.detect(frame))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    total = time.perf_counter() - started
+
+    return {
+        "backend": name,
+        "model": os.path.basename(detector.loaded_path or "-"),
+        "fps": iterations / total,
+        "mean": statistics.mean(latencies),
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "dets": detections / iterations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["ultralytics", "onnxruntime"])
+    parser.add_argument("--model", default="ai_models/yolov8n.pt")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--frames", type=int, default=32)
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames)
+    print(f"🎞️  {len(frames)} frames at {STREAM_RESOLUTION[0]}x{STREAM_RESOLUTION[1]}, {args.iterations} iterations each")
+
+    rows = []
+    for name in args.backends:
+        detector = ObjectDetector(model_path=args.model, imgsz=args.imgsz, backend=name)
+        if detector.backend is None:
+            print(f"❌ {name}: model failed to load, skipped")
+            continue
+        if detector.backend.name != name:
+            print(f"⚠️ {name}: fell back to {detector.backend.name}, skipped")
+            continue
+        rows.append(bench(name, detector, frames, args.iterations, args.warmup))
+
+    print()
+    print(f"{'Backend':<12} | {'Model':<22} | {'FPS':>7} | {'mean':>7} | {'p50':>7} | {'p90':>7} | {'p99':>7} | {'dets/f':>6}")
+    print("-" * 96)
+    for r in rows:
+        print(
+            f"{r['backend']:<12} | {r['model']:<22} | {r['fps']:>7.1f} | {r['mean']:>5.1f}ms | "
+            f"{r['p50']:>5.1f}ms | {r['p90']:>5.1f}ms | {r['p99']:>5.1f}ms | {r['dets']:>6.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
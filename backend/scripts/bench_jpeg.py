@@ -0,0 +1,100 @@
+# backend/scripts/bench_jpeg.py
+"""
+Compare JPEG encoders at the stream profiles' resolutions and qualities.
+
+Frames are the snapshots in media/ and app/media/ plus data/test_probe.jpg
+(a synthetic gradient + noise frame when there are none), resized to each
+profile. The baseline is plain cv2.imencode with default parameters, as
+encode_jpeg used it before the encoder layer existed. JPEG_ENCODER=auto
+picks the fastest encoder the same way, on one synthetic frame.
+
+Run from the backend directory:
+    python scripts/bench_jpeg.py --iterations 300
+    pip install PyTurboJPEG   # (plus libjpeg-turbo) to include turbojpeg
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BACKEND_DIR))
+
+from app.services.camera import STREAM_PROFILES  # noqa: E402
+from app.services.jpeg import ENCODERS, available_encoders, calibration_frame  # noqa: E402
+
+FRAME_DIRS = [BACKEND_DIR / "media", BACKEND_DIR / "app" / "media", BACKEND_DIR / "data"]
+
+
+class BaselineEncoder:
+    name = "cv2-default"
+
+    def encode(self, frame, quality):
+        ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        return buf.tobytes() if ok else None
+
+
+def load_frames(limit: int):
+    frames = []
+    for folder in FRAME_DIRS:
+        if not folder.exists():
+            continue
+        for path in sorted(folder.glob("*.jpg")):
+            img = cv2.imread(str(path))
+            if img is not None:
+                frames.append(img)
+            if len(frames) >= limit:
+                return frames
+    return frames or [calibration_frame()]
+
+
+def bench(encoder, frames, quality, iterations):
+    encoder.encode(frames[0], quality)  # warm-up
+    latencies = []
+    sizes = []
+    for i in range(iterations):
+        frame = frames[i % len(frames)]
+        t0 = time.perf_counter()
+        data = encoder.encode(frame, quality)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        sizes.append(len(data))
+    return statistics.mean(latencies), sorted(latencies)[len(latencies) // 2], statistics.mean(sizes) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--frames", type=int, default=16)
+    parser.add_argument("--profiles", nargs="+", default=list(STREAM_PROFILES))
+    args = parser.parse_args()
+
+    names = available_encoders()
+    print(f"🖼️  Encoders available: {', '.join(names)} (baseline: cv2-default)")
+    sources = load_frames(args.frames)
+
+    print()
+    print(f"{'Profile':<7} | {'Size':>9} | {'Q':>3} | {'Encoder':<12} | {'mean':>8} | {'p50':>8} | {'FPS':>7} | {'KB':>6} | {'vs base':>7}")
+    print("-" * 92)
+    for profile_name in args.profiles:
+        profile = STREAM_PROFILES[profile_name]
+        frames = [
+            np.ascontiguousarray(cv2.resize(img, profile.size, interpolation=cv2.INTER_AREA))
+            for img in sources
+        ]
+        base_mean = None
+        for encoder in [BaselineEncoder()] + [ENCODERS[name]() for name in names]:
+            mean, p50, kb = bench(encoder, frames, profile.quality, args.iterations)
+            base_mean = base_mean or mean
+            print(
+                f"{profile_name:<7} | {profile.size[0]:>4}x{profile.size[1]:<4} | {profile.quality:>3} | "
+                f"{encoder.name:<12} | {mean:>6.2f}ms | {p50:>6.2f}ms | {1000 / mean:>7.0f} | {kb:>6.1f} | "
+                f"{base_mean / mean:>6.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
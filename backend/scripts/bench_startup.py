@@ -0,0 +1,109 @@
+# backend/scripts/bench_startup.py
+"""
+Cold-start benchmark for the API.
+
+1. Imports app.main in fresh interpreters and reports the import time,
+   and whether torch / ultralytics got pulled in (they must not).
+2. Optionally (--serve) launches uvicorn and measures the time until
+   /api/health answers, then polls until the model reports ready.
+
+Run from the backend directory:
+    python scripts/bench_startup.py --runs 5 --serve
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+IMPORT_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - t0
+print(json.dumps({
+    "import_seconds": elapsed,
+    "torch_loaded": "torch" in sys.modules,
+    "ultralytics_loaded": "ultralytics" in sys.modules,
+}))
+"""
+
+
+def bench_import(runs: int):
+    env = dict(os.environ, DETECTOR_PRELOAD="false")
+    samples = []
+    heavy = False
+    for _ in range(runs):
+        out = subprocess.check_output(
+            [sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR, env=env
+        ).decode().strip().splitlines()[-1]
+        result = json.loads(out)
+        samples.append(result["import_seconds"])
+        heavy = heavy or result["torch_loaded"] or result["ultralytics_loaded"]
+
+    print("\n⏱️  --- IMPORT app.main ---")
+    print(f"runs   : {runs}")
+    print(f"min    : {min(samples) * 1000:.0f} ms")
+    print(f"median : {statistics.median(samples) * 1000:.0f} ms")
+    print(f"max    : {max(samples) * 1000:.0f} ms")
+    print(f"torch/ultralytics imported: {'❌ YES' if heavy else '✅ no'}")
+    return not heavy
+
+
+def bench_serve(port: int, timeout: float):
+    url = f"http://127.0.0.1:{port}/api/health"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    first_ok = None
+    model_ready = None
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resp:
+                    body = json.loads(resp.read())
+                if first_ok is None:
+                    first_ok = time.perf_counter() - started
+                if body.get("model", {}).get("ready"):
+                    model_ready = time.perf_counter() - started
+                    break
+            except Exception:
+                pass
+            time.sleep(0.05)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    print("\n🚀 --- UVICORN COLD START ---")
+    print(f"first /api/health 200 : {f'{first_ok:.2f} s' if first_ok else 'timeout'}")
+    print(f"model ready           : {f'{model_ready:.2f} s' if model_ready else 'not within timeout'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--serve", action="store_true", help="also time a real uvicorn start")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    ok = bench_import(args.runs)
+    if args.serve:
+        bench_serve(args.port, args.timeout)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
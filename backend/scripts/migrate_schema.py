@@ -0,0 +1,80 @@
+# backend/scripts/migrate_schema.py
+"""
+Bring an existing database up to date with app/models.
+
+Creates missing tables, adds missing (nullable / defaulted) columns with
+ALTER TABLE and creates the indexes the models declare (IF NOT EXISTS).
+Rows that predate a column are backfilled where the model needs a value
+(BACKFILLS); other existing data is never touched. Safe to re-run.
+
+Run from the backend directory:
+    python scripts/migrate_schema.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import inspect, text  # noqa: E402
+from sqlalchemy.schema import CreateIndex  # noqa: E402
+
+from app.core.database import Base, engine  # noqa: E402
+from app.models import all_models  # noqa: E402,F401  (registers the tables)
+
+# (table, column, SQL value) for rows written before the column existed
+BACKFILLS = [
+    ("events", "started_at", "timestamp"),  # lifecycle events start at their timestamp
+    ("events", "status", "'closed'"),        # pre-lifecycle events are finished
+]
+
+
+def column_ddl(column) -> str:
+    ddl = f"{column.name} {column.type.compile(dialect=engine.dialect)}"
+    default = column.default
+    if default is not None and default.is_scalar:
+        value = default.arg
+        if isinstance(value, bool):
+            value = int(value)
+        ddl += f" DEFAULT {value!r}" if isinstance(value, str) else f" DEFAULT {value}"
+    return ddl
+
+
+def migrate():
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    missing_tables = [t for name, t in Base.metadata.tables.items() if name not in existing_tables]
+    if missing_tables:
+        Base.metadata.create_all(bind=engine, tables=missing_tables)
+        for table in missing_tables:
+            print(f"✅ Created table {table.name}")
+
+    with engine.begin() as conn:
+        for name, table in Base.metadata.tables.items():
+            if name not in existing_tables:
+                continue
+            present = {c["name"] for c in inspector.get_columns(name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                conn.execute(text(f"ALTER TABLE {name} ADD COLUMN {column_ddl(column)}"))
+                print(f"✅ Added {name}.{column.name}")
+
+        for name, table in Base.metadata.tables.items():
+            present = {i["name"] for i in inspect(conn).get_indexes(name)}
+            for index in table.indexes:
+                if index.name in present:
+                    continue
+                conn.execute(CreateIndex(index, if_not_exists=True))
+                print(f"✅ Created index {index.name}")
+
+        for name, column, value in BACKFILLS:
+            result = conn.execute(text(f"UPDATE {name} SET {column} = {value} WHERE {column} IS NULL"))
+            if result.rowcount:
+                print(f"✅ Backfilled {name}.{column} on {result.rowcount} rows")
+
+    print("🏁 Schema up to date.")
+
+
+if __name__ == "__main__":
+    migrate()
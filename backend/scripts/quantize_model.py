@@ -0,0 +1,243 @@
+# backend/scripts/quantize_model.py
+"""
+Create an INT8 copy of the detector model for CPU inference and report how
+it compares with the fp32 model.
+
+Modes:
+  dynamic  weights INT8, activations quantized on the fly (no calibration)
+  static   weights and activations INT8 (QDQ), calibrated on frames from media/
+
+Static is the one that pays off for YOLO on CPU; dynamic mostly saves disk
+(integer convolutions with on-the-fly activation scales are often slower).
+
+The result is written next to the model as <name>.int8.onnx, which is what
+DETECTOR_PRECISION=int8 loads. With --report both models are run on the
+same frames and the script prints detection agreement (int8 boxes matched
+to fp32 boxes by class and IoU) and throughput.
+
+Run from the backend directory:
+    python scripts/quantize_model.py --mode static --report
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BACKEND_DIR))
+
+from app.services.detection import (  # noqa: E402
+    CONFIDENCE_THRESHOLD,
+    OnnxRuntimeBackend,
+    export_model,
+    quantized_model_path,
+    stream_input_shape,
+)
+from bench_detector import load_frames, percentile  # noqa: E402
+
+# Box decoding tail of the YOLOv8 head (DFL softmax, anchors, concat). Quantizing
+# it costs far more box accuracy than it saves time, so it stays in float.
+HEAD_PREFIX = "/model.22/"
+
+
+class FrameCalibrationReader:
+    """Feeds letterboxed frames to the static quantizer (onnxruntime CalibrationDataReader)."""
+
+    def __init__(self, backend: OnnxRuntimeBackend, frames):
+        self._blobs = iter([backend.preprocess(frame)[0] for frame in frames])
+        self._input_name = backend.input_name
+
+    def get_next(self):
+        blob = next(self._blobs, None)
+        return None if blob is None else {self._input_name: blob}
+
+
+def head_nodes(model_path: str):
+    import onnx
+
+    graph = onnx.load(model_path).graph
+    return [n.name for n in graph.node if n.name.startswith(HEAD_PREFIX) and n.op_type != "Conv"]
+
+
+def quantize(fp32_path: str, out_path: str, mode: str, frames, per_channel: bool):
+    from onnxruntime.quantization import (
+        CalibrationMethod,
+        QuantFormat,
+        QuantType,
+        quantize_dynamic,
+        quantize_static,
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Shape inference + graph cleanup, as recommended before quantizing
+        prepared = os.path.join(tmp, "prepared.onnx")
+        quant_pre_process(fp32_path, prepared, skip_symbolic_shape=True)
+
+        excluded = head_nodes(prepared)
+        if mode == "dynamic":
+            quantize_dynamic(
+                prepared,
+                out_path,
+                weight_type=QuantType.QUInt8,
+                per_channel=per_channel,
+                nodes_to_exclude=excluded,
+            )
+            return
+
+        backend = OnnxRuntimeBackend(fp32_path)
+        print(f"📐 Calibrating on {len(frames)} frames...")
+        quantize_static(
+            prepared,
+            out_path,
+            FrameCalibrationReader(backend, frames),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=per_channel,
+            calibrate_method=CalibrationMethod.MinMax,
+            nodes_to_exclude=excluded,
+        )
+
+
+# ==========================================
+# 📊 REPORT
+# ==========================================
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy boxes -> (N, M)."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-7)
+
+
+def match(reference, candidate, iou_threshold: float):
+    """Greedy same-class matching, highest IoU first. Returns (matches, IoUs of matches)."""
+    ref_xyxy, _, ref_cls = reference
+    cand_xyxy, _, cand_cls = candidate
+    if len(ref_xyxy) == 0 or len(cand_xyxy) == 0:
+        return 0, []
+
+    iou = box_iou(ref_xyxy, cand_xyxy)
+    iou[ref_cls[:, None] != cand_cls[None, :]] = 0
+    matched = []
+    while True:
+        i, j = np.unravel_index(iou.argmax(), iou.shape)
+        if iou[i, j] < iou_threshold:
+            break
+        matched.append(float(iou[i, j]))
+        iou[i, :] = 0
+        iou[:, j] = 0
+    return len(matched), matched
+
+
+def run(backend: OnnxRuntimeBackend, frames, iterations: int, conf: float):
+    for frame in frames[:2]:
+        backend.predict(frame, conf)  # warm-up
+
+    outputs = [backend.predict(frame, conf) for frame in frames]
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        backend.predict(frames[i % len(frames)], conf)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    total = time.perf_counter() - started
+    return outputs, {
+        "fps": iterations / total,
+        "p50_ms": percentile(latencies, 50),
+        "p90_ms": percentile(latencies, 90),
+    }
+
+
+def report(fp32_path: str, int8_path: str, frames, iterations: int, conf: float, iou: float, threads: int):
+    fp32 = OnnxRuntimeBackend(fp32_path, intra_op_threads=threads)
+    int8 = OnnxRuntimeBackend(int8_path, intra_op_threads=threads)
+
+    ref_out, ref_perf = run(fp32, frames, iterations, conf)
+    q_out, q_perf = run(int8, frames, iterations, conf)
+
+    ref_total = sum(len(r[0]) for r in ref_out)
+    q_total = sum(len(q[0]) for q in q_out)
+    matched, ious = 0, []
+    for r, q in zip(ref_out, q_out):
+        n, frame_ious = match(r, q, iou)
+        matched += n
+        ious.extend(frame_ious)
+
+    agreement = {
+        "fp32_detections": ref_total,
+        "int8_detections": q_total,
+        "matched": matched,
+        "recall_vs_fp32": matched / ref_total if ref_total else 1.0,
+        "precision_vs_fp32": matched / q_total if q_total else 1.0,
+        "mean_iou": float(np.mean(ious)) if ious else None,
+    }
+
+    print("\n📊 --- INT8 vs FP32 ---")
+    print(f"frames            : {len(frames)} (conf >= {conf}, match IoU >= {iou})")
+    print(f"detections        : fp32 {ref_total} / int8 {q_total} / matched {matched}")
+    print(f"recall vs fp32    : {agreement['recall_vs_fp32']:.1%}")
+    print(f"precision vs fp32 : {agreement['precision_vs_fp32']:.1%}")
+    if ious:
+        print(f"mean IoU (matched): {agreement['mean_iou']:.3f}")
+    print()
+    print(f"{'Model':<8} | {'Size':>8} | {'FPS':>7} | {'p50':>8} | {'p90':>8}")
+    print("-" * 50)
+    for name, path, perf in (("fp32", fp32_path, ref_perf), ("int8", int8_path, q_perf)):
+        size = os.path.getsize(path) / 1e6
+        print(f"{name:<8} | {size:>6.1f}MB | {perf['fps']:>7.1f} | {perf['p50_ms']:>6.1f}ms | {perf['p90_ms']:>6.1f}ms")
+    print(f"\nspeed-up: x{q_perf['fps'] / ref_perf['fps']:.2f}")
+
+    return {"agreement": agreement, "fp32": ref_perf, "int8": q_perf}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="ai_models/yolov8n.pt", help=".pt (exported to ONNX first) or .onnx")
+    parser.add_argument("--output", help="defaults to <model>.int8.onnx")
+    parser.add_argument("--mode", choices=["static", "dynamic"], default="static")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--calibration-frames", type=int, default=64)
+    parser.add_argument("--no-per-channel", action="store_true")
+    parser.add_argument("--report", action="store_true", help="compare against fp32 after quantizing")
+    parser.add_argument("--report-only", action="store_true", help="skip quantization, only compare")
+    parser.add_argument("--report-json", help="also write the report to this file")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--conf", type=float, default=CONFIDENCE_THRESHOLD)
+    parser.add_argument("--iou", type=float, default=0.5)
+    parser.add_argument("--threads", type=int, default=0, help="onnxruntime intra-op threads (0 = all cores)")
+    args = parser.parse_args()
+
+    if args.model.endswith(".onnx"):
+        fp32_path = args.model
+    else:
+        fp32_path = export_model(args.model, "onnx", stream_input_shape(args.imgsz))
+    out_path = args.output or quantized_model_path(args.model)
+
+    frames = load_frames(args.calibration_frames)
+
+    if not args.report_only:
+        print(f"🔧 Quantizing {fp32_path} ({args.mode}) -> {out_path}")
+        started = time.perf_counter()
+        quantize(fp32_path, out_path, args.mode, frames, per_channel=not args.no_per_channel)
+        print(f"✅ Done in {time.perf_counter() - started:.1f}s")
+
+    if args.report or args.report_only:
+        result = report(fp32_path, out_path, frames, args.iterations, args.conf, args.iou, args.threads)
+        if args.report_json:
+            result.update({"fp32_model": fp32_path, "int8_model": out_path, "mode": args.mode})
+            with open(args.report_json, "w") as f:
+                json.dump(result, f, indent=2)
+            print(f"📝 Report written to {args.report_json}")
+
+
+if __name__ == "__main__":
+    main()
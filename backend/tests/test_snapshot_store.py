@@ -0,0 +1,98 @@
+# backend/tests/test_snapshot_store.py
+"""
+Snapshot store against a failing disk: run from backend/ with
+`python -m pytest tests`.
+"""
+import os
+import tempfile
+
+# The engine is created on import: point it at a throwaway database first
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+
+from datetime import datetime
+
+import cv2
+import numpy as np
+import pytest
+
+from app.core.database import Base, SessionLocal, engine
+from app.models import all_models as models
+from app.services import snapshot_store, snapshot_writer
+from app.services.snapshot_writer import SnapshotWriter
+
+
+def make_jpeg(value: int) -> bytes:
+    image = np.full((64, 64, 3), value, np.uint8)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def new_event(db, camera_id: str = "cam1") -> models.Event:
+    now = datetime.utcnow()
+    event = models.Event(camera_id=camera_id, event_type="person", timestamp=now, started_at=now, status="open")
+    db.add(event)
+    return event
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(snapshot_store, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(snapshot_store, "SNAPSHOT_DIR", tmp_path / "media" / "snapshots")
+    monkeypatch.setattr(snapshot_store, "pregenerate", lambda path, jpeg: None)
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def use_writer(monkeypatch) -> SnapshotWriter:
+    writer = SnapshotWriter(fsync="none")
+    monkeypatch.setattr(snapshot_store, "snapshot_writer", writer)
+    return writer
+
+
+@pytest.fixture
+def disk(monkeypatch):
+    """Snapshot writes fail with ENOSPC while disk["full"] is set."""
+    state = {"full": True}
+    real_write = snapshot_writer.write_atomic
+
+    def write_atomic(path, data, fsync="file"):
+        if state["full"]:
+            raise OSError(28, "No space left on device")
+        real_write(path, data, fsync)
+
+    monkeypatch.setattr(snapshot_writer, "write_atomic", write_atomic)
+    return state
+
+
+def test_failed_write_unlinks_the_event(db, disk, monkeypatch):
+    writer = use_writer(monkeypatch)
+    event = new_event(db)
+    assert snapshot_store.store_snapshot(db, event, make_jpeg(40)) is not None
+    writer.close()  # drains the queue: the write has failed
+
+    db.expire_all()
+    assert writer.stats()["failed"] == 1
+    assert event.image_path is None
+    assert db.query(models.StoredImage).count() == 0
+
+
+def test_snapshot_after_failed_write_is_written_again(db, disk, monkeypatch):
+    jpeg = make_jpeg(40)
+    writer = use_writer(monkeypatch)
+    snapshot_store.store_snapshot(db, new_event(db), jpeg)
+    writer.close()
+
+    # Same bytes once the disk is back: a new row and file, not a link to the dead one
+    disk["full"] = False
+    writer = use_writer(monkeypatch)
+    event = new_event(db)
+    path = snapshot_store.store_snapshot(db, event, jpeg)
+    writer.close()
+
+    db.expire_all()
+    image = db.query(models.StoredImage).one()
+    assert event.image_path == path == image.path
+    assert image.refcount == 1
+    assert (snapshot_store.BASE_DIR / path).is_file()
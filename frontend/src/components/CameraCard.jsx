@@ -1,35 +1,50 @@
 import React, { useState } from "react";
 import { motion } from "framer-motion";
 import { Activity, Signal, WifiOff, MapPin, Trash2 } from "lucide-react";
-import { API_BASE } from "../services/api";
+import { subscribeCamera } from "../services/videoSocket";
+import DetectionOverlay from "./DetectionOverlay";
 
 const CameraCard = ({ cam, onToggle, onDelete }) => {
     const [imageError, setImageError] = useState(false);
-    const [streamId, setStreamId] = useState(Date.now());
+    const [frameUrl, setFrameUrl] = useState(null);
+    const [visible, setVisible] = useState(document.visibilityState === 'visible');
+    const [boxes, setBoxes] = useState([]);
+    const ackRef = React.useRef(null);
+    const imgRef = React.useRef(null);
 
-    // Reset error state if camera becomes active or ID changes
-    // This allows the image to try loading again if it was previously broken
-    // or if the camera status changes.
+    // Pause the feed while the tab is hidden; resuming starts from the newest frame
     React.useEffect(() => {
-        if (cam.is_active) {
-            setImageError(false);
-            setStreamId(Date.now());
-        }
-    }, [cam.is_active, cam.camera_id]);
-
-    // Instant Resume: Refresh stream when tab becomes visible to drop old buffer
-    React.useEffect(() => {
-        const handleVisibilityChange = () => {
-            if (document.visibilityState === 'visible' && cam.is_active) {
-                setStreamId(Date.now());
-            }
-        };
-
+        const handleVisibilityChange = () => setVisible(document.visibilityState === 'visible');
         document.addEventListener("visibilitychange", handleVisibilityChange);
         return () => {
             document.removeEventListener("visibilitychange", handleVisibilityChange);
         };
-    }, [cam.is_active]);
+    }, []);
+
+    // Frames arrive over the shared video WebSocket (no HTTP connection per card)
+    React.useEffect(() => {
+        if (!cam.is_active || !visible) return undefined;
+        setImageError(false);
+        const unsubscribe = subscribeCamera(cam.camera_id, {
+            profile: "thumb",
+            onFrame: (url, ack) => {
+                ackRef.current = ack;
+                setFrameUrl((previous) => {
+                    if (previous) URL.revokeObjectURL(previous);
+                    return url;
+                });
+            },
+            onDetections: setBoxes,
+            onEnded: () => setImageError(true),
+        });
+        return () => {
+            unsubscribe();
+            setFrameUrl((previous) => {
+                if (previous) URL.revokeObjectURL(previous);
+                return null;
+            });
+        };
+    }, [cam.is_active, cam.camera_id, visible]);
 
     return (
         <motion.div
@@ -54,15 +69,22 @@ const CameraCard = ({ cam, onToggle, onDelete }) => {
                   Only show the image if the camera is active AND we haven't encountered an error yet.
                   If onError triggers, we hide this img (via state) and show the fallback.
                 */}
-                {cam.is_active && !imageError && (
+                {cam.is_active && !imageError && frameUrl && (
                     <img
                         key={`${cam.camera_id}-${cam.is_active}`} // Force re-mount on status change
-                        src={`${API_BASE}/api/video/stream/${cam.camera_id}?t=${streamId}`}
+                        ref={imgRef}
+                        src={frameUrl}
+                        onLoad={() => ackRef.current?.()}
                         className="relative z-10 w-full h-full object-cover opacity-60 group-hover:opacity-100 transition-all duration-500 group-hover:scale-105"
                         onError={() => setImageError(true)}
                         alt={`Stream for ${cam.name}`}
                     />
                 )}
+                {cam.is_active && !imageError && frameUrl && boxes.length > 0 && (
+                    <div className="absolute inset-0 z-10 pointer-events-none">
+                        <DetectionOverlay boxes={boxes} mediaRef={imgRef} fit="cover" />
+                    </div>
+                )}
 
                 {/* Fallback Overlay (Shown when img hidden or loading or offline) */}
                 {/* Logic: Show this if camera is NOT active, OR if it IS active but we had an image error. */}
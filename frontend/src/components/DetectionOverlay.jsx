@@ -0,0 +1,61 @@
+import React, { useEffect, useRef } from "react";
+
+// Same colors as the boxes the backend burns into MJPEG frames
+const LABEL_COLORS = {
+    Person: "rgb(0, 255, 0)",
+    Phone: "rgb(255, 0, 0)",
+    Vehicle: "rgb(255, 140, 0)",
+    Bag: "rgb(255, 215, 0)",
+};
+
+// Area an object-contain (or object-cover) <video>/<img> actually covers inside its element
+const contentRect = (media, fit) => {
+    const width = media.clientWidth;
+    const height = media.clientHeight;
+    const naturalWidth = media.videoWidth || media.naturalWidth;
+    const naturalHeight = media.videoHeight || media.naturalHeight;
+    if (!naturalWidth || !naturalHeight) return { x: 0, y: 0, width, height };
+    const scale = (fit === "cover" ? Math.max : Math.min)(width / naturalWidth, height / naturalHeight);
+    const w = naturalWidth * scale;
+    const h = naturalHeight * scale;
+    return { x: (width - w) / 2, y: (height - h) / 2, width: w, height: h };
+};
+
+// Draws detection boxes ({ label, track_id, conf, box: [x1, y1, x2, y2] }, 0-1 coordinates)
+// on a canvas laid over `mediaRef`; `fit` matches the media's object-fit.
+const DetectionOverlay = ({ boxes, mediaRef, fit = "contain" }) => {
+    const canvasRef = useRef(null);
+
+    useEffect(() => {
+        const canvas = canvasRef.current;
+        const media = mediaRef.current;
+        if (!canvas || !media) return;
+
+        canvas.width = media.clientWidth;
+        canvas.height = media.clientHeight;
+        const ctx = canvas.getContext("2d");
+        ctx.clearRect(0, 0, canvas.width, canvas.height);
+
+        const area = contentRect(media, fit);
+        ctx.lineWidth = 2;
+        ctx.font = "bold 12px monospace";
+        (boxes || []).forEach(({ label, track_id, conf, box }) => {
+            const [x1, y1, x2, y2] = box;
+            const x = area.x + x1 * area.width;
+            const y = area.y + y1 * area.height;
+            const color = LABEL_COLORS[label] || "rgb(255, 255, 255)";
+            const tag = `${label}${track_id != null ? ` #${track_id}` : ""} ${conf.toFixed(2)}`;
+
+            ctx.strokeStyle = color;
+            ctx.strokeRect(x, y, (x2 - x1) * area.width, (y2 - y1) * area.height);
+            ctx.fillStyle = color;
+            ctx.fillRect(x, y - 16, ctx.measureText(tag).width + 6, 16);
+            ctx.fillStyle = "#fff";
+            ctx.fillText(tag, x + 3, y - 4);
+        });
+    }, [boxes, mediaRef, fit]);
+
+    return <canvas ref={canvasRef} className="absolute inset-0 w-full h-full pointer-events-none" />;
+};
+
+export default DetectionOverlay;
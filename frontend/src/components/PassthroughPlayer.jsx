@@ -0,0 +1,93 @@
+import React, { useEffect, useRef, useState } from "react";
+import { API_WS_BASE } from "../services/api";
+import DetectionOverlay from "./DetectionOverlay";
+
+const MAX_QUEUED = 3;       // fragments waiting for the SourceBuffer (older ones are dropped)
+const MAX_LATENCY = 2;      // seconds behind the live edge before jumping forward
+const KEEP_BUFFER = 30;     // seconds of played video kept in the SourceBuffer
+
+// Camera H.264 without re-encoding: fragmented MP4 from /api/video/fmp4/<camera>/ws
+// fed into MediaSource, with the detection boxes drawn on a canvas on top.
+const PassthroughPlayer = ({ cameraId, onError }) => {
+    const videoRef = useRef(null);
+    const [boxes, setBoxes] = useState([]);
+
+    useEffect(() => {
+        const video = videoRef.current;
+        let mediaSource = null;
+        let sourceBuffer = null;
+        let objectUrl = null;
+        let queue = [];
+
+        const pump = () => {
+            if (!sourceBuffer || sourceBuffer.updating || queue.length === 0) return;
+            const buffered = sourceBuffer.buffered;
+            if (buffered.length && video.currentTime - buffered.start(0) > KEEP_BUFFER) {
+                sourceBuffer.remove(buffered.start(0), video.currentTime - 5);
+                return;
+            }
+            sourceBuffer.appendBuffer(queue.shift());
+        };
+
+        const onUpdateEnd = () => {
+            const buffered = sourceBuffer.buffered;
+            if (buffered.length) {
+                const liveEdge = buffered.end(buffered.length - 1);
+                if (liveEdge - video.currentTime > MAX_LATENCY) {
+                    video.currentTime = liveEdge - 0.2;
+                }
+            }
+            video.play().catch(() => {});
+            pump();
+        };
+
+        const init = (mime) => {
+            if (!window.MediaSource || !MediaSource.isTypeSupported(mime)) {
+                onError?.(`Browser can't play ${mime}`);
+                return;
+            }
+            queue = [];
+            sourceBuffer = null;
+            if (objectUrl) URL.revokeObjectURL(objectUrl);
+            mediaSource = new MediaSource();
+            objectUrl = URL.createObjectURL(mediaSource);
+            video.src = objectUrl;
+            mediaSource.addEventListener("sourceopen", () => {
+                sourceBuffer = mediaSource.addSourceBuffer(mime);
+                sourceBuffer.mode = "sequence"; // skipped fragments leave no gap
+                sourceBuffer.addEventListener("updateend", onUpdateEnd);
+                pump();
+            }, { once: true });
+        };
+
+        const ws = new WebSocket(`${API_WS_BASE}/api/video/fmp4/${cameraId}/ws`);
+        ws.binaryType = "arraybuffer";
+        ws.onmessage = (event) => {
+            if (typeof event.data !== "string") {
+                // The init segment is the first binary message after "init"
+                if (queue.length >= MAX_QUEUED) queue.splice(1, 1);
+                queue.push(event.data);
+                pump();
+                return;
+            }
+            const message = JSON.parse(event.data);
+            if (message.type === "init") init(message.mime);
+            else if (message.type === "detections") setBoxes(message.data.boxes);
+            else if (message.type === "ended" || message.type === "error") onError?.(message.detail || message.status);
+        };
+
+        return () => {
+            ws.close();
+            if (objectUrl) URL.revokeObjectURL(objectUrl);
+        };
+    }, [cameraId, onError]);
+
+    return (
+        <>
+            <video ref={videoRef} className="w-full h-full object-contain" muted autoPlay playsInline />
+            <DetectionOverlay boxes={boxes} mediaRef={videoRef} />
+        </>
+    );
+};
+
+export default PassthroughPlayer;
@@ -0,0 +1,31 @@
+// src/hooks/useDetections.js
+import { useEffect, useState } from "react";
+import { API_WS_BASE } from "../services/api";
+
+// Latest detection boxes of a camera, for drawing overlays on clean video.
+// Returns [] (and closes the socket) when the server burns overlays into
+// the streams itself (STREAM_OVERLAYS=server).
+export function useDetections(cameraId, enabled = true) {
+  const [boxes, setBoxes] = useState([]);
+
+  useEffect(() => {
+    if (!enabled || !cameraId) return undefined;
+    const ws = new WebSocket(`${API_WS_BASE}/api/video/detections/${cameraId}`);
+
+    ws.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.type === "overlays" && message.mode !== "client") {
+        ws.close();
+      } else if (message.type === "detections") {
+        setBoxes(message.data.boxes);
+      }
+    };
+
+    return () => {
+      ws.close();
+      setBoxes([]);
+    };
+  }, [cameraId, enabled]);
+
+  return boxes;
+}
@@ -18,6 +18,7 @@ const CamerasPage = () => {
     name: "",
     rtsp_url: "",
     location: "",
+    detect_classes: "",
   });
 
   const loadCameras = async () => {
@@ -44,9 +45,10 @@ const CamerasPage = () => {
       setCreating(true);
       await api.createCamera({
         ...form,
+        detect_classes: form.detect_classes.trim() || null,
         is_active: true,
       });
-      setForm({ camera_id: "", name: "", rtsp_url: "", location: "" });
+      setForm({ camera_id: "", name: "", rtsp_url: "", location: "", detect_classes: "" });
       setIsModalOpen(false);
       await loadCameras();
     } catch (err) {
@@ -198,6 +200,16 @@ const CamerasPage = () => {
                             onChange={e => setForm({...form, location: e.target.value})}
                           />
                       </div>
+                      <div>
+                          <label className="block text-xs font-medium text-slate-400 mb-1.5">Detect (Optional)</label>
+                          <input 
+                            type="text" 
+                            placeholder="person, phone (also: vehicle, bag)" 
+                            className="w-full bg-white/5 border border-white/10 rounded-lg px-3 py-2.5 text-sm text-white focus:border-cyan-500/50 outline-none transition-colors placeholder:text-slate-600"
+                            value={form.detect_classes}
+                            onChange={e => setForm({...form, detect_classes: e.target.value})}
+                          />
+                      </div>
 
                       <div className="pt-4 flex gap-3">
                           <button 
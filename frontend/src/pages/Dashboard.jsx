@@ -10,6 +10,7 @@ import {
   X,
   AlertTriangle,
   Users,
+  Film,
 } from "lucide-react";
 import {
   ResponsiveContainer,
@@ -155,6 +156,12 @@ const Dashboard = () => {
 
             return updated;
           });
+        } else if (msg.type === "event_updated" && msg.event) {
+          // Open event got a new peak or was closed: replace it in place
+          const updatedEvent = msg.event;
+          setEvents((prev) =>
+            prev.map((ev) => (ev.id === updatedEvent.id ? updatedEvent : ev))
+          );
         }
       } catch (err) {
         console.error("WS parse error:", err);
@@ -463,6 +470,11 @@ const Dashboard = () => {
                         </td>
                         <td className="px-6 py-4 text-sm text-slate-400 max-w-xs truncate border-t border-b border-white/0 group-hover:border-white/5">
                           {event.description || "-"}
+                          {event.status === "open" ? (
+                            <span className="ml-2 text-xs text-red-400">● live</span>
+                          ) : event.duration_seconds != null && event.duration_seconds > 0 ? (
+                            <span className="ml-2 text-xs text-slate-500">{Math.round(event.duration_seconds)}s</span>
+                          ) : null}
                         </td>
                         <td className="px-6 py-4 text-right first:rounded-l-xl last:rounded-r-xl border-t border-b border-r border-white/0 group-hover:border-white/5">
                           <div className="flex items-center justify-end gap-3 opacity-60 group-hover:opacity-100 transition-opacity">
@@ -477,6 +489,17 @@ const Dashboard = () => {
                                 <Camera className="w-4 h-4" />
                               </a>
                             )}
+                            {(event.clip_path || event.preroll_path) && (
+                              <a
+                                href={getImageUrl(event.clip_path || event.preroll_path)}
+                                target="_blank"
+                                rel="noreferrer"
+                                className="p-1.5 hover:bg-white/10 rounded-lg text-violet-400 transition"
+                                title="View Clip"
+                              >
+                                <Film className="w-4 h-4" />
+                              </a>
+                            )}
                             <button
                               onClick={() =>
                                 navigate(`/live?camera=${event.camera_id}`)
@@ -11,7 +11,7 @@ import {
   Camera,
   Eye
 } from "lucide-react";
-import { api, API_BASE } from "../services/api";
+import { api, API_BASE, getThumbnailUrl } from "../services/api";
 import Skeleton from "../components/Skeleton";
 
 const EventsPage = () => {
@@ -269,7 +269,11 @@ const EventCard = ({ event }) => {
             <div className="aspect-video bg-slate-900 relative overflow-hidden">
                 {event.image_path ? (
                     <img 
-                        src={`${API_BASE}/${event.image_path}`} 
+                        src={getThumbnailUrl(event, 320)}
+                        srcSet={`${getThumbnailUrl(event, 320)} 320w, ${getThumbnailUrl(event, 640)} 640w`}
+                        sizes="(min-width: 1280px) 25vw, (min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
+                        loading="lazy"
+                        decoding="async"
                         alt="Event Snapshot" 
                         className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500"
                     />
@@ -2,6 +2,9 @@ import React, { useEffect, useState, useRef } from "react";
 import { useSearchParams } from "react-router-dom";
 import { Camera, Grid, Maximize2, Minimize2, MoreVertical, Settings, LayoutGrid, Layout, Square, Circle, ChevronUp, ChevronDown, ChevronLeft, ChevronRight, Activity } from "lucide-react";
 import { api, API_BASE } from "../services/api";
+import PassthroughPlayer from "../components/PassthroughPlayer";
+import DetectionOverlay from "../components/DetectionOverlay";
+import { useDetections } from "../hooks/useDetections";
 
 const BASE_STREAM_URL = `${API_BASE}/api/video/stream`;
 
@@ -14,6 +17,7 @@ const LiveView = () => {
   // View State
   const [layout, setLayout] = useState("grid-2"); // grid-1, grid-2, grid-3
   const [isFullscreen, setIsFullscreen] = useState(false);
+  const [passthrough, setPassthrough] = useState(false); // camera H.264 + client-side boxes
   const containerRef = useRef(null);
 
   const selectedCameraId = params.get("camera");
@@ -91,6 +95,14 @@ const LiveView = () => {
                 </div>
             )}
             
+            <button
+                onClick={() => setPassthrough(!passthrough)}
+                className={`px-2 py-1.5 rounded-lg text-xs font-mono border transition-all ${passthrough ? 'bg-cyan-500/10 text-cyan-400 border-cyan-500/30' : 'text-slate-500 border-white/5 hover:text-slate-300'}`}
+                title="Play the camera's own H.264 (no server re-encode); boxes are drawn in the browser"
+            >
+                H.264
+            </button>
+
             <div className="w-px h-6 bg-white/10 mx-1"></div>
 
             <button onClick={toggleFullscreen} className="p-2 text-slate-400 hover:text-white hover:bg-white/10 rounded-lg transition-colors">
@@ -108,7 +120,7 @@ const LiveView = () => {
              </div>
          ) : (
              activeFeeds.map(cam => (
-                 <VideoCard key={cam.camera_id} camera={cam} isSingle={layout === 'grid-1' || !!selectedCameraId} />
+                 <VideoCard key={cam.camera_id} camera={cam} isSingle={layout === 'grid-1' || !!selectedCameraId} passthrough={passthrough} />
              ))
          )}
       </div>
@@ -117,10 +129,15 @@ const LiveView = () => {
 };
 
 // Sub-component for individual feed
-const VideoCard = ({ camera, isSingle }) => {
+const VideoCard = ({ camera, isSingle, passthrough }) => {
     const [isHovered, setIsHovered] = useState(false);
-    // Use timestamp to force refresh if needed, though MJPEG usually handles itself
-    const streamUrl = `${BASE_STREAM_URL}/${camera.camera_id}`;
+    const [passthroughError, setPassthroughError] = useState(null);
+    const imgRef = useRef(null);
+    const showPassthrough = passthrough && !passthroughError;
+    // Boxes for clean MJPEG (STREAM_OVERLAYS=client); the passthrough player gets its own
+    const boxes = useDetections(camera.camera_id, !showPassthrough);
+    // Grid tiles use the lighter shared "grid" profile; single view gets full quality
+    const streamUrl = `${BASE_STREAM_URL}/${camera.camera_id}?profile=${isSingle ? "full" : "grid"}`;
 
     return (
         <div 
@@ -130,15 +147,21 @@ const VideoCard = ({ camera, isSingle }) => {
         >
              {/* Main Feed */}
              <div className="relative flex-1 bg-black flex items-center justify-center">
-                 <img 
-                    src={streamUrl}
-                    alt={`Feed ${camera.camera_id}`}
-                    className="w-full h-full object-contain"
-                    onError={(e) => {
-                        e.target.style.display = 'none';
-                        e.target.parentNode.innerHTML += '<div class="absolute inset-0 flex items-center justify-center text-red-500 text-xs font-mono">SIGNAL LOST</div>';
-                    }}
-                 />
+                 {showPassthrough ? (
+                     <PassthroughPlayer cameraId={camera.camera_id} onError={setPassthroughError} />
+                 ) : (
+                     <img 
+                        ref={imgRef}
+                        src={streamUrl}
+                        alt={`Feed ${camera.camera_id}`}
+                        className="w-full h-full object-contain"
+                        onError={(e) => {
+                            e.target.style.display = 'none';
+                            e.target.parentNode.innerHTML += '<div class="absolute inset-0 flex items-center justify-center text-red-500 text-xs font-mono">SIGNAL LOST</div>';
+                        }}
+                     />
+                 )}
+                 {!showPassthrough && boxes.length > 0 && <DetectionOverlay boxes={boxes} mediaRef={imgRef} />}
                  
                  {/* HUD: Top Overlay */}
                  <div className="absolute top-0 left-0 right-0 p-4 flex justify-between items-start bg-gradient-to-b from-black/80 to-transparent opacity-0 group-hover:opacity-100 transition-opacity duration-300">
@@ -19,6 +19,12 @@ export const getImageUrl = (path) => {
   return `${API_BASE}${path.startsWith("/") ? "" : "/"}${path}`;
 };
 
+// Event snapshot thumbnail, `width` px wide (server snaps to 160 / 320 / 640)
+export const getThumbnailUrl = (event, width) => {
+  if (!event.thumbnail_url) return getImageUrl(event.image_path);
+  return `${getImageUrl(event.thumbnail_url)}&w=${width}`;
+};
+
 export const api = {
   // ---------- AUTH ----------
   async login(username, password) {
@@ -0,0 +1,96 @@
+// src/services/videoSocket.js
+// One shared WebSocket (/api/video/ws) carrying the frames of every camera
+// on the page, so large grids aren't limited by the browser's per-host
+// HTTP connection cap. Binary frame layout: see backend services/video_socket.py.
+import { API_WS_BASE } from "./api";
+
+const HEADER_SIZE = 15; // !BBIdB: version, status, seq, ts, camera id length
+const STATUSES = ["loading", "live", "lost", "disabled", "stopped"];
+const RECONNECT_MS = 2000;
+
+const subscribers = new Map(); // camera_id -> { profile, fps, onFrame, onDetections, onEnded }
+let socket = null;
+let reconnectTimer = null;
+
+const send = (message) => {
+  if (socket && socket.readyState === WebSocket.OPEN) {
+    socket.send(JSON.stringify(message));
+  }
+};
+
+const sendSubscribe = (cameraId, { profile, fps }) =>
+  send({ type: "subscribe", camera_id: cameraId, profile, fps });
+
+const handleFrame = (buffer) => {
+  const view = new DataView(buffer);
+  const status = STATUSES[view.getUint8(1)] || "loading";
+  const seq = view.getUint32(2);
+  const ts = view.getFloat64(6);
+  const idLength = view.getUint8(14);
+  const cameraId = new TextDecoder().decode(new Uint8Array(buffer, HEADER_SIZE, idLength));
+  const sub = subscribers.get(cameraId);
+  if (!sub) return;
+
+  const blob = new Blob([new Uint8Array(buffer, HEADER_SIZE + idLength)], { type: "image/jpeg" });
+  // Ack once the frame is displayed: the server drops frames until then
+  const ack = () => send({ type: "ack", camera_id: cameraId, seq });
+  sub.onFrame(URL.createObjectURL(blob), ack, { status, ts });
+};
+
+const connect = () => {
+  if (socket || subscribers.size === 0) return;
+  socket = new WebSocket(`${API_WS_BASE}/api/video/ws`);
+  socket.binaryType = "arraybuffer";
+
+  socket.onopen = () => {
+    subscribers.forEach((sub, cameraId) => sendSubscribe(cameraId, sub));
+  };
+
+  socket.onmessage = (event) => {
+    if (typeof event.data !== "string") {
+      handleFrame(event.data);
+      return;
+    }
+    const message = JSON.parse(event.data);
+    const sub = subscribers.get(message.camera_id);
+    if (!sub) return;
+    if (message.type === "detections") {
+      sub.onDetections?.(message.data.boxes);
+    } else if (message.type === "ended" || message.type === "error") {
+      sub.onEnded?.(message);
+    }
+  };
+
+  socket.onclose = () => {
+    socket = null;
+    if (subscribers.size > 0 && !reconnectTimer) {
+      reconnectTimer = setTimeout(() => {
+        reconnectTimer = null;
+        connect();
+      }, RECONNECT_MS);
+    }
+  };
+};
+
+// Returns an unsubscribe function. onFrame(objectUrl, ack, { status, ts }):
+// the caller revokes the URL when replaced and calls ack() once it is shown.
+// onDetections(boxes) fires when the server sends boxes for clean video
+// (STREAM_OVERLAYS=client); with server-side overlays it never fires.
+export function subscribeCamera(cameraId, { profile = "thumb", fps, onFrame, onDetections, onEnded }) {
+  const sub = { profile, fps, onFrame, onDetections, onEnded };
+  subscribers.set(cameraId, sub);
+  if (socket) {
+    sendSubscribe(cameraId, sub);
+  } else {
+    connect();
+  }
+
+  return () => {
+    if (subscribers.get(cameraId) !== sub) return;
+    subscribers.delete(cameraId);
+    send({ type: "unsubscribe", camera_id: cameraId });
+    if (subscribers.size === 0 && socket) {
+      socket.close();
+    }
+  };
+}